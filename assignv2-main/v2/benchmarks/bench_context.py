@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Context extraction benchmark: runs the rule-based extractor over a corpus
+of report topics (benchmarks/data/context_topics.jsonl, labelled with the
+geography, domain and normalized date range a careful reader would give)
+and reports how often it is confident enough to skip the context LLM call,
+how accurate it is on those topics, and how long one extraction takes.
+
+Relative periods are resolved against a fixed date (--today) so the labels
+stay valid.
+
+Usage: python benchmarks/bench_context.py [--today 2026-01-15] [--threshold 0.8] [--verbose]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools.context_rules import CONTEXT_MIN_CONFIDENCE, extract_context  # noqa: E402
+
+CORPUS = os.path.join(ROOT, "benchmarks", "data", "context_topics.jsonl")
+FIELDS = ("geography", "domain", "date_range")
+
+
+def _load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _field_matches(context: dict, expected: dict) -> dict:
+    date_range = context.get("date_range")
+    got_range = (date_range["start"], date_range["end"]) if date_range else (None, None)
+    return {
+        "geography": context.get("geography") == expected["geography"],
+        "domain": context.get("domain") == expected["domain"],
+        "date_range": got_range == (expected["start"], expected["end"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--today", default="2026-01-15", help="reference date for relative periods")
+    parser.add_argument("--threshold", type=float, default=CONTEXT_MIN_CONFIDENCE)
+    parser.add_argument("--runs", type=int, default=200, help="timed extractions per topic")
+    parser.add_argument("--verbose", action="store_true", help="print every topic")
+    args = parser.parse_args()
+
+    today = date.fromisoformat(args.today)
+    rows = _load(args.corpus)
+    hits, correct_hits, field_correct, field_all = 0, 0, {f: 0 for f in FIELDS}, {f: 0 for f in FIELDS}
+    for row in rows:
+        context, confidence = extract_context(row["topic"], today)
+        matches = _field_matches(context, row)
+        hit = confidence >= args.threshold
+        for f in FIELDS:
+            field_all[f] += matches[f]
+            if hit:
+                field_correct[f] += matches[f]
+        if hit:
+            hits += 1
+            correct_hits += all(matches.values())
+        if args.verbose or (hit and not all(matches.values())):
+            marker = ("HIT " if hit else "LLM ") + ("ok" if all(matches.values()) else "WRONG " + ",".join(f for f in FIELDS if not matches[f]))
+            print(f"{confidence:.2f} {marker:28s} {row['topic']} -> {context['geography']} / {context['domain']} / "
+                  f"{context['date_range'] and (context['date_range']['start'], context['date_range']['end'])}")
+
+    started = time.perf_counter()
+    for _ in range(args.runs):
+        for row in rows:
+            extract_context(row["topic"], today)
+    per_call_us = (time.perf_counter() - started) / (args.runs * len(rows)) * 1e6
+
+    n = len(rows)
+    print(f"\n{n} topics, threshold {args.threshold}")
+    print(f"LLM skipped (hit rate): {hits}/{n} = {hits / n:.0%}")
+    if hits:
+        print(f"All fields correct on hits: {correct_hits}/{hits} = {correct_hits / hits:.0%}")
+        print("Per field on hits: " + ", ".join(f"{f} {field_correct[f] / hits:.0%}" for f in FIELDS))
+    print("Per field on all topics: " + ", ".join(f"{f} {field_all[f] / n:.0%}" for f in FIELDS))
+    print(f"Extraction time: {per_call_us:.0f} us per topic (the LLM call it replaces takes ~1 s)")
+
+
+if __name__ == "__main__":
+    main()
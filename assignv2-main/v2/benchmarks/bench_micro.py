@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the hot helpers, on fixtures only (no network, no LLM):
+
+- HTML extraction behind fetch_page_text, on the saved pages in benchmarks/fixtures/
+- PDF text extraction behind fetch_pdf_text, on reports/*.pdf
+- count_tokens, the review node's _content_token_tally and its coverage estimate, over 500 articles
+- summarize's material assembly (_build_material) over the same 500 articles
+- extractive compression (tools/compress.py) of 50 of those articles
+- pdf_node rendering a long report
+
+Each benchmark reports the best and median wall time of repeated runs and,
+from a separate run under tracemalloc, its peak traced memory. Results are
+compared with benchmarks/baselines.json (time on the best run, the least
+noisy figure); a benchmark over its baseline plus the tolerance stored
+there (overridable per run) is measured once more, and the script exits
+with status 1 if it is still over. Timing baselines are machine
+specific: re-record them with --save-baseline after changing machines or
+after an intended change.
+
+Usage: python benchmarks/bench_micro.py [--only extract_html pdf_node] [--save-baseline]
+                                        [--time-tolerance 0.25] [--memory-tolerance 0.1]
+"""
+
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_render import synthetic_report  # noqa: E402
+from graph.nodes.pdf_node import pdf_node  # noqa: E402
+from graph.nodes.search_review_node import _content_token_tally  # noqa: E402
+from graph.nodes.summarize_node import _build_material  # noqa: E402
+from tools.compress import compress_text  # noqa: E402
+from tools.cost_tracker import CostTracker  # noqa: E402
+from tools.coverage import CoverageEstimator  # noqa: E402
+from tools.llm import count_tokens  # noqa: E402
+from tools.web_search import _pdf_bytes_to_text, extract_html_text  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+BASELINES_PATH = os.path.join(ROOT, "benchmarks", "baselines.json")
+DEFAULT_TOLERANCE = {"time": 0.25, "memory": 0.10}  # allowed relative growth over the baseline
+TIME_NOISE_S = 0.0002  # slowdowns smaller than this are never reported
+MIN_TIME_S = 0.5  # keep repeating a benchmark at least this long
+MIN_RUNS, MAX_RUNS = 5, 500
+ARTICLES = 500
+
+BENCHMARKS = {}  # name -> setup() returning the zero-argument callable to measure
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _read(name: str, mode: str = "r"):
+    with open(os.path.join(FIXTURES, name), mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        return f.read()
+
+
+def _articles(n: int = ARTICLES, seed: int = 0):
+    """n articles with 1-20k chars of content, cut from the extracted fixture text, spread over 5 subtopics."""
+    rng = random.Random(seed)
+    text = extract_html_text(_read("news_article.html"), max_chars=10**7)
+    text = (text + "\n") * (20000 // len(text) + 2)
+    results = {}
+    for i in range(n):
+        start = rng.randrange(0, 1000)
+        content = text[start:start + rng.randint(1000, 20000)]
+        results.setdefault(f"subtopic {i % 5}", []).append({
+            "title": content[:80],
+            "snippet": content[80:380],
+            "content": content,
+            "url": f"https://site{i % 50}.example.com/article/{i}",
+            "query": f"query {i % 20}",
+        })
+    return results
+
+
+for _page in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+    _name = os.path.splitext(os.path.basename(_page))[0]
+
+    @benchmark(f"extract_html/{_name}")
+    def _extract(page=_page):
+        with open(page, "r", encoding="utf-8") as f:
+            html = f.read()
+        return lambda: extract_html_text(html)
+
+for _pdf in sorted(glob.glob(os.path.join(ROOT, "reports", "*.pdf"))):
+    _name = os.path.splitext(os.path.basename(_pdf))[0]
+
+    @benchmark(f"pdf_text/{_name}")
+    def _pdf_text(path=_pdf):
+        with open(path, "rb") as f:
+            data = f.read()
+        return lambda: _pdf_bytes_to_text(data)
+
+
+@benchmark("count_tokens/500_articles")
+def _count_tokens():
+    texts = [a["content"] for articles in _articles().values() for a in articles]
+    return lambda: [count_tokens(t) for t in texts]
+
+
+@benchmark("content_token_tally/500_articles")
+def _content_tally():
+    articles = [a for items in _articles().values() for a in items]
+    return lambda: _content_token_tally(articles)
+
+
+@benchmark("coverage/500_articles")
+def _coverage():
+    results = _articles()
+
+    def run():
+        estimator = CoverageEstimator("Indian markets")
+        for subtopic, articles in results.items():
+            estimator.add(subtopic, articles, initial=True)
+        return estimator.flagged()
+    return run
+
+
+@benchmark("build_material/500_articles")
+def _material():
+    results = _articles()
+    return lambda: _build_material(results, set())
+
+
+@benchmark("compress_text/50_articles")
+def _compress():
+    results = _articles()
+    articles = [(subtopic, a["content"]) for subtopic, items in results.items() for a in items][:50]
+    return lambda: [compress_text(content, f"Indian markets {subtopic}", 0.4) for subtopic, content in articles]
+
+
+@benchmark("pdf_node/long_report")
+def _pdf_node():
+    state = {"final_markdown": synthetic_report(40), "cost_tracker": CostTracker(), "node_stats": {}}
+    output = os.path.join(tempfile.mkdtemp(prefix="bench_micro_"), "report.pdf")
+    return lambda: pdf_node(state, output)
+
+
+def measure(fn, min_time_s: float = MIN_TIME_S):
+    """Best and median seconds over repeated runs (after one warm-up) and the peak traced KiB of one run."""
+    fn()
+    times = []
+    started = time.perf_counter()
+    while len(times) < MAX_RUNS and (len(times) < MIN_RUNS or time.perf_counter() - started < min_time_s):
+        run_started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - run_started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"best_s": min(times), "median_s": statistics.median(times), "runs": len(times), "peak_kb": round(peak / 1024, 1)}
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: dict):
+    """Regression messages for one benchmark (empty when within tolerance)."""
+    problems = []
+    time_limit = baseline["best_s"] * (1 + tolerance["time"])
+    if result["best_s"] > time_limit and result["best_s"] - baseline["best_s"] > TIME_NOISE_S:
+        problems.append(
+            f"{name}: {result['best_s'] * 1000:.3f} ms vs baseline {baseline['best_s'] * 1000:.3f} ms "
+            f"(+{result['best_s'] / baseline['best_s'] - 1:.0%}, tolerance {tolerance['time']:.0%})"
+        )
+    if result["peak_kb"] > baseline["peak_kb"] * (1 + tolerance["memory"]) and result["peak_kb"] - baseline["peak_kb"] > 1:
+        problems.append(
+            f"{name}: peak {result['peak_kb']:.0f} KiB vs baseline {baseline['peak_kb']:.0f} KiB "
+            f"(+{result['peak_kb'] / baseline['peak_kb'] - 1:.0%}, tolerance {tolerance['memory']:.0%})"
+        )
+    return problems
+
+
+def _load_baselines(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"tolerance": dict(DEFAULT_TOLERANCE), "benchmarks": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", default=[], help="run benchmarks whose name starts with any of these")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="record the results as the new baselines")
+    parser.add_argument("--time-tolerance", type=float, help="override the stored relative time tolerance")
+    parser.add_argument("--memory-tolerance", type=float, help="override the stored relative memory tolerance")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME_S, help="seconds to repeat each benchmark")
+    parser.add_argument("--history", default=os.path.join(ROOT, "benchmarks", "results", "micro_history.jsonl"))
+    args = parser.parse_args()
+
+    baselines = _load_baselines(args.baselines)
+    tolerance = {**DEFAULT_TOLERANCE, **baselines.get("tolerance", {})}
+    if args.time_tolerance is not None:
+        tolerance["time"] = args.time_tolerance
+    if args.memory_tolerance is not None:
+        tolerance["memory"] = args.memory_tolerance
+
+    names = [n for n in BENCHMARKS if not args.only or any(n.startswith(prefix) for prefix in args.only)]
+    results, problems = {}, []
+    for name in names:
+        fn = BENCHMARKS[name]()
+        result = measure(fn, args.min_time)
+        baseline = baselines["benchmarks"].get(name)
+        status = "new"
+        if baseline:
+            found = compare(name, result, baseline, tolerance)
+            if found and not args.save_baseline:
+                retry = measure(fn, args.min_time)  # a one-off stall should not fail the run
+                result = {**result, **{k: min(result[k], retry[k]) for k in ("best_s", "median_s", "peak_kb")}}
+                found = compare(name, result, baseline, tolerance)
+            problems.extend(found)
+            status = f"{result['best_s'] / baseline['best_s'] - 1:+.0%} time, " \
+                     f"{result['peak_kb'] / max(baseline['peak_kb'], 1) - 1:+.0%} memory" + (" REGRESSION" if found else "")
+        results[name] = result
+        print(f"{name:40s} {result['best_s'] * 1000:10.3f} ms best {result['median_s'] * 1000:10.3f} ms median "
+              f"{result['peak_kb']:10.0f} KiB  ({status})")
+
+    os.makedirs(os.path.dirname(args.history), exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"timestamp": time.time(), "python": sys.version.split()[0], "results": results}) + "\n")
+
+    if args.save_baseline:
+        baselines["tolerance"] = tolerance
+        baselines["environment"] = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "recorded_at": time.strftime("%Y-%m-%d"),
+        }
+        for name, result in results.items():
+            baselines["benchmarks"][name] = {
+                "best_s": round(result["best_s"], 7),
+                "median_s": round(result["median_s"], 7),
+                "peak_kb": result["peak_kb"],
+            }
+        with open(args.baselines, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved {len(results)} baselines to {args.baselines}")
+        return
+
+    if problems:
+        print("\nRegressions beyond tolerance:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("\nAll benchmarks within tolerance.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+PDF rendering benchmark: renders large synthetic reports (every section
+emitted on a single line, as the model often does) with the shared
+block-level renderer and, for comparison, with the previous
+one-Paragraph-per-line approach. Reports pages per second and appends the
+result to a history file.
+
+Usage: python benchmarks/bench_render.py [--sections 10 40 120] [--runs 3] [--no-legacy]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.report_renderer import render_html  # noqa: E402
+
+WORDS = (
+    "market growth inflation policy central bank index equity investors quarter earnings sector demand supply "
+    "forecast analysts revenue exports government reform capital liquidity volatility outlook rally decline"
+).split()
+
+
+def synthetic_report(sections: int, seed: int = 0) -> str:
+    """An HTML report with `sections` sections, each on one line, citations and a references list."""
+    rng = random.Random(seed)
+
+    def sentence():
+        words = [rng.choice(WORDS) for _ in range(rng.randint(12, 28))]
+        return " ".join(words).capitalize() + f" [{rng.randint(1, 8)}]."
+
+    def paragraph():
+        return "<p>" + " ".join(sentence() for _ in range(rng.randint(4, 8))).replace("market", "<b>market</b>", 1) + "</p>"
+
+    lines = ["<h1><b>Synthetic Benchmark Report</b></h1>", "<h2><b>Executive Summary</b></h2>", paragraph()]
+    for i in range(sections):
+        items = "".join(f"<li><b>Point {j}:</b> {sentence()}</li>" for j in range(4))
+        lines.append(
+            f"<h2><b>Section {i + 1}</b></h2>" + "".join(paragraph() for _ in range(5)) + f"<ul>{items}</ul>"
+        )
+    lines.append("<h2><b>References</b></h2>")
+    lines.append("<ul>")
+    lines.extend(f"<li>[{n}] Author, A. (2025). Title {n}. Source. https://example.com/{n}</li>" for n in range(1, 9))
+    lines.append("</ul>")
+    return "\n".join(lines)
+
+
+def legacy_render(html_text: str, output_path: str) -> int:
+    """The previous renderer: one Paragraph per input line."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    doc = SimpleDocTemplate(output_path, pagesize=letter, rightMargin=0.75*inch, leftMargin=0.75*inch,
+                            topMargin=0.75*inch, bottomMargin=0.75*inch)
+    body = ParagraphStyle('LegacyBody', fontName='Times-Roman', fontSize=11, leading=16, spaceAfter=6)
+    story = []
+    for line in html_text.split('\n'):
+        if not line.strip():
+            story.append(Spacer(1, 6))
+            continue
+        story.append(Paragraph(line.rstrip(), body))
+    doc.build(story)
+    return doc.page
+
+
+def measure(render, html_text: str, runs: int):
+    times, pages = [], 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(runs):
+            started = time.perf_counter()
+            pages = render(html_text, os.path.join(tmp, f"bench_{i}.pdf"))
+            times.append(time.perf_counter() - started)
+    seconds = statistics.median(times)
+    return {"pages": pages, "seconds": round(seconds, 4), "pages_per_s": round(pages / seconds, 2)}
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, nargs="+", default=[10, 40, 120])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-legacy", action="store_true", help="skip the one-Paragraph-per-line comparison")
+    parser.add_argument("--history", default=os.path.join(ROOT, "benchmarks", "results", "render_history.jsonl"))
+    args = parser.parse_args()
+
+    record = {"timestamp": time.time(), "git_rev": _git_rev(), "python": sys.version.split()[0], "reports": {}}
+    for sections in args.sections:
+        html_text = synthetic_report(sections)
+        result = {"html_chars": len(html_text), "renderer": measure(render_html, html_text, args.runs)}
+        line = f"{sections:4d} sections: {result['renderer']['pages']} pages, {result['renderer']['pages_per_s']} pages/s"
+        if not args.no_legacy:
+            result["legacy"] = measure(legacy_render, html_text, args.runs)
+            line += f" (legacy {result['legacy']['pages_per_s']} pages/s)"
+        record["reports"][str(sections)] = result
+        print(line)
+
+    os.makedirs(os.path.dirname(args.history), exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
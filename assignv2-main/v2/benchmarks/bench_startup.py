@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: imports each entry point in a fresh interpreter with
+`python -X importtime`, reports the cumulative import time and wall time,
+lists the slowest imports and appends the result to a history file so
+startup latency can be tracked over time.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--history benchmarks/results/startup_history.jsonl]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> code run in a fresh interpreter
+TARGETS = {
+    "main": "import main",
+    "service": "import service",
+    "json_to_pdf": "import utils.json_to_pdf",
+}
+
+
+def _import_times(stderr: str):
+    """Parse `-X importtime` output into (module, cumulative_us) pairs."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line.split("|")
+        rows.append((module.rstrip()[1:], int(cumulative_us)))  # drop the column's padding space
+    return rows
+
+
+def measure(code: str, runs: int):
+    wall, cumulative, slowest = [], [], {}
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        wall.append(time.perf_counter() - started)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{code!r} failed:\n{proc.stderr[-2000:]}")
+        rows = _import_times(proc.stderr)
+        # top-level entries are not indented; their cumulative times add up to the total
+        cumulative.append(sum(us for module, us in rows if not module.startswith(" ")) / 1e6)
+        for module, us in rows:
+            slowest[module] = min(slowest.get(module, us), us)
+    return {
+        "wall_s_median": statistics.median(wall),
+        "import_s_median": statistics.median(cumulative),
+        "slowest": sorted(slowest.items(), key=lambda kv: kv[1], reverse=True)[:10],
+    }
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--history", default=os.path.join(ROOT, "benchmarks", "results", "startup_history.jsonl"))
+    args = parser.parse_args()
+
+    record = {"timestamp": time.time(), "git_rev": _git_rev(), "python": sys.version.split()[0], "targets": {}}
+    for name, code in TARGETS.items():
+        result = measure(code, args.runs)
+        record["targets"][name] = {k: result[k] for k in ("wall_s_median", "import_s_median")}
+        print(f"{name}: wall {result['wall_s_median'] * 1000:.0f} ms, imports {result['import_s_median'] * 1000:.0f} ms")
+        for module, us in result["slowest"][:5]:
+            print(f"    {us / 1000:8.1f} ms  {module.strip()}")
+
+    os.makedirs(os.path.dirname(args.history), exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import subprocess
 import os
+import re
 
 # Read mermaid markdown files
 diagrams = ['graph_simple.md', 'graph_detailed.md']
@@ -9,8 +10,12 @@ for diagram_file in diagrams:
         with open(diagram_file, 'r') as f:
             content = f.read()
         
-        # Extract mermaid content (remove markdown code block markers)
-        mermaid_content = content.replace('```mermaid\n', '').replace('```', '').strip()
+        # Extract the mermaid block (the files also carry a heading and notes)
+        match = re.search(r'```mermaid\n(.*?)```', content, re.DOTALL)
+        if not match:
+            print(f'✗ No mermaid block in {diagram_file}')
+            continue
+        mermaid_content = match.group(1).strip()
         
         # Write to temporary mermaid file
         temp_file = 'temp_diagram.mmd'
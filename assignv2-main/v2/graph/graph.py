@@ -1,31 +1,60 @@
-from langgraph.graph import StateGraph
 from graph.state import GraphState
 
 from graph.nodes.input_node import input_node
 from graph.nodes.context_node import context_node
-from graph.nodes.planner_node import planner_node
 from graph.nodes.query_node import query_node
 from graph.nodes.search_node import search_node
 from graph.nodes.search_review_node import search_review_node
+from graph.nodes.plan_search_node import plan_search_node
+from graph.nodes.plan_node import plan_node
 from graph.nodes.summarize_node import summarize_node
+from tools.profiling import profiled
+from tools.run_stats import timed
+
+
+def _route_after_plan(state: GraphState) -> str:
+    # a cached or merged plan already has subtopics; otherwise a pipelined run
+    # extracts context and streams the planner straight into search
+    return "query" if state.get("subtopics") else "context"
+
+
+def _node(name: str, fn):
+    # per-node stats for viz_graph.py are always recorded; profiled() is a no-op unless PROFILE_NODES=1
+    return profiled(name, timed(name, fn))
+
+
+_compiled = None
 
 
 def build_graph():
+    from langgraph.graph import StateGraph
+
     graph = StateGraph(GraphState)
 
-    graph.add_node("context", context_node) # done
-    graph.add_node("planner", planner_node) # done
-    graph.add_node("query", query_node) # done 
-    graph.add_node("search", search_node) # needs fixing
-    graph.add_node("search_review", search_review_node)
-    graph.add_node("summarize", summarize_node)
 
-    graph.set_entry_point("context")
+    graph.add_node("plan", _node("plan", plan_node))
+    graph.add_node("context", _node("context", context_node)) # done
+    graph.add_node("query", _node("query", query_node)) # done 
+    graph.add_node("search", _node("search", search_node)) # needs fixing
+    graph.add_node("search_review", _node("search_review", search_review_node))
+    graph.add_node("summarize", _node("summarize", summarize_node))
+    graph.add_node("plan_search", _node("plan_search", plan_search_node))
+
+    graph.set_entry_point("plan")
 
-    graph.add_edge("context", "planner")
-    graph.add_edge("planner", "query")
+    graph.add_conditional_edges("plan", _route_after_plan, ["query", "context"])
+    graph.add_edge("context", "plan_search")
     graph.add_edge("query", "search")
     graph.add_edge("search", "search_review")
+    graph.add_edge("plan_search", "search_review")
     graph.add_edge("search_review", "summarize")
 
     return graph.compile()
+
+
+def get_graph():
+    """The compiled graph, built once per process and reused by every run."""
+    global _compiled
+    if _compiled is None:
+        _compiled = build_graph()
+    return _compiled
@@ -1,4 +1,5 @@
 from tools.llm import call_llm
+from tools.context_rules import CONTEXT_MIN_CONFIDENCE, extract_context, normalize_context
 from graph.state import GraphState
 from rich import print
 
@@ -12,8 +13,20 @@ class ContextSchema(BaseModel):
 
 
 def context_node(state: GraphState) -> GraphState:
+    """
+    Geography, time range and domain for the topic.
+    The rule-based extractor (tools/context_rules.py) answers when it is
+    confident; otherwise the LLM does and its time range is normalized to
+    dates afterwards.
+    """
     topic = state["topic"]
 
+    rules_context, confidence = extract_context(topic)
+    if confidence >= CONTEXT_MIN_CONFIDENCE:
+        print(f"Rule-based context (confidence {confidence:.2f}), skipping the LLM: {rules_context}")
+        state["context"] = rules_context
+        return state
+
     prompt = f"""
 Extract the following information from the topic.
 
@@ -31,11 +44,12 @@ Fields:
         schema=ContextSchema,
         json_output=True,
         cost_tracker=state["cost_tracker"],
+        deadline=state.get("deadline"),
     )
 
     # `context` is already a validated object
     print(context)
 
     # Convert to dict if your GraphState expects raw JSON
-    state["context"] = context.model_dump()
+    state["context"] = normalize_context(context.model_dump(), topic)
     return state
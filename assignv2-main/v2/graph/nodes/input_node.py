@@ -1,18 +1,49 @@
+import time
+from typing import Optional
+
 from graph.state import GraphState
 from tools.cost_tracker import CostTracker
 
 
-def input_node(topic: str) -> GraphState:
+def input_node(
+    topic: str,
+    pipeline: bool = False,
+    lazy_fetch: bool = False,
+    refresh: bool = False,
+    cascade: bool = False,
+    sectioned: bool = False,
+    deadline_s: Optional[float] = None,
+    debug_dir: Optional[str] = None,
+) -> GraphState:
+    """
+    Initial state; deadline_s is the run's time budget in seconds from now
+    (deadline mode), debug_dir a directory of its own for the debug snapshots.
+    """
+    if deadline_s is not None and not deadline_s > 0:
+        raise ValueError(f"deadline_s must be positive, got {deadline_s!r}")
     return {
         "topic": topic,
         "context": {},
         "subtopics": [],
         "search_queries": {},
         "search_results": {},
+        "quality_stats": {},
+        "review_speculation": None,
+        "node_stats": {},
         "expanded_results": {},
         "clusters": {},
         "cluster_summaries": {},
         "final_markdown": "",
         "citations": set(),
         "cost_tracker": CostTracker(),
+        "pipeline": pipeline,
+        "lazy_fetch": lazy_fetch,
+        "refresh": refresh,
+        "cascade": cascade,
+        "sectioned": sectioned,
+        "deadline": time.time() + deadline_s if deadline_s is not None else None,
+        "degradations": [],
+        "previous_run": None,
+        "changed_subtopics": [],
+        "debug_dir": debug_dir,
     }
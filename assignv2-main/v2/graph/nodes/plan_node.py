@@ -0,0 +1,89 @@
+from typing import List
+
+from tools.context_rules import normalize_context
+from tools.llm import call_llm
+from tools.plan_cache import get_plan, put_plan
+from graph.state import GraphState
+from graph.nodes.context_node import ContextSchema
+from rich import print
+
+PLANNER_SYSTEM = "You are a research planner."
+
+
+class PlanSchema(ContextSchema):
+    subtopics: List[str]
+
+
+def _planner_prompt(topic: str, domain: str) -> str:
+    """Line-per-subtopic planner prompt, streamed by plan_search on a cache miss."""
+    return f"""
+Generate 3 professional report subtopics for the topic "{topic}". These subtopics will be used for web searches, so include
+relevant keywords from the topic in each subtopic. 
+Domain: {domain}
+
+Rules:
+- no more than 8 words per subtopic
+- return each subtopic on a new line
+- no numbering, no bullet points, just the subtopic text
+- be specific and relevant to the main topic
+- include enough detail to guide focused web searches
+"""
+
+
+def _parse_subtopic(line: str) -> str:
+    return line.strip("- ").strip()
+
+
+def plan_node(state: GraphState) -> GraphState:
+    """
+    Context extraction and subtopic planning in one structured call, cached
+    per normalized topic (tools/plan_cache.py). On a cache hit no LLM call
+    is made. Pipelined runs leave planning to plan_search on a miss so the
+    planner output can be streamed.
+    """
+    topic = state["topic"]
+
+    cached = get_plan(topic)
+    if cached:
+        print(f"Using cached plan for topic {topic}")
+        state["context"] = cached["context"]
+        state["subtopics"] = cached["subtopics"]
+        return state
+
+    if state.get("pipeline"):
+        return state
+
+    prompt = f"""
+Extract the following information from the topic and plan the research.
+
+Topic: "{topic}"
+
+Fields:
+- geography (country or Global or null)
+- time_range (explicit year(s) or relative phrase)
+- domain (finance, awards, movies, other)
+- subtopics: 3 professional report subtopics. These subtopics will be used for web searches, so include
+  relevant keywords from the topic in each subtopic.
+
+Subtopic rules:
+- no more than 8 words per subtopic
+- no numbering, no bullet points, just the subtopic text
+- be specific and relevant to the main topic
+- include enough detail to guide focused web searches
+"""
+
+    plan = call_llm(
+        prompt=prompt,
+        system="You extract structured metadata from user prompts and plan research subtopics. You return only JSON.",
+        schema=PlanSchema,
+        cost_tracker=state["cost_tracker"],
+        deadline=state.get("deadline"),
+    )
+    print(plan)
+
+    subtopics = [_parse_subtopic(s) for s in plan.subtopics if _parse_subtopic(s)]
+    state["context"] = normalize_context(plan.model_dump(exclude={"subtopics"}), topic)
+    state["subtopics"] = subtopics
+    if subtopics:
+        put_plan(topic, state["context"], subtopics)
+    return state
@@ -0,0 +1,150 @@
+import os
+import queue
+import threading
+import time
+
+from graph.state import GraphState
+from graph.nodes.plan_node import PLANNER_SYSTEM, _planner_prompt, _parse_subtopic
+from graph.nodes.query_node import _time_query, build_queries
+from graph.nodes.search_node import (
+    search_query, search_hits, fetch_top_k, local_articles, store_articles, load_previous, save_search_results,
+    quality_gate,
+)
+from tools.deadline import degrade, past, work_cutoff
+from tools.llm import stream_llm_lines
+from tools.plan_cache import put_plan
+from tools.quality import format_stats
+from tools.run_store import seen_urls, merge_previous
+from rich import print
+
+PIPELINE_QUEUE_SIZE = 8
+PIPELINE_SEARCH_WORKERS = int(os.getenv("PIPELINE_SEARCH_WORKERS", "4"))
+
+_DONE = object()
+
+
+def plan_search_node(state: GraphState) -> GraphState:
+    """
+    Planner, query and search stages run as one pipeline: the planner's output
+    is streamed line by line and every subtopic is turned into queries and
+    searched as soon as its line arrives. Stages are connected by bounded
+    queues so a slow search stage applies backpressure instead of buffering.
+    """
+    topic = state["topic"]
+    context = state["context"]
+    domain = context.get("domain") or "general"
+    time_query = _time_query(context)
+    print("Generating subtopics (streaming) for topic " + topic + " in domain " + domain)
+
+    subtopic_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    query_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    lock = threading.Lock()
+    search_queries = {}
+    found = {}  # (subtopic, query index) -> articles
+    hits = {}  # lazy mode: subtopic -> hits collected so far
+    remaining = {}  # lazy mode: subtopic -> queries still in flight
+    errors = []
+    lazy = state.get("lazy_fetch")
+    previous = load_previous(state)
+    skip_urls = seen_urls(previous)
+    cutoff = work_cutoff(state)
+
+    def query_stage():
+        while True:
+            subtopic = subtopic_queue.get()
+            if subtopic is _DONE:
+                break
+            queries = build_queries(subtopic, context, time_query)
+            local = local_articles(queries[0], skip_urls) if queries else []
+            with lock:
+                search_queries[subtopic] = queries
+                remaining[subtopic] = len(queries)
+                if local:
+                    found[(subtopic, 0)] = local
+            if local:
+                print(f"[plan_search] {subtopic}: {len(local)} fresh documents in the local corpus, skipping web search")
+                continue
+            for i, q in enumerate(queries):
+                query_queue.put((subtopic, i, q))
+        for _ in range(PIPELINE_SEARCH_WORKERS):
+            query_queue.put(_DONE)
+
+    def search_stage():
+        while True:
+            item = query_queue.get()
+            if item is _DONE:
+                return
+            subtopic, i, q = item
+            try:
+                articles = search_hits(q, cutoff=cutoff) if lazy else search_query(q, skip_urls=skip_urls, cutoff=cutoff)
+            except Exception as exc:
+                print(f"[plan_search] Search failed for {q!r}: {exc}")
+                errors.append(exc)
+                articles = []
+            if not lazy:
+                articles = quality_gate(state, articles)
+                store_articles(articles, topic, subtopic)
+                with lock:
+                    found[(subtopic, i)] = articles
+                continue
+            # lazy mode: the worker finishing a subtopic's last query fetches its top-k
+            with lock:
+                hits.setdefault(subtopic, []).extend(articles)
+                remaining[subtopic] -= 1
+                last = remaining[subtopic] == 0
+            if last:
+                articles = fetch_top_k(hits[subtopic], topic, subtopic, skip_urls=skip_urls, cutoff=cutoff)
+                articles = quality_gate(state, articles)
+                store_articles(articles, topic, subtopic)
+                with lock:
+                    found[(subtopic, 0)] = articles
+
+    workers = [threading.Thread(target=query_stage, daemon=True)]
+    workers += [threading.Thread(target=search_stage, daemon=True) for _ in range(PIPELINE_SEARCH_WORKERS)]
+    for w in workers:
+        w.start()
+
+    started = time.monotonic()
+    subtopics = []
+    try:
+        for line in stream_llm_lines(
+            _planner_prompt(topic, domain),
+            system=PLANNER_SYSTEM,
+            cost_tracker=state["cost_tracker"],
+            deadline=state.get("deadline"),
+        ):
+            subtopic = _parse_subtopic(line)
+            if not subtopic or subtopic in subtopics:
+                continue
+            if not subtopics:
+                print(f"[plan_search] First subtopic after {time.monotonic() - started:.2f}s: {subtopic}")
+            subtopics.append(subtopic)
+            subtopic_queue.put(subtopic)
+    finally:
+        subtopic_queue.put(_DONE)
+        for w in workers:
+            w.join()
+
+    if errors and not any(found.values()):
+        raise errors[0]
+    if past(cutoff):
+        degrade(state, "plan_search", "stopped searching and fetching at the deadline cutoff")
+
+    search_results = {}
+    for subtopic in subtopics:
+        articles = []
+        for i in range(len(search_queries.get(subtopic, []))):
+            articles.extend(found.get((subtopic, i), []))
+        search_results[subtopic] = articles
+    search_results = merge_previous(search_results, previous)
+
+    print(subtopics)
+    print(f"Completed pipelined planning and web searches in {time.monotonic() - started:.2f}s.")
+    state["subtopics"] = subtopics
+    state["search_queries"] = {s: search_queries.get(s, []) for s in subtopics}
+    state["search_results"] = search_results
+    if subtopics:
+        put_plan(topic, context, subtopics)
+    save_search_results(state, search_results)
+    print(format_stats(state["quality_stats"]))
+    return state
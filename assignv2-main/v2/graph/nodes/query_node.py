@@ -1,45 +1,51 @@
 from graph.state import GraphState
-from datetime import datetime
+from tools.temporal import parse_time_range, search_terms
 
 
-def query_node(state: GraphState) -> GraphState:
-    context = state["context"]
-    subtopics = state["subtopics"]
-
-    year_now = datetime.now().year
+def _time_query(context) -> str:
     time_phrase = context.get("time_range")
 
-    # Convert relative time
-    if time_phrase == "last year":
-        time_query = str(year_now - 1)
-    elif time_phrase == "last three years":
-        time_query = f"{year_now-3} {year_now-2} {year_now-1}"
-    else:
-        time_query = time_phrase or ""
+    # Normalized range from context extraction; plans cached before it existed only have the phrase
+    date_range = context.get("date_range") or parse_time_range(time_phrase or "")
+    if date_range:
+        return search_terms(date_range)
+    return time_phrase or ""
 
-    queries = {}
 
-    for sub in subtopics:
-        base = f"{sub}"
+def build_queries(subtopic: str, context, time_query: str):
+    """Return the search query variants for a single subtopic."""
+    base = f"{subtopic}"
+
+    if context.get("geography"):
+        base += f" {context['geography']}"
+
+    if time_query:
+        base += f" {time_query}"
 
-        if context.get("geography"):
-            base += f" {context['geography']}"
+    base = base.strip()
 
-        if time_query:
-            base += f" {time_query}"
+    # Create 4 focused variants to ensure multiple searches per subtopic
+    variants = [
+        base,
+        f"{base} overview analysis",
+        f"{base} latest developments",
+        f"{base} key statistics data",
+        f"{base} expert commentary",
+    ][:4]
 
-        base = base.strip()
+    return variants
 
-        # Create 4 focused variants to ensure multiple searches per subtopic
-        variants = [
-            base,
-            f"{base} overview analysis",
-            f"{base} latest developments",
-            f"{base} key statistics data",
-            f"{base} expert commentary",
-        ][:4]
 
-        queries[sub] = variants
+def query_node(state: GraphState) -> GraphState:
+    context = state["context"]
+    subtopics = state["subtopics"]
+
+    time_query = _time_query(context)
+
+    queries = {}
+
+    for sub in subtopics:
+        queries[sub] = build_queries(sub, context, time_query)
 
     state["search_queries"] = queries
     return state
@@ -42,6 +42,7 @@ Content:
         prompt,
         system="You are an expert research report writer.",
         cost_tracker=state["cost_tracker"],
+        deadline=state.get("deadline"),
     )
 
     state["cost_tracker"].add(markdown)
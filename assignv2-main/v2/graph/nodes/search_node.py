@@ -1,47 +1,223 @@
+import json
+import os
+import threading
+import time
+
 from graph.state import GraphState
-from tools.web_search import web_search, fetch_page_text
+from tools.web_search import fetch_page_text
+from tools.search_executor import get_executor
+from tools.llm import count_tokens
+from tools.ranking import select_top_k
+from tools.run_store import load_run, seen_urls, merge_previous
+from tools.corpus import get_corpus, CORPUS_MIN_DOCS
+from tools.debug_output import debug_path
+from tools.quality import gate_articles, merge_stats, format_stats
+from tools.deadline import degrade, past, work_cutoff
 from rich import print
-from tqdm import tqdm
 
-def search_node(state: GraphState) -> GraphState:
-    search_queries = state["search_queries"]
+# lazy mode: full pages fetched per subtopic, the rest stay snippet-only
+FETCH_TOP_K = int(os.getenv("FETCH_TOP_K", "6"))
 
-    search_results = {}
-    print(search_queries)
+_quality_lock = threading.Lock()
 
-    for subtopic, queries in tqdm(search_queries.items(), desc="Searching subtopics"):
-        articles = []
 
-        for q in queries:
-            results = web_search(q, max_results=4)
-
-            for r in results:
-                content = fetch_page_text(r.get("url"))
-                if not content:
-                    continue  # discard items with no content (e.g., bot checks)
-                articles.append({
-                    "title": r.get("title"),
-                    "snippet": r.get("snippet"),
-                    "content": content,
-                    "url": r.get("url"),
-                    "query": q
-                })
+def _article(hit, content: str, q: str):
+    return {
+        "title": hit.get("title"),
+        "snippet": hit.get("snippet"),
+        "content": content,
+        "url": hit.get("url"),
+        "query": q
+    }
 
-        search_results[subtopic] = articles
-    print("Completed web searches for all subtopics.")
-    # print("Example item:", search_results[next(iter(search_results))][0] if search_results else "No results")
-    state["search_results"] = search_results
+
+def load_previous(state):
+    """Refresh mode: the previous run for this topic (loaded once and kept on the state), else None."""
+    if not state.get("refresh"):
+        return None
+    if state.get("previous_run") is None:
+        state["previous_run"] = load_run(state["topic"]) or {}
+    return state["previous_run"] or None
+
+
+def fetch_content(url: str) -> str:
+    """Page text from the local corpus when it is fresh enough, otherwise from the web."""
+    corpus = get_corpus()
+    cached = corpus.get(url) if corpus else None
+    if cached:
+        return cached["content"]
+    return fetch_page_text(url)
+
+
+def store_articles(articles, topic: str, subtopic: str):
+    """Keep fetched articles in the local corpus for later runs and related topics."""
+    corpus = get_corpus()
+    if corpus:
+        corpus.add(articles, topic, subtopic)
+
+
+def quality_gate(state, articles):
+    """
+    Strip per-domain boilerplate and drop or demote junk pages (see
+    tools.quality.gate_articles) before anything counts their tokens;
+    the stats are added to state["quality_stats"].
+    """
+    kept, stats = gate_articles(articles)
+    with _quality_lock:
+        merge_stats(state.setdefault("quality_stats", {}), stats)
+    return kept
+
+
+def local_articles(q: str, skip_urls=()):
+    """
+    Local retrieval pass: fresh corpus documents matching the subtopic's base
+    query, or [] when there are too few to cover it without going to the web.
+    """
+    corpus = get_corpus()
+    if not corpus:
+        return []
+    docs = [d for d in corpus.search(q) if d["url"] not in skip_urls]
+    if len(docs) < CORPUS_MIN_DOCS:
+        return []
+    articles = []
+    for d in docs:
+        article = _article(d, d["content"], d["query"])
+        article["from_corpus"] = True
+        articles.append(article)
+    return articles
+
+
+def _snippet_article(hit, q: str):
+    article = _article(hit, "", q)
+    article["snippet_only"] = True
+    return article
+
+
+def fetch_results(results, q: str, skip_urls=(), cutoff=None):
+    """
+    Fetch the content of every search result not in skip_urls. Results
+    reached after `cutoff` (deadline mode) are kept snippet-only unfetched.
+    """
+    articles = []
+    for r in results:
+        if r.get("url") in skip_urls:
+            continue  # refresh mode: already have it from the previous run
+        if past(cutoff):
+            articles.append(_snippet_article(r, q))
+            continue
+        content = fetch_content(r.get("url"))
+        if not content:
+            continue  # discard items with no content (e.g., bot checks)
+        articles.append(_article(r, content, q))
+    return articles
+
+
+def search_query(q: str, max_results: int = 4, skip_urls=(), cutoff=None):
+    """Run one (rate-limited) web search and fetch the content of every hit not in skip_urls."""
+    return fetch_results(get_executor().search(q, max_results=max_results, cutoff=cutoff), q, skip_urls, cutoff)
+
+
+def search_hits(q: str, max_results: int = 4, cutoff=None):
+    """Run one (rate-limited) web search and return title/snippet hits without fetching pages."""
+    return [{**r, "query": q} for r in get_executor().search(q, max_results=max_results, cutoff=cutoff)]
+
+
+def fetch_top_k(hits, topic: str, subtopic: str, k: int = FETCH_TOP_K, skip_urls=(), cutoff=None):
+    """
+    Fetch full content only for the k best hits of a subtopic (see
+    tools.ranking.select_top_k) and keep the rest as snippet-only citations.
+    A hit whose page yields no content is dropped and the next best hit is
+    fetched in its place, so coverage does not shrink. Hits in skip_urls
+    are ignored; after `cutoff` (deadline mode) nothing more is fetched.
+    """
+    hits = [h for h in hits if h.get("url") not in skip_urls]
+    selected, rest = select_top_k(hits, topic, subtopic, k)
+    fetched, snippet_only = [], []
+    for hit in selected + rest:
+        if len(fetched) < k and not past(cutoff):
+            content = fetch_content(hit.get("url"))
+            if content:
+                fetched.append(_article(hit, content, hit.get("query")))
+            continue  # discard items with no content (e.g., bot checks)
+        snippet_only.append(_snippet_article(hit, hit.get("query")))
+    print(f"[search] {subtopic}: fetched {len(fetched)} of {len(selected) + len(rest)} unique hits, {len(snippet_only)} kept snippet-only")
+    return fetched + snippet_only
+
+
+def save_search_results(state, search_results):
+    """Write the debug snapshot and report how many tokens in title + snippet + content."""
     # save to a json fioe
-    with open("debug_search_results.json", "w", encoding="utf-8") as f:
-        import json
+    with open(debug_path(state, "search_results.json", "debug_search_results.json"), "w", encoding="utf-8") as f:
         json.dump(search_results, f, ensure_ascii=False, indent=4)
-    # report how many tokens in title + snippet + content
     total_tokens = 0
     for subtopic, articles in search_results.items():
         for a in articles:
-            from tools.llm import count_tokens
             text = (a.get("title") or "") + " " + (a.get("snippet") or "") + " " + (a.get("content") or "")
             total_tokens += count_tokens(text)
     print(f"Total tokens in search results: {total_tokens}")
+
+
+def search_node(state: GraphState) -> GraphState:
+    from tqdm import tqdm
+
+    search_queries = state["search_queries"]
+
+    search_results = {}
+    print(search_queries)
+    previous = load_previous(state)
+    skip_urls = seen_urls(previous)
+
+    pending = {}
+    for subtopic, queries in search_queries.items():
+        articles = local_articles(queries[0], skip_urls) if queries else []
+        if articles:
+            print(f"[search] {subtopic}: {len(articles)} fresh documents in the local corpus, skipping web search")
+            search_results[subtopic] = articles
+        else:
+            pending[subtopic] = queries
+
+    # every remaining query is dispatched at once under the shared rate limit; results keep query order
+    all_queries = [q for queries in pending.values() for q in queries]
+    cutoff = work_cutoff(state)
+    started = time.monotonic()
+    hit_lists = iter(get_executor().search_many(all_queries, cutoff=cutoff))
+    print(f"[search] {len(all_queries)} queries answered in {time.monotonic() - started:.2f}s")
+    if all_queries and past(cutoff):
+        degrade(state, "search", "stopped starting searches at the deadline cutoff")
+    pending_results = {subtopic: [(q, next(hit_lists)) for q in queries] for subtopic, queries in pending.items()}
+
+    # the search review's first step needs only titles and snippets: start it now, overlapping the page fetches
+    from graph.nodes.search_review_node import start_review_speculation
+
+    start_review_speculation(state, {
+        **search_results,
+        **{subtopic: [{**r, "query": q} for q, rs in results for r in rs] for subtopic, results in pending_results.items()},
+    })
+
+    for subtopic, results in tqdm(pending_results.items(), desc="Fetching subtopics"):
+        articles = []
+        if state.get("lazy_fetch"):
+            # phase 1: titles and snippets only; phase 2: fetch the top-k
+            hits = [{**r, "query": q} for q, rs in results for r in rs]
+            articles = fetch_top_k(hits, state["topic"], subtopic, skip_urls=skip_urls, cutoff=cutoff)
+        else:
+            for q, rs in results:
+                articles.extend(fetch_results(rs, q, skip_urls=skip_urls, cutoff=cutoff))
+
+        articles = quality_gate(state, articles)
+        search_results[subtopic] = articles
+        store_articles(articles, state["topic"], subtopic)
+    search_results = {s: search_results[s] for s in search_queries}
+    if pending and past(cutoff):
+        degrade(state, "search", "stopped fetching pages at the deadline cutoff, remaining hits kept snippet-only")
+    print("Completed web searches for all subtopics.")
+    if previous:
+        new_count = sum(len(v) for v in search_results.values())
+        search_results = merge_previous(search_results, previous)
+        print(f"Refresh: {new_count} new articles, {len(skip_urls)} reused from the previous run.")
+    # print("Example item:", search_results[next(iter(search_results))][0] if search_results else "No results")
+    state["search_results"] = search_results
+    save_search_results(state, search_results)
+    print(format_stats(state["quality_stats"]))
     return state
 
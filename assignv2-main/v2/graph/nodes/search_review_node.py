@@ -1,29 +1,38 @@
+import copy
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 
 from graph.state import GraphState
-from tools.web_search import web_search, fetch_page_text
+from tools.search_executor import get_executor
+from graph.nodes.search_node import _article, fetch_content, store_articles, quality_gate
+from tools.quality import format_stats
+from tools.coverage import SNIPPET_WEIGHTS, CoverageEstimator
+from tools.debug_output import debug_path
+from tools.deadline import DEADLINE_REVIEW_MIN_S, degrade, past, time_left, work_cutoff
 from tools.llm import call_llm, count_tokens
 from pydantic import BaseModel, Field
 from rich import print
 
 
-class Decision(BaseModel):
-    should_search_more: bool = Field(...)
-    reason: str
-    suggested_queries: List[str] = Field(default_factory=list)
+TOKEN_CAP = 250_000
+QUERIES_PER_SUBTOPIC = 2  # proposed per under-covered subtopic and iteration
+TITLES_PER_SUBTOPIC = 8  # collected titles shown with each under-covered subtopic
+MAX_REVIEW_ITERATIONS = int(os.getenv("REVIEW_MAX_ITERATIONS", "3"))
+REVIEW_TIME_LIMIT_S = float(os.getenv("REVIEW_TIME_LIMIT_S", "120"))
+REVIEW_FETCH_WORKERS = int(os.getenv("REVIEW_FETCH_WORKERS", "6"))  # concurrent page fetches for follow-up queries
 
 
-def _token_tally(articles: List[Dict]) -> int:
-    """Count tokens in title + snippet only (no summaries)."""
-    total = 0
-    for a in articles:
-        combined = " ".join([
-            a.get("title", ""),
-            a.get("snippet", ""),
-        ])
-        total += count_tokens(combined)
-    return total
+class SubtopicQueries(BaseModel):
+    subtopic: str
+    queries: List[str] = Field(default_factory=list)
+
+
+class QueryProposal(BaseModel):
+    proposals: List[SubtopicQueries] = Field(default_factory=list)
 
 
 def _content_token_tally(articles: List[Dict]) -> int:
@@ -39,83 +48,266 @@ def _content_token_tally(articles: List[Dict]) -> int:
     return total
 
 
+def _propose_queries(state, estimator: CoverageEstimator, flagged: List[str], search_results, asked: set):
+    """One LLM call for focused queries for the under-covered subtopics only: (subtopic, query) pairs not asked before."""
+    titles = []
+    for subtopic in flagged:
+        titles.append(f"Subtopic: {subtopic}")
+        titles.extend(f"- {a.get('title', '')}" for a in search_results.get(subtopic, [])[:TITLES_PER_SUBTOPIC])
+    previous = ", ".join(sorted(asked)) or "(none)"
+    prompt = f"""
+The research topic is: {state["topic"]}
+These subtopics are under-covered by the articles collected so far:
+{estimator.summary(flagged)}
+
+Titles already collected:
+{chr(10).join(titles)}
+
+Queries already run: {previous}
+
+Propose 1-{QUERIES_PER_SUBTOPIC} focused web search queries for each listed subtopic that would find material
+the collected articles lack. Use the subtopic names exactly as given. Do not repeat earlier queries.
+"""
+    proposal = call_llm(
+        prompt=prompt,
+        system="You are a concise research operations advisor. Respond with JSON only.",
+        schema=QueryProposal,
+        cost_tracker=state["cost_tracker"],
+        deadline=state.get("deadline"),
+    )
+    by_name = {s.strip().lower(): s for s in flagged}
+    queries = []
+    for p in proposal.proposals:
+        subtopic = by_name.get(p.subtopic.strip().lower(), flagged[0] if len(flagged) == 1 else None)
+        if subtopic is None:
+            continue  # a subtopic the model made up
+        for q in p.queries[:QUERIES_PER_SUBTOPIC]:
+            if q not in asked and q not in (query for _, query in queries):
+                queries.append((subtopic, q))
+    return queries
+
+
+class _Speculation:
+    """A review step running in the background; cancel() stops it before its LLM call or its searches."""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def result(self):
+        return self.future.result()
+
+
+def _speculate(state, estimator: CoverageEstimator, hits_by_subtopic, search_results, asked: set) -> _Speculation:
+    """
+    Start the next review step in the background from titles and snippets
+    only, while the pages behind `hits_by_subtopic` are still being
+    fetched: estimate coverage as if those pages had arrived, propose
+    queries for the subtopics that look under-covered and run their
+    searches. Its result is {"flagged", "queries", "hits"}; the review
+    loop keeps only what the content-based estimate still flags, and
+    cancels the step when it stops without using it.
+    """
+    snapshot = copy.deepcopy(estimator)
+    search_results = {s: list(articles) for s, articles in search_results.items()}
+    asked = set(asked)
+    speculation = _Speculation()
+    nothing = {"flagged": [], "queries": [], "hits": []}
+
+    def run():
+        for subtopic, hits in hits_by_subtopic.items():
+            # counted as full articles: their pages are being fetched
+            snapshot.add(subtopic, [{**h, "content": h.get("snippet") or ""} for h in hits], initial=True)
+        flagged = [s for s in snapshot.flagged(min_novelty=0.0, weights=SNIPPET_WEIGHTS) if s in hits_by_subtopic]
+        if not flagged or speculation.cancelled.is_set():
+            return nothing
+        titles = {s: search_results.get(s, []) + hits_by_subtopic.get(s, []) for s in flagged}
+        queries = _propose_queries(state, snapshot, flagged, titles, asked)
+        if speculation.cancelled.is_set():
+            return nothing
+        hits = get_executor().search_many([q for _, q in queries], cutoff=work_cutoff(state))
+        return {"flagged": flagged, "queries": queries, "hits": hits}
+
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="review-speculation")
+    speculation.future = pool.submit(run)
+    pool.shutdown(wait=False)
+    return speculation
+
+
+def _can_iterate(state, iteration: int, max_iterations: int, total_tokens: int, started: float) -> bool:
+    """Whether the review loop's bounds (iterations, token cap, time limit, deadline) allow another iteration."""
+    left = time_left(state)
+    return (
+        iteration < max_iterations
+        and total_tokens < TOKEN_CAP
+        and time.monotonic() - started < REVIEW_TIME_LIMIT_S
+        and (left is None or left >= DEADLINE_REVIEW_MIN_S)
+    )
+
+
+def start_review_speculation(state, hits_by_subtopic):
+    """
+    Called by search_node once the first search hits are in: unless the
+    review will not run (refresh run, no iterations, too close to the
+    deadline), its first step starts now, overlapping with page fetching.
+    """
+    left = time_left(state)
+    if state.get("previous_run") or not MAX_REVIEW_ITERATIONS or (left is not None and left < DEADLINE_REVIEW_MIN_S):
+        return
+    state["review_speculation"] = _speculate(state, CoverageEstimator(state["topic"]), hits_by_subtopic, {}, set())
+
+
+def _take_speculation(speculation, flagged: List[str], asked: set):
+    """(subtopics the speculation covered, its queries for subtopics still flagged, their search hits)."""
+    if speculation is None:
+        return set(), [], []
+    try:
+        result = speculation.result()
+    except Exception as exc:
+        print(f"[search_review] Speculative review step failed: {exc}")
+        return set(), [], []
+    queries, hits = [], []
+    for (subtopic, q), results in zip(result["queries"], result["hits"]):
+        if subtopic in flagged and q not in asked:
+            queries.append((subtopic, q))
+            hits.append(results)
+    dropped = len(result["queries"]) - len(queries)
+    if dropped:
+        print(f"[search_review] Dropped {dropped} speculative queries for subtopics the fetched pages already cover.")
+    return set(result["flagged"]) & set(flagged), queries, hits
+
+
+def _fetch_followups(state, queries, hit_lists, seen_urls: set, cutoff, started: float):
+    """Fetch the unseen pages of every follow-up hit concurrently; returns {subtopic: gated articles}."""
+    jobs = []
+    for (subtopic, q), results in zip(queries, hit_lists):
+        for r in results:
+            if r.get("url") in seen_urls:
+                continue
+            seen_urls.add(r.get("url"))
+            jobs.append((subtopic, q, r))
+
+    def fetch(job):
+        subtopic, q, r = job
+        if time.monotonic() - started >= REVIEW_TIME_LIMIT_S or past(cutoff):
+            return subtopic, None
+        content = fetch_content(r.get("url"))
+        return subtopic, _article(r, content, q) if content else None
+
+    batches = {subtopic: [] for subtopic, _ in queries}
+    with ThreadPoolExecutor(max_workers=max(1, min(REVIEW_FETCH_WORKERS, len(jobs))), thread_name_prefix="review-fetch") as pool:
+        for subtopic, article in pool.map(fetch, jobs):
+            if article:
+                batches[subtopic].append(article)
+    return {subtopic: quality_gate(state, batch) for subtopic, batch in batches.items()}
+
+
 def search_review_node(state: GraphState) -> GraphState:
+    """
+    Follow-up searches for under-covered subtopics.
+    A local estimator (tools/coverage.py) scores every subtopic and decides
+    whether to search more; the LLM is only asked for queries for the
+    subtopics it flags. Each step is speculated from snippets while the
+    previous pages are still being fetched (see _speculate), so its LLM
+    call and searches are usually done by the time they are needed.
+    """
     search_results = state.get("search_results", {})
 
-    # iterative loop
-    while True:
-        # compute token counts:
-        # - snippet+title for decision prompt (what LLM sees)
-        # - content+snippet+title for final summary budget (hard limit)
-        snippet_tokens = 0
-        total_tokens = 0
-        for _, articles in search_results.items():
-            snippet_tokens += _token_tally(articles)
-            total_tokens += _content_token_tally(articles)
-
-        print(f"[search_review] Token tally - Decision (title+snippet): {snippet_tokens}, Summary budget (title+snippet+content): {total_tokens}")
-
-        # hard stop at 250k based on full content
-        if total_tokens >= 250_000:
-            print("Token cap reached (250k). Stopping further search.")
-            break
-
-        # build snippets+title list for LLM decision
-        snippet_lines = []
-        for subtopic, articles in search_results.items():
-            for a in articles[:4]:  # keep prompt bounded
-                snippet_lines.append(
-                    f"Subtopic: {subtopic}\nTitle: {a.get('title','')}\nSnippet: {(a.get('snippet') or '')[:400]}"
-                )
-        snippet_text = "\n\n".join(snippet_lines)
-
-        prompt = f"""
-You are advising whether to continue web searches for a research task.
-Review the provided titles and snippets. If we already have diverse material and token budget is reasonable, suggest stopping.
-Otherwise, suggest focused new queries to fill gaps or deepen coverage.
-Current tokens for decision: {snippet_tokens} (title+snippet).
-Full content tokens for final summary: {total_tokens}. Hard limit is 250k.
-
-Titles and snippets (sampled):
-{snippet_text}
-
-Advise: should we search more? If yes, suggest 1-3 focused queries.
-"""
+    # running tallies, computed once here and then only updated with new articles:
+    # content+snippet+title for the final summary budget (hard limit) and the coverage estimate
+    tokens = {}
+    estimator = CoverageEstimator(state["topic"])
+    for subtopic, articles in search_results.items():
+        tokens[subtopic] = _content_token_tally(articles)
+        estimator.add(subtopic, articles, initial=True)
+    total_tokens = sum(tokens.values())
+    seen_urls = {a.get("url") for articles in search_results.values() for a in articles}
+    asked_queries = set()
+    speculation, state["review_speculation"] = state.get("review_speculation"), None
+
+    started = time.monotonic()
+    iteration = 0
+    max_iterations = MAX_REVIEW_ITERATIONS
+    if state.get("previous_run"):
+        # refresh runs build on the previous run's already reviewed coverage
+        print("[search_review] Refresh run: skipping search review.")
+        max_iterations = 0
+    cutoff = work_cutoff(state)
+    left = time_left(state)
+    if max_iterations and left is not None and left < DEADLINE_REVIEW_MIN_S:
+        degrade(state, "search_review", "skipped the review loop")
+        max_iterations = 0
+
+    # iterative loop, bounded by token cap, iteration count and wall clock
+    try:
+        while True:
+            print(f"[search_review] Summary budget (title+snippet+content): {total_tokens} tokens\nCoverage:\n{estimator.summary()}")
+
+            # hard stop at 250k based on full content
+            if total_tokens >= TOKEN_CAP:
+                print("Token cap reached (250k). Stopping further search.")
+                break
+            if iteration >= max_iterations:
+                if max_iterations:
+                    print(f"[search_review] Reached {max_iterations} review iterations. Stopping further search.")
+                break
+            if time.monotonic() - started >= REVIEW_TIME_LIMIT_S:
+                print(f"[search_review] Review time limit ({REVIEW_TIME_LIMIT_S:.0f}s) reached. Stopping further search.")
+                break
+            left = time_left(state)
+            if left is not None and left < DEADLINE_REVIEW_MIN_S:
+                degrade(state, "search_review", f"stopped the review loop after {iteration} iterations")
+                break
+            flagged = estimator.flagged()
+            if not flagged:
+                print("[search_review] Every subtopic is covered, or its last searches added nothing new. Stopping further search.")
+                break
+            iteration += 1
+
+            # the speculated step covers the subtopics it foresaw; only the others need an LLM call and searches now
+            speculated, queries, hit_lists = _take_speculation(speculation, flagged, asked_queries)
+            speculation = None
+            from_speculation = len(queries)
+            unforeseen = [s for s in flagged if s not in speculated]
+            if unforeseen:
+                proposed = [(s, q) for s, q in _propose_queries(state, estimator, unforeseen, search_results, asked_queries)
+                            if q not in (query for _, query in queries)]
+                queries += proposed
+                hit_lists += get_executor().search_many([q for _, q in proposed], cutoff=cutoff)
+            print(f"[search_review] Under-covered: {flagged}; queries: {queries} ({from_speculation} from the speculative step)")
+            if not queries:
+                break
+            asked_queries.update(q for _, q in queries)
+
+            # speculate the next step from these hits while their pages are fetched, if another step can run
+            if _can_iterate(state, iteration, max_iterations, total_tokens, started):
+                hits_by_subtopic = {}
+                for (subtopic, _), results in zip(queries, hit_lists):
+                    hits_by_subtopic.setdefault(subtopic, []).extend(r for r in results if r.get("url") not in seen_urls)
+                speculation = _speculate(state, estimator, hits_by_subtopic, search_results, asked_queries)
 
-        decision = call_llm(
-            prompt=prompt,
-            system="You are a concise research operations advisor. Respond with JSON only.",
-            schema=Decision,
-                cost_tracker=state["cost_tracker"],
-        )
-
-        print(f"[search_review] Decision: {decision}")
-
-        if not decision.should_search_more or not decision.suggested_queries:
-            break
-
-        # run additional searches per suggested query
-        for q in decision.suggested_queries:
-            results = web_search(q, max_results=4)
-            for r in results:
-                content = fetch_page_text(r.get("url"))
-                if not content:
-                    continue
-                article = {
-                    "title": r.get("title"),
-                    "snippet": r.get("snippet"),
-                    "content": content,
-                    "url": r.get("url"),
-                    "query": q,
-                }
-
-                # assign to a generic subtopic bucket for new queries
-                search_results.setdefault("additional", []).append(article)
+            # fetch into the subtopic each query was proposed for; an empty batch counts as zero novelty,
+            # so the subtopic is not flagged again
+            batches = _fetch_followups(state, queries, hit_lists, seen_urls, cutoff, started)
+            for subtopic in flagged:
+                batch = batches.get(subtopic, [])
+                search_results.setdefault(subtopic, []).extend(batch)
+                tokens[subtopic] = tokens.get(subtopic, 0) + _content_token_tally(batch)
+                store_articles(batch, state["topic"], subtopic)
+                estimator.add(subtopic, batch)
+            total_tokens = sum(tokens.values())
+    finally:
+        if speculation is not None:
+            speculation.cancel()  # the loop stopped without using it: no LLM call or searches
 
     # persist snapshot
-    with open("debug_search_results.json", "w", encoding="utf-8") as f:
+    with open(debug_path(state, "search_results.json", "debug_search_results.json"), "w", encoding="utf-8") as f:
         json.dump(search_results, f, ensure_ascii=False, indent=2)
 
     state["search_results"] = search_results
     state["token_estimate"] = total_tokens
+    print(format_stats(state.get("quality_stats", {})))
     return state
@@ -1,16 +1,45 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from typing import List
+
+from pydantic import BaseModel
+
 from graph.state import GraphState
-from tools.llm import call_gemini, count_tokens
+from tools.compress import COMPRESS_RATIO, compress_text
+from tools.debug_output import debug_path
+from tools.deadline import DEADLINE_FULL_SUMMARY_S, DEADLINE_LLM_MIN_S, DEADLINE_SUMMARY_TOKENS, degrade, time_left
+from tools.llm import call_gemini, call_llm, count_tokens, ContextOverflowError, NANO_MODEL, MINI_MODEL
+from tools.report_check import check_report, check_section
+from tools.report_stitch import stitch_report
+from tools.run_store import changed_subtopics, content_hash, save_run
 import json
 import os
+import time
 
+REPORT_SYSTEM = (
+    "You are an expert research report writer. Output valid HTML only with numbered citations [1], [2], etc. "
+    "in the text and APA 7 formatted references section at the end. Use <b> tags for bold, <i> tags for italics. "
+    "IMPORTANT: BOLD ALL HEADINGS by wrapping them in <b></b> tags. Example: <h2><b>Section Title</b></h2>. "
+    "Limit to 7-8 most important sources. Do not create tables. Do NOT emit <br> tags. Do NOT leave unclosed tags. Do not put unnecessary artifacts. Keep citations closest to the text, not only at the end of every paragraph."
+)
+SECTION_SYSTEM = (
+    "You are an expert research report writer. You write one body section of a larger HTML report. "
+    "Output valid HTML only: one <h2><b>heading</b></h2> followed by <p>, <h3>, <ul>/<li> content, with numbered "
+    "citations [1], [2], etc. that refer to the numbered sources you are given. Use <b> tags for bold, <i> tags for italics. "
+    "Do not write an Executive Summary, a conclusion for the whole report or a References section. "
+    "Do not create tables. Do NOT emit <br> tags. Do NOT leave unclosed tags. Keep citations closest to the text."
+)
+MAX_INPUT_TOKENS = 250_000  # summarizer input cap, shared between sections in sectioned mode
+SECTION_WORKERS = int(os.getenv("SECTION_WORKERS", "4"))
+SECTION_MAX_SOURCES = 10  # evidence articles per section, numbered [1]..[k]
+DIGEST_SOURCES = 5  # sources per subtopic in the no-LLM deadline fallback
+MAX_INPUT_SHRINKS = 2  # smaller resends after a context-overflow error
+SHRINK_FACTOR = 0.7  # used when the error does not say by how much the prompt overflowed
 
-def summarize_node(state: GraphState) -> GraphState:
-    """Generate a single final markdown report from all search results."""
-    search_results = state.get("search_results", {})
-    topic = state["topic"]
-    context = state["context"]
 
-    # Aggregate all content and snippets into one text block
+def _build_material(search_results, citations: set) -> str:
+    """Aggregate all content and snippets into one text block, collecting cited URLs."""
     all_material = []
     for subtopic, articles in search_results.items():
         all_material.append(f"\n### {subtopic}\n")
@@ -28,12 +57,414 @@ def summarize_node(state: GraphState) -> GraphState:
             all_material.append(item_text)
 
             if url:
-                state["citations"].add(url)
+                citations.add(url)
+
+    return "\n".join(all_material)
+
+
+class SectionPlan(BaseModel):
+    subtopic: str
+    heading: str
+    key_points: List[str]
+
+
+class OutlineSchema(BaseModel):
+    title: str
+    executive_summary: str
+    sections: List[SectionPlan]
+
+
+def _complete(build_prompt, material: str, state, model: str = MINI_MODEL,
+              system: str = REPORT_SYSTEM, max_tokens: int = 10000) -> str:
+    """
+    One report call; call_gemini already retries transient errors. If the
+    prompt overflows the context window, the material is cut (from the end,
+    like the 250k cap) by the reported overflow and sent again.
+    """
+    for shrink in range(MAX_INPUT_SHRINKS + 1):
+        try:
+            markdown = call_gemini(
+                build_prompt(material),
+                system=system,
+                max_tokens=max_tokens,
+                cost_tracker=state["cost_tracker"],
+                model=model,
+                deadline=state.get("deadline"),
+            )
+            break
+        except ContextOverflowError as exc:
+            if shrink == MAX_INPUT_SHRINKS:
+                raise
+            ratio = SHRINK_FACTOR
+            if exc.limit and exc.requested:
+                ratio = min(SHRINK_FACTOR, 0.95 * exc.limit / exc.requested)
+            material = material[:int(len(material) * ratio)]
+            state["cost_tracker"].add_retry_event("input_shrink")
+            print(f"[summarize] Prompt exceeded the context window, resending with material cut to {ratio:.0%} (~{count_tokens(material)} tokens).")
+
+    # Sanitize common HTML issues that break ReportLab parsing
+    return markdown.replace("<br>", " ").replace("<br/>", " ").replace("<br />", " ")
+
+
+def _generate(build_prompt, material: str, state, check=check_report, **kwargs) -> str:
+    """
+    Generate with MINI_MODEL, or in cascade mode draft with the 4x cheaper
+    NANO_MODEL first and escalate to MINI_MODEL only when the draft fails
+    the local checks (`check` returns the problems found). Other keyword
+    arguments go to _complete. Close to the deadline only NANO_MODEL is used.
+    """
+    if _short_on_time(state):
+        degrade(state, "summarize", f"generated with {NANO_MODEL} only")
+        return _complete(build_prompt, material, state, model=NANO_MODEL, **kwargs)
+    if not state.get("cascade"):
+        return _complete(build_prompt, material, state, **kwargs)
+
+    draft = _complete(build_prompt, material, state, model=NANO_MODEL, **kwargs)
+    problems = check(draft)
+    state["cost_tracker"].add_cascade(escalated=bool(problems))
+    if not problems:
+        print(f"[summarize] Cascade: {NANO_MODEL} draft passed the checks.")
+        return draft
+    print(f"[summarize] Cascade: {NANO_MODEL} draft failed ({'; '.join(problems)}), escalating to {MINI_MODEL}.")
+    return _complete(build_prompt, material, state, **kwargs)
+
+
+def _short_on_time(state) -> bool:
+    left = time_left(state)
+    return left is not None and left < DEADLINE_FULL_SUMMARY_S
+
+
+def _compressed_results(search_results, topic: str):
+    """
+    Copies of the articles with page content shrunk to ~COMPRESS_RATIO by
+    extractive compression against the topic and subtopic (see
+    tools/compress.py); snippets and titles are kept whole.
+    """
+    if COMPRESS_RATIO >= 1:
+        return search_results
+    compressed = {
+        subtopic: [{**a, "content": compress_text(a["content"], f"{topic} {subtopic}")} if a.get("content") else a for a in items]
+        for subtopic, items in search_results.items()
+    }
+    before = sum(count_tokens(a.get("content") or "") for items in search_results.values() for a in items)
+    after = sum(count_tokens(a.get("content") or "") for items in compressed.values() for a in items)
+    print(f"[summarize] Extractive compression: {before} -> {after} content tokens.")
+    return compressed
+
+
+def _trimmed_results(search_results, max_tokens: int):
+    """Copies of the articles with page content cut evenly so the material fits ~max_tokens (approx 4 chars/token)."""
+    articles = [a for items in search_results.values() for a in items]
+    fixed = sum(len(a.get("title") or "") + len(a.get("snippet") or "") + len(a.get("url") or "") + 40 for a in articles)
+    with_content = sum(1 for a in articles if a.get("content")) or 1
+    budget = max(0, (max_tokens * 4 - fixed) // with_content)
+    return {
+        subtopic: [{**a, "content": (a.get("content") or "")[:budget]} for a in items]
+        for subtopic, items in search_results.items()
+    }
+
+
+def _digest_report(state) -> str:
+    """
+    Deadline fallback that needs no LLM call: per subtopic, the titles and
+    search snippets of its top sources, cited and listed in References.
+    """
+    sections = []
+    for subtopic, articles in state.get("search_results", {}).items():
+        sources = _section_sources(articles)[:DIGEST_SOURCES]
+        if not sources:
+            continue
+        items = []
+        for n, a in enumerate(sources, start=1):
+            snippet = re.sub(r"\[\d+\]", "", a.get("snippet") or "")  # keep the snippet's own brackets out of the citations
+            items.append(f"<li><b>{escape(a.get('title') or '')}</b>: {escape(snippet)} [{n}]</li>")
+        sections.append({"html": f"<h2><b>{escape(subtopic)}</b></h2><ul>{''.join(items)}</ul>", "sources": sources})
+        state["citations"].update(a["url"] for a in sources if a.get("url"))
+    summary = (
+        "This report lists the most relevant sources found for each subtopic together with their search snippets. "
+        "It was assembled without model summarization because the run's deadline left no time for it."
+    )
+    return stitch_report(state["topic"], summary, sections)
+
+
+def _finish(state, markdown: str, save: bool = True) -> GraphState:
+    # Save output to JSON
+    output_data = {
+        "topic": state["topic"],
+        "final_markdown": markdown,
+        "citations": list(state["citations"])
+    }
+    if state.get("previous_run"):
+        output_data["changed_subtopics"] = state.get("changed_subtopics", [])
+    if state.get("degradations"):
+        output_data["degradations"] = state["degradations"]
+
+    with open(debug_path(state, "summarize_output.json", "debug_outputs/summarize_output.json"), "w", encoding="utf-8") as f:
+        json.dump(output_data, f, ensure_ascii=False, indent=2)
+
+    state["cost_tracker"].add(markdown)
+    state["final_markdown"] = markdown
+    state["cluster_summaries"] = {"report": [markdown]}  # for pdf_node compatibility
+    if save and not any(d["node"] == "summarize" for d in state.get("degradations", [])):
+        save_run(state)  # a degraded report is not a baseline for refresh runs
+    return state
+
+
+def _refresh_report(state, previous) -> GraphState:
+    """
+    Refresh mode: reuse the previous report when no subtopic changed
+    materially; otherwise send only the previous report plus the new
+    material of the changed subtopics and have the model update the affected
+    sections, instead of regenerating from the full article set.
+    """
+    search_results = state.get("search_results", {})
+    changed = changed_subtopics(search_results, previous)
+    state["changed_subtopics"] = changed
+    _build_material(search_results, state["citations"])
+
+    if not changed:
+        # the saved run stays the baseline, so new articles keep adding up until a subtopic crosses the threshold
+        print("[summarize] Refresh: no subtopic changed materially, reusing the previous report.")
+        state["citations"] = set(previous.get("citations", []))
+        return _finish(state, previous["final_markdown"], save=False)
+
+    old_hashes = {a.get("hash") for articles in previous["search_results"].values() for a in articles}
+    new_results = _compressed_results({
+        subtopic: [a for a in search_results[subtopic] if content_hash(a) not in old_hashes]
+        for subtopic in changed
+    }, state["topic"])
+    new_material = _build_material(new_results, set())
+    print(f"[summarize] Refresh: updating sections for {changed} ({count_tokens(new_material)} new material tokens).")
+
+    context = state["context"]
+
+    def build_prompt(material: str) -> str:
+        return f"""You are updating an existing HTML research report with newly found material.
+
+Topic: {state["topic"]}
+Geography: {context.get('geography')}
+Time range: {context.get('time_range')}
+Domain: {context.get('domain')}
+
+Subtopics with new material: {", ".join(changed)}
+
+INSTRUCTIONS:
+- Return the complete updated report as HTML in the same format as the existing report
+- Rewrite only the sections (and the Executive Summary, if needed) affected by the new material
+- Keep every other section exactly as it is, word for word
+- Keep existing citation numbers; give new sources the next free numbers and append them to the References section in APA 7 style
+- Keep the 7-8 most important sources overall
+
+Existing report:
+{previous["final_markdown"]}
+
+New material:
+{material}
+"""
+
+    return _finish(state, _generate(build_prompt, new_material, state))
+
+
+def _section_sources(articles) -> list:
+    """The section's evidence: its articles deduplicated by URL, at most SECTION_MAX_SOURCES."""
+    sources, seen = [], set()
+    for a in articles:
+        key = a.get("url") or a.get("title")
+        if key in seen:
+            continue
+        seen.add(key)
+        sources.append(a)
+    return sources[:SECTION_MAX_SOURCES]
 
-    combined_material = "\n".join(all_material)
+
+def _numbered_material(sources) -> str:
+    items = []
+    for n, a in enumerate(sources, start=1):
+        item_text = f"[{n}] **{a.get('title', '')}** (source: {a.get('url', '')})\n"
+        if a.get("snippet"):
+            item_text += f"Summary: {a['snippet']}\n"
+        if a.get("content"):
+            item_text += f"Full content: {a['content']}\n"
+        items.append(item_text)
+    return "\n".join(items)
+
+
+def _fit_sources(sources, compressed, char_cap: int):
+    """
+    The sources whose numbered material fits `char_cap`, dropping whole
+    sources from the end so no source is cut mid-text (a lone source that
+    is still too long is cut), and that material.
+    """
+    k = len(compressed)
+    material = _numbered_material(compressed)
+    while k > 1 and len(material) > char_cap:
+        k -= 1
+        material = _numbered_material(compressed[:k])
+    return sources[:k], material[:char_cap]
+
+
+def _sectioned_report(state) -> GraphState:
+    """
+    Sectioned mode: one small call writes the title, the Executive Summary
+    and an outline (heading and key points per subtopic) from titles and
+    snippets only; the body section of every subtopic is then generated
+    concurrently from that subtopic's own evidence, numbered locally, and
+    tools/report_stitch.py assembles the report with global citation
+    numbers and one merged References list.
+    """
+    search_results = state.get("search_results", {})
+    topic = state["topic"]
+    context = state["context"]
+    model = NANO_MODEL if state.get("cascade") else MINI_MODEL
+    started = time.time()
+
+    overview = []
+    for subtopic, articles in search_results.items():
+        overview.append(f"\n### {subtopic}\n")
+        overview.extend(f"- {a.get('title', '')}: {a.get('snippet', '')}" for a in articles)
+    outline = call_llm(
+        prompt=f"""Plan an analytical research report from the search results below.
+
+Topic: {topic}
+Geography: {context.get('geography')}
+Time range: {context.get('time_range')}
+Domain: {context.get('domain')}
+
+Return:
+- title: the report title
+- executive_summary: a 150-200 word Executive Summary in plain text, without citations or HTML
+- sections: one entry per subtopic, in the given order, with the subtopic name exactly as given, a section
+  heading and 3-5 key points the section should cover
+
+Subtopics and search results (titles and snippets):
+{chr(10).join(overview)}
+""",
+        system="You plan professional research reports. You return only JSON.",
+        schema=OutlineSchema,
+        max_tokens=1500,
+        model=model,
+        cost_tracker=state["cost_tracker"],
+        deadline=state.get("deadline"),
+    )
+    planned = {s.subtopic.strip().lower(): s for s in outline.sections}
+    print(f"[summarize] Outline ready in {time.time() - started:.1f}s: {len(outline.sections)} sections.")
+
+    # One section per subtopic with evidence; the input cap is shared between them (approx 4 chars/token)
+    subtopics = [s for s, articles in search_results.items() if articles]
+    input_cap = MAX_INPUT_TOKENS
+    if _short_on_time(state):
+        input_cap = DEADLINE_SUMMARY_TOKENS
+        degrade(state, "summarize", f"cut the section input to ~{DEADLINE_SUMMARY_TOKENS} tokens in total")
+    char_cap = input_cap * 4 // max(1, len(subtopics))
+    section_sources = {subtopic: _section_sources(search_results[subtopic]) for subtopic in subtopics}
+    compressed = _compressed_results(section_sources, topic)
+    jobs = []
+    for i, subtopic in enumerate(subtopics):
+        plan = planned.get(subtopic.strip().lower())
+        if plan is None:
+            plan = outline.sections[i] if i < len(outline.sections) else SectionPlan(subtopic=subtopic, heading=subtopic, key_points=[])
+        sources, material = _fit_sources(section_sources[subtopic], compressed[subtopic], char_cap)
+        if len(sources) < len(section_sources[subtopic]):
+            print(f"[summarize] {subtopic}: kept {len(sources)} of {len(section_sources[subtopic])} sources to fit the input cap.")
+        state["citations"].update(a["url"] for a in sources if a.get("url"))
+        jobs.append((plan, sources, material))
+
+    with open(debug_path(state, "summarize_input.json", "debug_outputs/summarize_input.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "topic": topic,
+            "context": context,
+            "outline": outline.model_dump(),
+            "section_material": {plan.heading: material for plan, _, material in jobs},
+            "input_tokens": sum(count_tokens(material) for _, _, material in jobs),
+        }, f, ensure_ascii=False, indent=2)
+
+    def write_section(job):
+        plan, sources, material = job
+        key_points = "\n".join(f"- {p}" for p in plan.key_points)
+
+        def build_prompt(material: str) -> str:
+            return f"""Write one body section of an HTML research report.
+
+Topic: {topic}
+Report title: {outline.title}
+Executive Summary of the whole report (for context only, do not repeat it):
+{outline.executive_summary}
+
+Section heading: {plan.heading}
+Key points to cover:
+{key_points}
+
+REQUIREMENTS:
+- Write 250-400 words
+- Start with <h2><b>{plan.heading}</b></h2>; use <h3><b>...</b></h3>, <p>, <ul>, <li> inside the section
+- Use <b> and <i> for emphasis (NOT <strong> or <em>); no tables
+- Use ONLY the numbered sources below and cite them as [1], [2], etc. with their given numbers
+- No Executive Summary, no conclusion for the whole report and no References section
+
+Sources:
+{material}
+"""
+
+        section_started = time.time()
+        html = _generate(
+            build_prompt,
+            material,
+            state,
+            check=lambda html: check_section(html, len(sources)),
+            system=SECTION_SYSTEM,
+            max_tokens=3000,
+        )
+        return {"html": html, "sources": sources, "seconds": time.time() - section_started}
+
+    sections_started = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, min(SECTION_WORKERS, len(jobs))), thread_name_prefix="section") as pool:
+        sections = list(pool.map(write_section, jobs))
+    wall = time.time() - sections_started
+    print(
+        f"[summarize] {len(sections)} sections in {wall:.1f}s wall "
+        f"({sum(s['seconds'] for s in sections):.1f}s of generation, {SECTION_WORKERS} workers)."
+    )
+
+    return _finish(state, stitch_report(outline.title, outline.executive_summary, sections))
+
+
+def summarize_node(state: GraphState) -> GraphState:
+    """
+    Generate a single final markdown report from all search results.
+    In deadline mode a report is always produced: with too little time
+    left, or when generation fails, a snippet digest is built without the
+    LLM instead.
+    """
+    left = time_left(state)
+    if left is not None and left < DEADLINE_LLM_MIN_S:
+        degrade(state, "summarize", "no time for an LLM report, built a snippet digest")
+        return _finish(state, _digest_report(state))
+    try:
+        return _summarize(state)
+    except Exception as exc:
+        if state.get("deadline") is None:
+            raise
+        degrade(state, "summarize", f"report generation failed ({type(exc).__name__}), built a snippet digest")
+        return _finish(state, _digest_report(state))
+
+
+def _summarize(state) -> GraphState:
+    search_results = state.get("search_results", {})
+    topic = state["topic"]
+    context = state["context"]
+
+    previous = state.get("previous_run")
+    if previous and previous.get("final_markdown"):
+        return _refresh_report(state, previous)
+
+    if state.get("sectioned"):
+        return _sectioned_report(state)
+
+    compressed_results = _compressed_results(search_results, topic)
+    combined_material = _build_material(compressed_results, state["citations"])
 
     # Enforce 250k token cap for summarizer input (approx 4 chars/token)
-    max_tokens = 250_000
+    max_tokens = MAX_INPUT_TOKENS
     input_tokens = count_tokens(combined_material)
     was_trimmed = False
     if input_tokens > max_tokens:
@@ -41,6 +472,10 @@ def summarize_node(state: GraphState) -> GraphState:
         combined_material = combined_material[:char_cap]
         was_trimmed = True
         print(f"[summarize] Input tokens {input_tokens} exceed {max_tokens}. Trimmed to ~{max_tokens} tokens (~{char_cap} chars).")
+    if _short_on_time(state) and input_tokens > DEADLINE_SUMMARY_TOKENS:
+        combined_material = _build_material(_trimmed_results(compressed_results, DEADLINE_SUMMARY_TOKENS), set())
+        was_trimmed = True
+        degrade(state, "summarize", f"cut the input to ~{DEADLINE_SUMMARY_TOKENS} tokens")
 
     # Save input to JSON
     input_data = {
@@ -52,11 +487,11 @@ def summarize_node(state: GraphState) -> GraphState:
         "trimmed_to_250k": was_trimmed,
     }
     
-    os.makedirs("debug_outputs", exist_ok=True)
-    with open("debug_outputs/summarize_input.json", "w", encoding="utf-8") as f:
+    with open(debug_path(state, "summarize_input.json", "debug_outputs/summarize_input.json"), "w", encoding="utf-8") as f:
         json.dump(input_data, f, ensure_ascii=False, indent=2)
 
-    prompt_text = f"""You are an expert research report writer. Using the provided search results, titles, snippets, and content, write a professional analytical HTML report.
+    def build_prompt(material: str) -> str:
+        return f"""You are an expert research report writer. Using the provided search results, titles, snippets, and content, write a professional analytical HTML report.
 
 Topic: {topic}
 Geography: {context.get('geography')}
@@ -94,50 +529,7 @@ IMPORTANT HTML FORMATTING:
 - Every heading must be wrapped in <b> tags
 
 Material:
-{combined_material}
+{material}
 """
 
-    system_message = (
-        "You are an expert research report writer. Output valid HTML only with numbered citations [1], [2], etc. "
-        "in the text and APA 7 formatted references section at the end. Use <b> tags for bold, <i> tags for italics. "
-        "IMPORTANT: BOLD ALL HEADINGS by wrapping them in <b></b> tags. Example: <h2><b>Section Title</b></h2>. "
-        "Limit to 7-8 most important sources. Do not create tables. Do NOT emit <br> tags. Do NOT leave unclosed tags. Do not put unnecessary artifacts. Keep citations closest to the text, not only at the end of every paragraph."
-    )
-
-    markdown = None
-    last_error = None
-    for attempt in range(3):
-        try:
-            candidate = call_gemini(
-                prompt_text,
-                system=system_message,
-                max_tokens=10000,
-                cost_tracker=state["cost_tracker"],
-            )
-            # Sanitize common HTML issues that break ReportLab parsing
-            candidate = candidate.replace("<br>", " ").replace("<br/>", " ").replace("<br />", " ")
-            markdown = candidate
-            break
-        except Exception as exc:  # Retry on transient failures
-            last_error = exc
-            if attempt == 2:
-                raise
-            continue
-
-    if markdown is None:
-        raise last_error
-
-    # Save output to JSON
-    output_data = {
-        "topic": topic,
-        "final_markdown": markdown,
-        "citations": list(state["citations"])
-    }
-    
-    with open("debug_outputs/summarize_output.json", "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
-
-    state["cost_tracker"].add(markdown)
-    state["final_markdown"] = markdown
-    state["cluster_summaries"] = {"report": [markdown]}  # for pdf_node compatibility
-    return state
+    return _finish(state, _generate(build_prompt, combined_material, state))
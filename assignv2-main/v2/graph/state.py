@@ -14,6 +14,8 @@ class GraphState(TypedDict):
     # Search
     search_queries: Dict[str, List[str]]
     search_results: Dict[str, List[Dict]]
+    quality_stats: Dict[str, int]
+    review_speculation: object  # the search review's first step (_Speculation), started by search_node, or None
 
     # Synthesis
     cluster_summaries: Dict[str, List[str]]
@@ -24,3 +26,20 @@ class GraphState(TypedDict):
 
     # Meta
     cost_tracker: object
+    node_stats: Dict[str, Dict]
+    debug_dir: Optional[str]  # per-run directory for debug snapshots (service jobs), None for the shared defaults
+
+    # Run options
+    pipeline: bool
+    lazy_fetch: bool
+    refresh: bool
+    cascade: bool
+    sectioned: bool
+    deadline: Optional[float]  # time.time() by which the report must exist, or None
+
+    # Deadline mode: what was cut to finish in time
+    degradations: List[Dict]
+
+    # Refresh mode
+    previous_run: Dict
+    changed_subtopics: List[str]
@@ -1,13 +1,25 @@
-from graph.graph import build_graph
+from dotenv import load_dotenv
+
+load_dotenv()  # before the graph imports, so .env can tune module-level settings
+
+from graph.graph import get_graph
 from graph.nodes.input_node import input_node
 from graph.nodes.pdf_node import pdf_node
+from tools.profiling import write_report
+from tools.run_stats import save_run_stats
 
 
-def run(topic, output_pdf):
-    graph = build_graph()
-    state = input_node(topic)
+def run(topic, output_pdf, pipeline=False, lazy_fetch=False, refresh=False, cascade=False, sectioned=False,
+        deadline_s=None):
+    graph = get_graph()
+    state = input_node(
+        topic, pipeline=pipeline, lazy_fetch=lazy_fetch, refresh=refresh, cascade=cascade, sectioned=sectioned,
+        deadline_s=deadline_s,
+    )
     final_state = graph.invoke(state)
     pdf_node(final_state, output_pdf)
+    write_report()  # no-op unless PROFILE_NODES=1
+    save_run_stats(final_state)
 
     cost_summary = final_state["cost_tracker"].summary()
 
@@ -29,6 +41,13 @@ def run(topic, output_pdf):
         f"completion_tokens={cost_summary['completion_tokens']}, "
         f"total_cost=${cost_summary['total_cost_usd']:.6f}"
     )
+    print("LLM by node: " + ", ".join(
+        f"{node} {t['calls']} calls ${t['cost_usd']:.6f} {t['latency_s']:.1f}s" for node, t in cost_summary["by_node"].items()
+    ))
+    if cost_summary["cascade"]["attempts"]:
+        print(f"Cascade: {cost_summary['cascade']}, cost by model: {cost_summary['cost_by_model']}")
+    if final_state.get("degradations"):
+        print(f"Deadline degradations: {final_state['degradations']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,330 @@
+"""
+Long-running report service.
+
+Accepts report jobs over HTTP, runs them on a bounded worker pool with one
+compiled graph and warm clients/caches shared across jobs, streams per-node
+progress over SSE and serves the finished PDF.
+
+Usage: python service.py [--host 127.0.0.1] [--port 8000] [--workers 2] [--queue-size 20]
+
+    POST /jobs              {"topic": "...", "pipeline": false, "lazy_fetch": false, "refresh": false, "cascade": false,
+                             "sectioned": false, "deadline_s": null}
+    GET  /jobs/<id>         job status
+    GET  /jobs/<id>/events  per-node progress (text/event-stream)
+    GET  /jobs/<id>/pdf     finished report
+    GET  /metrics           queue depth, running jobs and job latency percentiles
+
+Finished jobs are forgotten (and their PDF and debug snapshots deleted) after
+JOB_TTL_S, or earlier once more than JOBS_KEEP of them are held.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from collections import deque
+
+from dotenv import load_dotenv
+
+load_dotenv()  # before the graph imports, so .env can tune module-level settings
+
+from graph.graph import get_graph
+from graph.nodes.input_node import input_node
+from graph.nodes.pdf_node import pdf_node
+from tools.profiling import write_report
+from tools.quality import get_learner
+from tools.run_stats import percentile, save_run_stats
+
+JOB_OPTIONS = ("pipeline", "lazy_fetch", "refresh", "cascade", "sectioned")
+REPORTS_DIR = "reports/jobs"
+DEBUG_DIR = "debug_outputs/jobs"  # each job writes its debug snapshots to DEBUG_DIR/<job id>/
+LATENCY_WINDOW = 200  # finished jobs kept for latency percentiles
+JOBS_KEEP = int(os.getenv("JOBS_KEEP", "500"))  # finished jobs kept for status and PDF requests
+JOB_TTL_S = float(os.getenv("JOB_TTL_S", str(24 * 3600)))  # finished jobs older than this are forgotten
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 503: "Service Unavailable"}
+
+
+class Job:
+    def __init__(self, topic: str, options: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.topic = topic
+        self.options = options
+        self.status = "queued"
+        self.current_node = None
+        self.error = None
+        self.cost = None
+        self.degradations = []
+        self.pdf_path = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []  # every progress event, replayed to late SSE subscribers
+        self.subscribers = []
+
+    def publish(self, event: dict):
+        self.events.append(event)
+        for q in self.subscribers:
+            q.put_nowait(event)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "topic": self.topic,
+            "options": self.options,
+            "status": self.status,
+            "current_node": self.current_node,
+            "error": self.error,
+            "cost": self.cost,
+            "degradations": self.degradations,
+            "pdf": f"/jobs/{self.id}/pdf" if self.pdf_path else None,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ReportService:
+    def __init__(self, workers: int = 2, queue_size: int = 20):
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.jobs = {}
+        self.finished = deque()  # ids of finished jobs, oldest first
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_s = deque(maxlen=LATENCY_WINDOW)
+        self.run_s = deque(maxlen=LATENCY_WINDOW)
+        self.graph = get_graph()  # compiled once, reused by every job
+        self.loop = None
+
+    # --- jobs -----------------------------------------------------------
+
+    def submit(self, topic: str, options: dict) -> Job:
+        self._evict()
+        job = Job(topic, options)
+        self.queue.put_nowait(job)  # raises QueueFull when the service is saturated
+        self.jobs[job.id] = job
+        job.publish({"event": "queued", "job_id": job.id})
+        return job
+
+    async def worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self.queue.task_done()
+
+    async def _run_job(self, job: Job):
+        job.status = "running"
+        job.started_at = time.time()
+        self.wait_s.append(job.started_at - job.created_at)
+        self.running += 1
+        job.publish({"event": "started"})
+        try:
+            await asyncio.to_thread(self._execute, job)
+        except Exception as exc:
+            job.status = "failed"
+            job.error = f"{type(exc).__name__}: {exc}"
+            self.failed += 1
+            job.publish({"event": "failed", "error": job.error})
+        else:
+            job.status = "done"
+            self.completed += 1
+            job.publish({"event": "done", "pdf": f"/jobs/{job.id}/pdf", "cost": job.cost})
+        finally:
+            job.finished_at = time.time()
+            self.run_s.append(job.finished_at - job.started_at)
+            self.running -= 1
+            job.publish(None)  # end of stream
+            self.finished.append(job.id)
+            self._evict()
+
+    def _evict(self):
+        """Forget finished jobs past JOB_TTL_S or beyond JOBS_KEEP, deleting their files."""
+        now = time.time()
+        while self.finished and (
+            len(self.finished) > JOBS_KEEP or now - self.jobs[self.finished[0]].finished_at > JOB_TTL_S
+        ):
+            job = self.jobs.pop(self.finished.popleft())
+            if job.pdf_path and os.path.exists(job.pdf_path):
+                os.remove(job.pdf_path)
+            shutil.rmtree(os.path.join(DEBUG_DIR, job.id), ignore_errors=True)
+
+    def _execute(self, job: Job):
+        """Runs in a worker thread; progress is handed back to the event loop."""
+        def publish(event):
+            self.loop.call_soon_threadsafe(job.publish, event)
+
+        state = input_node(job.topic, debug_dir=os.path.join(DEBUG_DIR, job.id), **job.options)
+        tracker = state["cost_tracker"]
+        final_state = state
+        node_started = time.monotonic()
+        for mode, chunk in self.graph.stream(state, stream_mode=["updates", "values"]):
+            if mode == "values":
+                final_state = chunk
+                continue
+            for node in chunk:
+                now = time.monotonic()
+                job.current_node = node
+                publish({
+                    "event": "node",
+                    "node": node,
+                    "elapsed_s": round(now - node_started, 3),
+                    "total_tokens": tracker.estimate_tokens(),
+                    "total_cost_usd": round(tracker.estimate_cost_usd(), 6),
+                })
+                node_started = now
+
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        job.pdf_path = os.path.join(REPORTS_DIR, f"{job.id}.pdf")
+        pdf_node(final_state, job.pdf_path)
+        write_report(job.id)  # no-op unless PROFILE_NODES=1
+        save_run_stats(final_state)
+        get_learner().save()  # the service outlives many runs; a no-op unless this one learned new template lines
+        summary = tracker.summary()
+        job.cost = {k: v for k, v in summary.items() if k != "events"}
+        job.degradations = final_state.get("degradations", [])
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "workers": self.workers,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue_wait_s": {"p50": percentile(self.wait_s, 0.5), "p95": percentile(self.wait_s, 0.95)},
+            "job_latency_s": {"p50": percentile(self.run_s, 0.5), "p95": percentile(self.run_s, 0.95)},
+        }
+
+    # --- HTTP -----------------------------------------------------------
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, path, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+            await self.route(method, path.split("?", 1)[0].rstrip("/"), body, writer)
+        except (ValueError, asyncio.IncompleteReadError):
+            await self._send_json(writer, 400, {"error": "malformed request"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: bytes, writer):
+        parts = path.strip("/").split("/")
+        if method == "POST" and parts == ["jobs"]:
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                return await self._send_json(writer, 400, {"error": "body must be JSON"})
+            if not isinstance(payload, dict):
+                return await self._send_json(writer, 400, {"error": "body must be a JSON object"})
+            topic = payload.get("topic")
+            topic = topic.strip() if isinstance(topic, str) else ""
+            if not topic:
+                return await self._send_json(writer, 400, {"error": "topic is required"})
+            options = {k: bool(payload[k]) for k in JOB_OPTIONS if k in payload}
+            if payload.get("deadline_s") is not None:
+                try:
+                    options["deadline_s"] = float(payload["deadline_s"])
+                except (TypeError, ValueError):
+                    return await self._send_json(writer, 400, {"error": "deadline_s must be a number of seconds"})
+                if not options["deadline_s"] > 0:
+                    return await self._send_json(writer, 400, {"error": "deadline_s must be positive"})
+            try:
+                job = self.submit(topic, options)
+            except asyncio.QueueFull:
+                return await self._send_json(writer, 503, {"error": "queue full", **self.metrics()})
+            return await self._send_json(writer, 202, job.to_dict())
+        if method == "GET" and parts == ["metrics"]:
+            return await self._send_json(writer, 200, self.metrics())
+        if method == "GET" and len(parts) >= 2 and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return await self._send_json(writer, 404, {"error": "unknown job"})
+            if len(parts) == 2:
+                return await self._send_json(writer, 200, job.to_dict())
+            if parts[2:] == ["events"]:
+                return await self._stream_events(job, writer)
+            if parts[2:] == ["pdf"]:
+                if job.status != "done":
+                    return await self._send_json(writer, 409, {"error": f"job is {job.status}"})
+                with open(job.pdf_path, "rb") as f:
+                    return await self._send(writer, 200, f.read(), "application/pdf")
+        await self._send_json(writer, 404, {"error": "not found"})
+
+    async def _stream_events(self, job: Job, writer):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        q = asyncio.Queue()
+        for event in job.events:
+            q.put_nowait(event)
+        job.subscribers.append(q)
+        try:
+            while True:
+                event = await q.get()
+                if event is None:
+                    break
+                writer.write(f"event: {event['event']}\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+                await writer.drain()
+        finally:
+            job.subscribers.remove(q)
+
+    async def _send_json(self, writer, status: int, payload: dict):
+        await self._send(writer, status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    async def _send(self, writer, status: int, body: bytes, content_type: str):
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host: str, port: int):
+        self.loop = asyncio.get_running_loop()
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Report service listening on http://{host}:{port} ({self.workers} workers)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for w in workers:
+                w.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report generation service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=20)
+    args = parser.parse_args()
+
+    async def _serve():
+        await ReportService(args.workers, args.queue_size).serve(args.host, args.port)
+
+    asyncio.run(_serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from datetime import date
+
+import pytest
+
+from tools.context_rules import CONTEXT_MIN_CONFIDENCE, extract_context, normalize_context
+from tools.temporal import parse_time_range
+
+TODAY = date(2026, 1, 15)
+
+
+@pytest.mark.parametrize("topic, geography", [
+    ("Turkey inflation in 2025", "Turkey"),
+    ("Chile copper exports last year", "Chile"),
+    ("Indian markets over the last year", "India"),
+    ("Fed interest rate decisions in Q3 2025", "United States"),
+    ("Latin American fintech growth", "Latin America"),
+    ("Nobel awards from the last three years", "Global"),
+])
+def test_geography(topic, geography):
+    context, _ = extract_context(topic, TODAY)
+    assert context["geography"] == geography
+
+
+@pytest.mark.parametrize("topic", ["turkey prices before Thanksgiving", "green chile harvest"])
+def test_lowercase_turkey_and_chile_are_left_to_the_model(topic):
+    _, confidence = extract_context(topic, TODAY)
+    assert confidence < CONTEXT_MIN_CONFIDENCE
+
+
+def test_confident_topic_gets_domain_and_date_range():
+    context, confidence = extract_context("Fed interest rate decisions in Q3 2025", TODAY)
+    assert context["domain"] == "finance"
+    assert context["time_range"] == "q3 2025"
+    assert (context["date_range"]["start"], context["date_range"]["end"]) == ("2025-07-01", "2025-09-30")
+    assert confidence >= CONTEXT_MIN_CONFIDENCE
+
+
+def test_vague_time_lowers_confidence():
+    context, confidence = extract_context("Recent trends in Indian markets", TODAY)
+    assert context["date_range"] is None
+    assert confidence < CONTEXT_MIN_CONFIDENCE
+
+
+def test_normalize_context_fills_date_range_from_time_range():
+    context = normalize_context({"geography": "India", "time_range": "last year", "domain": "finance"}, "Indian markets", TODAY)
+    assert (context["date_range"]["start"], context["date_range"]["end"]) == ("2025-01-01", "2025-12-31")
+
+
+@pytest.mark.parametrize("text, start, end", [
+    ("over the last year", "2025-01-01", "2025-12-31"),
+    ("from the last three years", "2023-01-01", "2025-12-31"),
+    ("in Q3 2025", "2025-07-01", "2025-09-30"),
+    ("between 2019 and 2021", "2019-01-01", "2021-12-31"),
+    ("from 2019-2024", "2019-01-01", "2024-12-31"),
+    ("in March 2024", "2024-03-01", "2024-03-31"),
+    ("over the next 6 months", "2026-01-15", "2026-07-15"),
+])
+def test_parse_time_range(text, start, end):
+    parsed = parse_time_range(text, TODAY)
+    assert (parsed["start"], parsed["end"]) == (start, end)
+
+
+def test_parse_time_range_without_a_period():
+    assert parse_time_range("recent trends in fintech", TODAY) is None
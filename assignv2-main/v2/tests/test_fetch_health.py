@@ -0,0 +1,65 @@
+import time
+
+from tools.fetch_health import BREAKER_FAILURES, DomainHealth
+
+
+def _health(tmp_path):
+    return DomainHealth(str(tmp_path / "health.json"))
+
+
+def _expire_cooldown(health, domain):
+    health.domains[domain]["open_until"] = time.time() - 1
+
+
+def test_breaker_opens_after_consecutive_failures(tmp_path):
+    health = _health(tmp_path)
+    for _ in range(BREAKER_FAILURES - 1):
+        health.record("slow.example", ok=False, latency_s=0, error="timeout")
+    assert health.allow("slow.example")
+    health.record("slow.example", ok=False, latency_s=0, error="timeout")
+    assert not health.allow("slow.example")
+    assert health.stats("slow.example")["breaker_open"]
+    assert health.allow("other.example")
+
+
+def test_success_resets_the_failure_streak(tmp_path):
+    health = _health(tmp_path)
+    for _ in range(BREAKER_FAILURES - 1):
+        health.record("flaky.example", ok=False, latency_s=0, error="timeout")
+    health.record("flaky.example", ok=True, latency_s=0.5, nbytes=100)
+    for _ in range(BREAKER_FAILURES - 1):
+        health.record("flaky.example", ok=False, latency_s=0, error="timeout")
+    assert health.allow("flaky.example")
+
+
+def test_non_tripping_failures_never_open_the_breaker(tmp_path):
+    health = _health(tmp_path)
+    for _ in range(BREAKER_FAILURES * 2):
+        health.record("missing.example", ok=False, latency_s=0.1, error="http_404", trip=False)
+    assert health.allow("missing.example")
+    stats = health.stats("missing.example")
+    assert stats["success_rate"] == 0.0
+    assert stats["errors"] == {"http_404": BREAKER_FAILURES * 2}
+
+
+def test_probe_after_cooldown_closes_or_reopens(tmp_path):
+    health = _health(tmp_path)
+    for _ in range(BREAKER_FAILURES):
+        health.record("down.example", ok=False, latency_s=0, error="connect")
+    _expire_cooldown(health, "down.example")
+    assert health.allow("down.example")  # the probe
+    health.record("down.example", ok=False, latency_s=0, error="connect")
+    assert not health.allow("down.example")  # a failed probe reopens at once
+
+    _expire_cooldown(health, "down.example")
+    health.record("down.example", ok=True, latency_s=0.2, nbytes=10)
+    assert health.allow("down.example")
+    assert health.domains["down.example"]["consecutive_failures"] == 0
+
+
+def test_state_survives_a_save_and_reload(tmp_path):
+    health = _health(tmp_path)
+    for _ in range(BREAKER_FAILURES):
+        health.record("down.example", ok=False, latency_s=0, error="connect")
+    health.save()
+    assert not _health(tmp_path).allow("down.example")
@@ -0,0 +1,51 @@
+import re
+
+from tools.report_check import citation_numbers
+from tools.report_stitch import stitch_report
+
+
+def _source(name):
+    return {"url": f"https://{name}.example/article", "title": f"{name.title()} article"}
+
+
+def _references(html):
+    return re.findall(r"<p>\[(\d+)\] <i>([^<]+)</i>", html)
+
+
+def test_citation_numbers_expands_lists_and_ranges():
+    assert citation_numbers("1") == [1]
+    assert citation_numbers("1, 3-5") == [1, 3, 4, 5]
+    assert citation_numbers("2 – 4") == [2, 3, 4]
+
+
+def test_citation_numbers_rejects_years_and_wide_ranges():
+    assert citation_numbers("2019") is None
+    assert citation_numbers("2019-2024") is None
+    assert citation_numbers("1-50") is None
+    assert citation_numbers("5-3") is None
+
+
+def test_stitch_renumbers_citations_in_order_of_first_use():
+    a, b, c = _source("alpha"), _source("beta"), _source("gamma")
+    sections = [
+        {"html": "<h2>One</h2><p>First [2], then [1].</p>", "sources": [a, b]},
+        {"html": "<h2>Two</h2><p>Shared [2] and new [1, 2].</p>", "sources": [c, a]},
+    ]
+    html = stitch_report("Title", "Summary", sections)
+    assert "First [1], then [2]." in html
+    assert "Shared [2] and new [2, 3]." in html
+    assert _references(html) == [("1", "Beta article"), ("2", "Alpha article"), ("3", "Gamma article")]
+
+
+def test_stitch_leaves_year_ranges_as_text():
+    sections = [{"html": "<h2>Trend</h2><p>Growth over [2019-2024] and in [2020] [1].</p>", "sources": [_source("alpha")]}]
+    html = stitch_report("Title", "Summary", sections)
+    assert "Growth over [2019-2024] and in [2020] [1]." in html
+    assert len(_references(html)) == 1
+
+
+def test_stitch_drops_citations_a_section_does_not_have(capsys):
+    sections = [{"html": "<h2>Gaps</h2><p>Known [1], unknown [4], mixed [1, 7].</p>", "sources": [_source("alpha")]}]
+    html = stitch_report("Title", "Summary", sections)
+    assert "Known [1], unknown, mixed [1]." in html
+    assert "dropped citations [4, 7]" in capsys.readouterr().out
@@ -0,0 +1,89 @@
+import pytest
+
+from tools import run_store
+from tools.run_store import changed_subtopics, content_hash, load_run, merge_previous, save_run, seen_urls
+
+
+def _article(n, **extra):
+    return {"url": f"https://news.example/{n}", "title": f"Story {n}", "content": f"Body of story number {n}.", **extra}
+
+
+def _previous(articles_by_subtopic):
+    return {
+        "search_results": {
+            subtopic: [{**a, "hash": content_hash(a)} for a in articles]
+            for subtopic, articles in articles_by_subtopic.items()
+        }
+    }
+
+
+@pytest.fixture(autouse=True)
+def runs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_store, "RUNS_DIR", str(tmp_path))
+
+
+def test_content_hash_ignores_whitespace_and_case():
+    assert content_hash({"content": "Rates  rose\nsharply"}) == content_hash({"content": "rates rose sharply"})
+    assert content_hash({"snippet": "Only a snippet"}) == content_hash({"content": "only a snippet"})
+
+
+def test_save_run_leaves_snippet_only_articles_out_of_the_baseline():
+    fetched = _article(1)
+    snippet = {"url": "https://news.example/lazy", "snippet": "Teaser", "snippet_only": True}
+    save_run({"topic": "Indian markets", "search_results": {"Stocks": [fetched, snippet]}, "citations": set()})
+
+    previous = load_run("indian  MARKETS")
+    assert [a["url"] for a in previous["search_results"]["Stocks"]] == [fetched["url"]]
+    assert previous["search_results"]["Stocks"][0]["hash"] == content_hash(fetched)
+    assert snippet["url"] not in seen_urls(previous)  # a refresh may still fetch it
+
+
+def test_save_run_caps_each_subtopic_keeping_cited_articles(monkeypatch):
+    monkeypatch.setattr(run_store, "RUN_MAX_ARTICLES", 3)
+    articles = [_article(n) for n in range(6)]
+    save_run({"topic": "t", "search_results": {"s": articles}, "citations": {articles[0]["url"]}})
+    kept = [a["url"] for a in load_run("t")["search_results"]["s"]]
+    assert kept == [articles[0]["url"], articles[4]["url"], articles[5]["url"]]
+
+
+def test_merge_previous_puts_old_articles_first_without_duplicates():
+    old = [_article(1), _article(2)]
+    new = [_article(2), _article(3)]
+    merged = merge_previous({"Stocks": new, "Bonds": [_article(9)]}, _previous({"Stocks": old}))
+    assert [a["url"] for a in merged["Stocks"]] == [a["url"] for a in old + [_article(3)]]
+    assert [a["url"] for a in merged["Bonds"]] == [_article(9)["url"]]
+
+
+def test_merge_previous_without_a_previous_run_is_a_no_op():
+    results = {"Stocks": [_article(1)]}
+    assert merge_previous(results, None) is results
+
+
+def test_changed_subtopics_needs_the_minimum_number_of_new_articles():
+    old = [_article(n) for n in range(8)]  # 25% of 8 is 2, so the floor of 3 applies
+    previous = _previous({"Stocks": old, "Bonds": old})
+    results = {
+        "Stocks": old + [_article(n) for n in range(100, 102)],
+        "Bonds": old + [_article(n) for n in range(100, 103)],
+    }
+    assert changed_subtopics(results, previous) == ["Bonds"]
+
+
+def test_changed_subtopics_scales_with_the_previous_article_count():
+    old = [_article(n) for n in range(20)]  # 25% of 20 is 5
+    previous = _previous({"Stocks": old})
+    assert changed_subtopics({"Stocks": old + [_article(n) for n in range(100, 104)]}, previous) == []
+    assert changed_subtopics({"Stocks": old + [_article(n) for n in range(100, 105)]}, previous) == ["Stocks"]
+
+
+def test_changed_subtopics_ignores_snippet_only_hits():
+    old = [_article(n) for n in range(8)]
+    snippets = [{"url": f"https://news.example/s{n}", "snippet": f"Teaser {n}", "snippet_only": True} for n in range(5)]
+    assert changed_subtopics({"Stocks": old + snippets}, _previous({"Stocks": old})) == []
+
+
+def test_changed_subtopics_counts_new_and_empty_subtopics_as_changed():
+    previous = _previous({"Stocks": [_article(1)], "Empty": []})
+    results = {"Stocks": [_article(1)], "Empty": [_article(2)], "New": [_article(3)]}
+    assert changed_subtopics(results, previous) == ["Empty", "New"]
+    assert changed_subtopics(results, None) == ["Stocks", "Empty", "New"]
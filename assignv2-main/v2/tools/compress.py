@@ -0,0 +1,115 @@
+import os
+import re
+from typing import List
+
+from tools.ranking import STOPWORDS
+
+COMPRESS_RATIO = float(os.getenv("COMPRESS_RATIO", "0.4"))  # share of an article's characters kept; 1 disables
+COMPRESS_MIN_CHARS = int(os.getenv("COMPRESS_MIN_CHARS", "1500"))  # shorter articles are passed through whole
+MIN_SENTENCE_CHARS = 25  # shorter fragments (menus, captions) are dropped unless they hold a number
+MAX_SENTENCE_CHARS = 400  # longer runs without punctuation (menus, listings) are cut into pieces of this size
+LIST_NAME_SHARE = 0.6  # pieces with more capitalized words than this are link lists, scored at half weight
+REDUNDANCY_MAX = 0.8  # sentences this similar to one already kept are skipped
+
+# salience weights: centrality in the article, relevance to topic + subtopic, facts (numbers, dates, names), lead
+WEIGHTS = (0.45, 0.35, 0.2, 0.1)
+LEAD_SENTENCES = 3
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]?\s+(?=[\"'(\[]?[A-Z0-9])")
+_TERM = re.compile(r"[a-z0-9]+")
+_NUMBER = re.compile(r"\d")
+_NAME = re.compile(r"\b[A-Z][a-zA-Z&.-]+")
+
+
+def _pieces(sentence: str) -> List[str]:
+    """An overlong sentence cut at word boundaries into pieces of at most MAX_SENTENCE_CHARS."""
+    if len(sentence) <= MAX_SENTENCE_CHARS:
+        return [sentence]
+    pieces, current = [], []
+    size = 0
+    for word in sentence.split():
+        if current and size + len(word) > MAX_SENTENCE_CHARS:
+            pieces.append(" ".join(current))
+            current, size = [], 0
+        current.append(word)
+        size += len(word) + 1
+    return pieces + [" ".join(current)]
+
+
+def sentences(text: str) -> List[str]:
+    """Sentences of extracted page text, line by line; short fragments without a number are dropped."""
+    found = []
+    for line in (text or "").split("\n"):
+        for s in _SENTENCE_END.split(line.strip()):
+            for piece in _pieces(s.strip()):
+                if len(piece) >= MIN_SENTENCE_CHARS or (piece and _NUMBER.search(piece)):
+                    found.append(piece)
+    return found
+
+
+def _terms(sentence: str) -> List[str]:
+    return [w for w in _TERM.findall(sentence.lower()) if len(w) > 2 and w not in STOPWORDS]
+
+
+def _facts(sentence: str) -> float:
+    """0..1: numbers and dates count most, then names (capitalized words past the first)."""
+    names = len(_NAME.findall(sentence)) - (1 if sentence[:1].isupper() else 0)
+    return min(1.0, 0.6 * bool(_NUMBER.search(sentence)) + 0.2 * max(0, min(2, names)))
+
+
+def _is_list(sentence: str) -> bool:
+    """Navigation and link lists: mostly capitalized words."""
+    words = sentence.split()
+    return len(words) >= 8 and len(_NAME.findall(sentence)) / len(words) > LIST_NAME_SHARE
+
+
+def compress_text(text: str, query: str, ratio: float = COMPRESS_RATIO) -> str:
+    """
+    Extractive compression of one article to about `ratio` of its length.
+    Sentences are scored by TF-IDF centrality (cosine to the article
+    centroid), cosine relevance to `query` (topic and subtopic), a bonus
+    for numbers, dates and names, and a small lead bonus, with link lists
+    at half weight; the best are kept, skipping near-duplicates, and
+    returned in their original order.
+    """
+    if ratio >= 1 or len(text or "") <= COMPRESS_MIN_CHARS:
+        return text
+    sents = sentences(text)
+    if len(sents) < 3:
+        return text[:int(len(text) * ratio)]
+
+    import numpy as np
+
+    vocab = {}
+    rows = [[vocab.setdefault(w, len(vocab)) for w in _terms(s)] for s in sents]
+    query_ids = [vocab[w] for w in _terms(query) if w in vocab]
+    tf = np.zeros((len(sents), max(1, len(vocab))))
+    for i, ids in enumerate(rows):
+        np.add.at(tf[i], ids, 1.0)
+    idf = np.log((1 + len(sents)) / (1 + (tf > 0).sum(axis=0))) + 1
+    vectors = tf * idf
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+    centroid = vectors.mean(axis=0)
+    centrality = vectors @ centroid / max(np.linalg.norm(centroid), 1e-9)
+    relevance = np.zeros(len(sents))
+    if query_ids:
+        q = np.zeros(vectors.shape[1])
+        q[query_ids] = idf[query_ids]
+        relevance = vectors @ (q / np.linalg.norm(q))
+    facts = np.array([_facts(s) for s in sents])
+    lead = (np.arange(len(sents)) < LEAD_SENTENCES).astype(float)
+    w_central, w_relevant, w_facts, w_lead = WEIGHTS
+    scores = w_central * centrality + w_relevant * relevance + w_facts * facts + w_lead * lead
+    scores *= np.where([_is_list(s) for s in sents], 0.5, 1.0)
+
+    budget = int(len(text) * ratio)
+    kept, used = [], 0
+    for i in np.argsort(-scores, kind="stable"):
+        if used + len(sents[i]) > budget:
+            continue
+        if kept and float((vectors[kept] @ vectors[i]).max()) > REDUNDANCY_MAX:
+            continue
+        kept.append(i)
+        used += len(sents[i]) + 1
+    return "\n".join(sents[i] for i in sorted(kept))
@@ -0,0 +1,196 @@
+import os
+import re
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from tools.temporal import VAGUE_TIME, parse_time_range
+
+CONTEXT_MIN_CONFIDENCE = float(os.getenv("CONTEXT_MIN_CONFIDENCE", "0.8"))  # below this context_node asks the LLM
+
+# geography as the LLM reports it -> names, demonyms, institutions and market indices that imply it
+GAZETTEER = {
+    "Global": ["global", "globally", "world", "worldwide", "international", "nobel"],
+    "United States": ["united states", "usa", "u.s.", "us", "america", "american", "americans", "wall street",
+                      "federal reserve", "the fed", "fed", "s&p 500", "dow jones", "nasdaq", "hollywood", "silicon valley",
+                      "new mexico"],
+    "India": ["india", "indian", "indians", "sensex", "nifty", "rbi", "reserve bank of india", "bse", "nse", "bollywood",
+              "tollywood"],
+    "China": ["china", "chinese", "pboc", "shanghai composite", "csi 300"],
+    "Japan": ["japan", "japanese", "nikkei", "boj", "bank of japan"],
+    "United Kingdom": ["united kingdom", "uk", "u.k.", "britain", "great britain", "british", "england",
+                       "ftse", "bank of england", "boe"],
+    "European Union": ["european union", "eu", "eurozone", "euro area", "ecb", "european central bank"],
+    "Europe": ["europe", "european"],
+    "Germany": ["germany", "german", "dax", "bundesbank"],
+    "France": ["france", "french", "cac 40", "cannes"],
+    "Italy": ["italy", "italian"],
+    "Spain": ["spain", "spanish"],
+    "Netherlands": ["netherlands", "dutch"],
+    "Switzerland": ["switzerland", "swiss"],
+    "Sweden": ["sweden", "swedish"],
+    "Norway": ["norway", "norwegian"],
+    "Denmark": ["denmark", "danish"],
+    "Poland": ["poland", "polish"],
+    "Ireland": ["ireland", "irish"],
+    "Russia": ["russia", "russian"],
+    "Ukraine": ["ukraine", "ukrainian"],
+    "Turkey": ["turkey", "turkish", "türkiye"],
+    "Canada": ["canada", "canadian", "tsx"],
+    "Mexico": ["mexico", "mexican"],
+    "Brazil": ["brazil", "brazilian", "bovespa"],
+    "Argentina": ["argentina", "argentine", "argentinian"],
+    "Chile": ["chile", "chilean"],
+    "Colombia": ["colombia", "colombian"],
+    "Australia": ["australia", "australian", "asx"],
+    "New Zealand": ["new zealand"],
+    "South Korea": ["south korea", "korea", "korean", "kospi"],
+    "North Korea": ["north korea", "north korean"],
+    "Taiwan": ["taiwan", "taiwanese"],
+    "Hong Kong": ["hong kong", "hang seng"],
+    "Singapore": ["singapore", "singaporean"],
+    "Indonesia": ["indonesia", "indonesian"],
+    "Malaysia": ["malaysia", "malaysian"],
+    "Thailand": ["thailand", "thai"],
+    "Vietnam": ["vietnam", "vietnamese"],
+    "Philippines": ["philippines", "filipino"],
+    "Pakistan": ["pakistan", "pakistani"],
+    "Bangladesh": ["bangladesh", "bangladeshi"],
+    "Sri Lanka": ["sri lanka", "sri lankan"],
+    "Nepal": ["nepal", "nepali"],
+    "Saudi Arabia": ["saudi arabia", "saudi"],
+    "United Arab Emirates": ["united arab emirates", "uae", "dubai", "abu dhabi"],
+    "Israel": ["israel", "israeli"],
+    "Iran": ["iran", "iranian"],
+    "Egypt": ["egypt", "egyptian"],
+    "Nigeria": ["nigeria", "nigerian", "nollywood"],
+    "South Africa": ["south africa", "south african"],
+    "Kenya": ["kenya", "kenyan"],
+    "Asia": ["asia", "asian"],
+    "East Asia": ["east asia", "east asian"],
+    "Southeast Asia": ["southeast asia", "south-east asia", "southeast asian", "south-east asian", "asean"],
+    "South Asia": ["south asia", "south asian"],
+    "Asia-Pacific": ["asia-pacific", "asia pacific", "apac"],
+    "Middle East": ["middle east", "middle eastern", "gulf states", "gcc", "mena"],
+    "Africa": ["africa", "african", "sub-saharan africa", "sub-saharan african"],
+    "Latin America": ["latin america", "latin american", "latin americans", "latam", "south america", "south american"],
+    "Central America": ["central america", "central american"],
+    "North America": ["north america", "north american"],
+}
+# a region's adjective must be listed with it, or the bare demonym inside it matches ("Latin American" -> "american")
+
+# domain -> keywords; awards outranks movies on a tie ("Oscar-winning films" is an awards topic)
+DOMAIN_KEYWORDS = {
+    "awards": ["award", "awards", "prize", "prizes", "nobel", "laureate", "laureates", "oscar", "oscars", "academy awards",
+               "grammy", "grammys", "emmy", "emmys", "golden globe", "golden globes", "bafta", "booker", "pulitzer",
+               "nominee", "nominees", "nominations", "winners", "honours", "honors", "medal"],
+    "movies": ["movie", "movies", "film", "films", "cinema", "box office", "blockbuster", "blockbusters", "hollywood",
+               "bollywood", "tollywood", "nollywood", "director", "directors", "sequel", "sequels", "trailer", "releases",
+               "screenplay", "franchise", "streaming"],
+    "finance": ["market", "markets", "stock", "stocks", "equity", "equities", "shares", "economy", "economic",
+                "inflation", "interest rate", "interest rates", "monetary", "central bank", "bank", "banks", "banking",
+                "invest", "investment", "investments", "investors", "ipo", "ipos", "gdp", "bond", "bonds", "yields",
+                "crypto", "bitcoin", "earnings", "revenue", "fund", "funds", "mutual fund", "currency", "rupee", "dollar",
+                "forex", "trade", "tariffs", "fiscal", "budget", "sensex", "nifty", "s&p 500", "nasdaq", "dow jones",
+                "wall street", "fdi", "venture capital", "startup funding", "commodities", "oil prices", "recession",
+                "exchange rate", "exchange rates", "peso", "yen", "yuan", "euro", "manufacturing", "unemployment",
+                "real estate", "housing market", "wealth fund", "prices"],
+}
+DOMAIN_PRIORITY = ["awards", "movies", "finance"]
+
+# capitalized words that say nothing about geography
+NEUTRAL_WORDS = {
+    "the", "a", "an", "and", "or", "of", "in", "on", "for", "to", "from", "over", "with", "by", "at", "about", "vs",
+    "what", "which", "how", "why", "top", "best", "key", "major", "new", "latest", "recent", "upcoming", "last",
+    "past", "next", "this", "ai", "gdp", "ipo", "ipos", "ev", "evs", "esg", "ceo", "fdi", "q1", "q2", "q3", "q4",
+    "h1", "h2", "ytd",
+}
+
+_ALIASES = sorted(
+    ((alias, geography) for geography, aliases in GAZETTEER.items() for alias in aliases),
+    key=lambda item: len(item[0]),
+    reverse=True,
+)
+_GAZETTEER_RE = re.compile(r"(?<![\w&])(" + "|".join(re.escape(a) for a, _ in _ALIASES) + r")(?![\w&])")
+_ALIAS_TO_GEOGRAPHY = dict(_ALIASES)
+_CASE_SENSITIVE = {"us", "fed", "eu", "uk", "boe", "boj"}  # only when capitalized ("US" or "Fed", not "us")
+_COMMON_NOUNS = {"turkey", "chile"}  # in lowercase probably the food ("turkey prices"), so left to the model
+
+
+def _geography(topic: str, lowered: str) -> Tuple[Optional[str], float, set]:
+    """(geography, confidence, matched words); a named place outranks "Global"."""
+    found, words, ambiguous = [], set(), False
+    for m in _GAZETTEER_RE.finditer(lowered):
+        alias = m.group(1)
+        if alias in _CASE_SENSITIVE and topic[m.start():m.end()].islower():
+            continue
+        ambiguous |= alias in _COMMON_NOUNS and topic[m.start():m.end()].islower()
+        found.append(_ALIAS_TO_GEOGRAPHY[alias])
+        words.update(alias.split())
+    places = list(dict.fromkeys(g for g in found if g != "Global"))
+    if len(places) == 1:
+        return places[0], 0.5 if ambiguous else 1.0, words
+    if len(places) > 1:
+        return ", ".join(places), 0.5 if ambiguous else 0.6, words  # comparisons are left to the model
+    if found:
+        return "Global", 0.9, words
+    return None, 0.85, words
+
+
+def _domain(lowered: str) -> Tuple[str, float, set]:
+    hits = {}
+    for domain, keywords in DOMAIN_KEYWORDS.items():
+        matched = {k for k in keywords if re.search(rf"(?<![\w&]){re.escape(k)}(?![\w&])", lowered)}
+        if matched:
+            hits[domain] = matched
+    if not hits:
+        return "other", 0.7, set()  # "other" is often a keyword the lists lack
+    ranked = sorted(hits, key=lambda d: (-len(hits[d]), DOMAIN_PRIORITY.index(d)))
+    words = {w for matched in hits.values() for k in matched for w in k.split()}
+    if len(ranked) == 1 or len(hits[ranked[0]]) > len(hits[ranked[1]]) or ranked[0] == "awards":
+        return ranked[0], 1.0, words
+    return ranked[0], 0.6, words
+
+
+def extract_context(topic: str, today: Optional[date] = None) -> Tuple[Dict, float]:
+    """
+    Rule-based context for a topic: ({"geography", "time_range", "domain",
+    "date_range"}, confidence). Geography comes from a gazetteer of
+    countries, regions, demonyms, central banks and market indices; domain
+    from keyword lists; time_range from tools/temporal.py. Confidence is the
+    weakest of the three; it is lowered by capitalized words the gazetteer
+    does not know (possibly a place), vague time words ("recent",
+    "upcoming") and ties between domains.
+    """
+    lowered = topic.lower()
+    geography, geo_confidence, geo_words = _geography(topic, lowered)
+    domain, domain_confidence, domain_words = _domain(lowered)
+
+    date_range = parse_time_range(topic, today)
+    if date_range:
+        time_confidence = date_range["confidence"]
+    else:
+        time_confidence = 0.5 if VAGUE_TIME.search(topic) else 0.85
+
+    if geography is None:
+        known = NEUTRAL_WORDS | geo_words | domain_words
+        unknown = [
+            w for i, w in enumerate(re.findall(r"[A-Za-z][\w&.-]*", topic))
+            if i > 0 and w[0].isupper() and w.lower().strip(".") not in known
+        ]
+        if unknown:
+            geo_confidence = 0.5
+
+    context = {
+        "geography": geography,
+        "time_range": date_range["phrase"] if date_range else None,
+        "domain": domain,
+        "date_range": date_range,
+    }
+    return context, min(geo_confidence, domain_confidence, time_confidence)
+
+
+def normalize_context(context: Dict, topic: str, today: Optional[date] = None) -> Dict:
+    """Add a normalized date_range to model-extracted context, from its time_range or else the topic."""
+    if not context.get("date_range"):
+        context["date_range"] = parse_time_range(context.get("time_range") or "", today) or parse_time_range(topic, today)
+    return context
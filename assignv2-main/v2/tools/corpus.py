@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from tools.ranking import terms
+
+CORPUS_PATH = os.getenv("CORPUS_PATH", ".cache/corpus.sqlite")
+CORPUS_ENABLED = os.getenv("CORPUS_ENABLED", "1") == "1"
+CORPUS_MAX_AGE_S = float(os.getenv("CORPUS_MAX_AGE_S", str(2 * 24 * 3600)))  # fresh enough to reuse
+CORPUS_MIN_DOCS = 6  # local documents needed to treat a subtopic as covered
+CORPUS_MIN_TERM_SHARE = 0.6  # share of query terms a local document must contain
+CORPUS_PRUNE_AGE_S = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    title TEXT,
+    snippet TEXT,
+    content TEXT,
+    fetched_at REAL,
+    query TEXT,
+    subtopic TEXT,
+    topic TEXT
+);
+CREATE INDEX IF NOT EXISTS articles_fetched_at ON articles(fetched_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, snippet, content, content='articles', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, snippet, content) VALUES (new.rowid, new.title, new.snippet, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, snippet, content) VALUES ('delete', old.rowid, old.title, old.snippet, old.content);
+END;
+DROP TRIGGER IF EXISTS articles_au;
+CREATE TRIGGER IF NOT EXISTS articles_au_text AFTER UPDATE ON articles
+WHEN old.title IS NOT new.title OR old.snippet IS NOT new.snippet OR old.content IS NOT new.content BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, snippet, content) VALUES ('delete', old.rowid, old.title, old.snippet, old.content);
+    INSERT INTO articles_fts(rowid, title, snippet, content) VALUES (new.rowid, new.title, new.snippet, new.content);
+END;
+"""
+
+
+class Corpus:
+    """
+    Local store of every fetched article (SQLite + FTS5 full-text index), so
+    later runs and related topics can reuse material instead of refetching
+    it. One connection is shared between threads behind a lock.
+    """
+
+    def __init__(self, path: str = CORPUS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.lock:
+            self.db.executescript(SCHEMA)
+
+    def add(self, articles: List[Dict], topic: str, subtopic: str):
+        """
+        Store articles with full content. A refetched URL always gets its
+        fetched_at renewed (so unchanged pages stay fresh for reuse); its
+        other fields, and the full-text index, only change with its content.
+        """
+        rows = [
+            (a.get("url"), a.get("title") or "", a.get("snippet") or "", a.get("content"), time.time(),
+             a.get("query") or "", subtopic, topic)
+            for a in articles
+            if a.get("url") and a.get("content")
+        ]
+        if not rows:
+            return
+        with self.lock, self.db:
+            self.db.executemany("UPDATE articles SET fetched_at = ? WHERE url = ?", [(row[4], row[0]) for row in rows])
+            self.db.executemany(
+                """
+                INSERT INTO articles (url, title, snippet, content, fetched_at, query, subtopic, topic)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title, snippet = excluded.snippet, content = excluded.content,
+                    fetched_at = excluded.fetched_at, query = excluded.query,
+                    subtopic = excluded.subtopic, topic = excluded.topic
+                WHERE excluded.content != articles.content
+                """,
+                rows,
+            )
+
+    def get(self, url: str, max_age_s: float = CORPUS_MAX_AGE_S) -> Optional[Dict]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT * FROM articles WHERE url = ? AND fetched_at >= ?", (url, time.time() - max_age_s)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def search(self, text: str, max_age_s: float = CORPUS_MAX_AGE_S, limit: int = 12) -> List[Dict]:
+        """
+        Fresh documents relevant to `text`, best BM25 match first. Documents
+        must contain at least CORPUS_MIN_TERM_SHARE of the query terms.
+        """
+        query_terms = terms(text)
+        if not query_terms:
+            return []
+        match = " OR ".join(f'"{t}"' for t in sorted(query_terms))
+        with self.lock:
+            rows = self.db.execute(
+                """
+                SELECT a.* FROM articles_fts f JOIN articles a ON a.rowid = f.rowid
+                WHERE articles_fts MATCH ? AND a.fetched_at >= ?
+                ORDER BY bm25(articles_fts) LIMIT ?
+                """,
+                (match, time.time() - max_age_s, limit * 4),
+            ).fetchall()
+        docs = []
+        for row in rows:
+            doc_terms = terms(f"{row['title']} {row['snippet']} {row['content']}")
+            if len(query_terms & doc_terms) >= CORPUS_MIN_TERM_SHARE * len(query_terms):
+                docs.append(dict(row))
+            if len(docs) >= limit:
+                break
+        return docs
+
+    def prune(self, max_age_s: float = CORPUS_PRUNE_AGE_S) -> int:
+        """Delete articles fetched more than max_age_s ago; returns how many were removed."""
+        with self.lock, self.db:
+            cur = self.db.execute("DELETE FROM articles WHERE fetched_at < ?", (time.time() - max_age_s,))
+        return cur.rowcount
+
+    def compact(self):
+        """Merge the FTS index segments and reclaim free pages."""
+        with self.lock:
+            with self.db:
+                self.db.execute("INSERT INTO articles_fts(articles_fts) VALUES ('optimize')")
+            self.db.execute("VACUUM")
+
+    def stats(self) -> Dict:
+        with self.lock:
+            count, oldest, newest = self.db.execute(
+                "SELECT COUNT(*), MIN(fetched_at), MAX(fetched_at) FROM articles"
+            ).fetchone()
+        return {"articles": count, "oldest": oldest, "newest": newest, "bytes": os.path.getsize(self.path)}
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus() -> Optional[Corpus]:
+    """Process-wide corpus, or None when disabled with CORPUS_ENABLED=0."""
+    global _corpus
+    if not CORPUS_ENABLED:
+        return None
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = Corpus()
+        return _corpus
+
+
+if __name__ == "__main__":
+    # python -m tools.corpus stats | prune [days] | compact
+    corpus = Corpus()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "prune":
+        days = float(sys.argv[2]) if len(sys.argv) > 2 else CORPUS_PRUNE_AGE_S / 86400
+        print(f"Pruned {corpus.prune(days * 86400)} articles older than {days:g} days.")
+    elif command == "compact":
+        corpus.compact()
+        print("Corpus compacted.")
+    print(corpus.stats())
@@ -1,42 +1,187 @@
-class CostTracker:
-    """Track token usage and USD cost per model."""
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+COST_EVENTS_MAX = int(os.getenv("COST_EVENTS_MAX", "1000"))  # recent per-call events kept; 0 keeps none
+
+
+class _Totals:
+    """Fixed-size running totals for one model or node."""
+
+    __slots__ = ("calls", "prompt_tokens", "completion_tokens", "cost_usd", "latency_s")
 
     def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.latency_s = 0.0
+
+    def add(self, calls: int, prompt_tokens: int, completion_tokens: int, cost_usd: float, latency_s: float):
+        self.calls += calls
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost_usd
+        self.latency_s += latency_s
+
+    def merge(self, other: "_Totals") -> "_Totals":
+        self.add(other.calls, other.prompt_tokens, other.completion_tokens, other.cost_usd, other.latency_s)
+        return self
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": self.cost_usd,
+            "latency_s": round(self.latency_s, 3),
+            "mean_latency_s": round(self.latency_s / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+class CostTracker:
+    """
+    Track token usage, USD cost and LLM latency per model and per graph
+    node. Every update takes a lock, so one tracker can be shared by the
+    threads of a node (and by asyncio tasks: the lock is never held across
+    an await). Only aggregates grow with the number of models and nodes;
+    per-call events are kept in a ring buffer of the last `max_events`.
+    Trackers from worker processes (they pickle without their lock) are
+    combined with merge().
+    """
+
+    def __init__(self, max_events: int = COST_EVENTS_MAX):
+        self.lock = threading.Lock()
         self.total_input_tokens = 0
         self.total_output_tokens = 0
         self.total_cost_usd = 0.0
-        self.events = []  # list of dicts: model, prompt_tokens, completion_tokens, cost
+        self.total_latency_s = 0.0
+        self.by_model = {}  # model -> _Totals
+        self.by_node = {}  # graph node -> _Totals; calls outside a node are under "-"
+        self.node = None  # node currently running, set by node_scope()
+        self.events = deque(maxlen=max_events)  # recent calls: model, node, tokens, cost, latency
         self.total_characters = 0  # backward compatibility for legacy add()
+        self.parse_failures = {}  # schema name -> failed structured responses
+        self.cascade = {"attempts": 0, "escalations": 0}  # report drafts by the cheap tier / sent up a tier
+        self.retry_events = {}  # rate_limit / transient / fatal / context_overflow / continuation / input_shrink -> count
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def node_scope(self, name: str):
+        """Attribute usage recorded inside the block (from any thread) to graph node `name`."""
+        with self.lock:
+            previous, self.node = self.node, name
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.node = previous
+
+    def add_usage(self, model: str, prompt_tokens: int, completion_tokens: int, cost_usd: float, latency_s: float = 0.0):
+        with self.lock:
+            node = self.node or "-"
+            self.total_input_tokens += prompt_tokens
+            self.total_output_tokens += completion_tokens
+            self.total_cost_usd += cost_usd
+            self.total_latency_s += latency_s
+            self.by_model.setdefault(model, _Totals()).add(1, prompt_tokens, completion_tokens, cost_usd, latency_s)
+            self.by_node.setdefault(node, _Totals()).add(1, prompt_tokens, completion_tokens, cost_usd, latency_s)
+            self.events.append(
+                {
+                    "model": model,
+                    "node": node,
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "cost_usd": cost_usd,
+                    "latency_s": round(latency_s, 3),
+                }
+            )
+
+    def add_parse_failure(self, schema_name: str):
+        with self.lock:
+            self.parse_failures[schema_name] = self.parse_failures.get(schema_name, 0) + 1
 
-    def add_usage(self, model: str, prompt_tokens: int, completion_tokens: int, cost_usd: float):
-        self.total_input_tokens += prompt_tokens
-        self.total_output_tokens += completion_tokens
-        self.total_cost_usd += cost_usd
-        self.events.append(
-            {
-                "model": model,
-                "prompt_tokens": prompt_tokens,
-                "completion_tokens": completion_tokens,
-                "cost_usd": cost_usd,
+    def add_cascade(self, escalated: bool):
+        with self.lock:
+            self.cascade["attempts"] += 1
+            if escalated:
+                self.cascade["escalations"] += 1
+
+    def add_retry_event(self, kind: str):
+        with self.lock:
+            self.retry_events[kind] = self.retry_events.get(kind, 0) + 1
+
+    def merge(self, other: "CostTracker") -> "CostTracker":
+        """Add another tracker's totals, counters and events (e.g. from a worker process) to this one."""
+        with other.lock:  # consistent snapshot of the other tracker
+            other = {
+                **other.__getstate__(),
+                "by_model": {k: _Totals().merge(t) for k, t in other.by_model.items()},
+                "by_node": {k: _Totals().merge(t) for k, t in other.by_node.items()},
+                "parse_failures": dict(other.parse_failures),
+                "retry_events": dict(other.retry_events),
+                "cascade": dict(other.cascade),
+                "events": list(other.events),
             }
-        )
+        with self.lock:
+            self.total_input_tokens += other["total_input_tokens"]
+            self.total_output_tokens += other["total_output_tokens"]
+            self.total_cost_usd += other["total_cost_usd"]
+            self.total_latency_s += other["total_latency_s"]
+            self.total_characters += other["total_characters"]
+            for mine, theirs in ((self.by_model, other["by_model"]), (self.by_node, other["by_node"])):
+                for key, totals in theirs.items():
+                    mine.setdefault(key, _Totals()).merge(totals)
+            for mine, theirs in ((self.parse_failures, other["parse_failures"]), (self.retry_events, other["retry_events"]),
+                                 (self.cascade, other["cascade"])):
+                for key, count in theirs.items():
+                    mine[key] = mine.get(key, 0) + count
+            self.events.extend(other["events"])
+        return self
+
+    def cost_by_model(self):
+        with self.lock:
+            return {model: totals.cost_usd for model, totals in self.by_model.items()}
 
     def add(self, text: str):
         # legacy compatibility; track chars if needed elsewhere
         if text:
-            self.total_characters += len(text)
+            with self.lock:
+                self.total_characters += len(text)
 
     def estimate_tokens(self):
-        return self.total_input_tokens + self.total_output_tokens
+        with self.lock:
+            return self.total_input_tokens + self.total_output_tokens
 
     def estimate_cost_usd(self):
-        return self.total_cost_usd
+        with self.lock:
+            return self.total_cost_usd
 
     def summary(self):
-        return {
-            "prompt_tokens": self.total_input_tokens,
-            "completion_tokens": self.total_output_tokens,
-            "total_tokens": self.total_input_tokens + self.total_output_tokens,
-            "total_cost_usd": self.total_cost_usd,
-            "events": self.events,
-        }
+        with self.lock:
+            return {
+                "prompt_tokens": self.total_input_tokens,
+                "completion_tokens": self.total_output_tokens,
+                "total_tokens": self.total_input_tokens + self.total_output_tokens,
+                "total_cost_usd": self.total_cost_usd,
+                "llm_latency_s": round(self.total_latency_s, 3),
+                "parse_failures": dict(self.parse_failures),
+                "retry_events": dict(self.retry_events),
+                "cost_by_model": {model: totals.cost_usd for model, totals in self.by_model.items()},
+                "by_model": {model: totals.to_dict() for model, totals in self.by_model.items()},
+                "by_node": {node: totals.to_dict() for node, totals in self.by_node.items()},
+                "cascade": {
+                    **self.cascade,
+                    "escalation_rate": self.cascade["escalations"] / self.cascade["attempts"] if self.cascade["attempts"] else 0.0,
+                },
+                "events": list(self.events),
+            }
@@ -0,0 +1,93 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+from tools.ranking import terms, url_domain
+
+COVERAGE_MIN = float(os.getenv("COVERAGE_MIN", "0.7"))  # subtopics scoring below this are under-covered
+NOVELTY_MIN = float(os.getenv("NOVELTY_MIN", "0.2"))  # a last batch with less new vocabulary means searching has saturated
+
+# a subtopic reaching every target scores 1.0
+TARGET_ARTICLES = 6  # full-content articles (snippet-only ones count half)
+TARGET_SOURCES = 4  # distinct domains
+TARGET_TERMS = 2500  # distinct content terms
+TARGET_ENTITIES = 1000  # distinct names and numbers
+
+# feature order: articles, sources, terms, entities, subtopic terms found
+WEIGHTS = (0.25, 0.25, 0.2, 0.15, 0.15)
+SNIPPET_WEIGHTS = (0.4, 0.4, 0.0, 0.0, 0.2)  # what titles and snippets can tell before the pages are fetched
+
+_ENTITY = re.compile(r"\b(?:[A-Z][a-zA-Z&.-]+|\d[\d.,%]*)")
+
+
+class CoverageEstimator:
+    """
+    Local, deterministic estimate of how well each subtopic is covered by
+    the collected articles: article count, source (domain) diversity,
+    term and entity diversity and how many of the subtopic's own terms
+    appear. Every batch added to a subtopic also records its novelty (the
+    share of its terms and entities not seen before), so a subtopic whose
+    last searches brought nothing new is not searched again.
+    """
+
+    def __init__(self, topic: str):
+        self.topic = topic
+        self.articles = {}  # subtopic -> weighted article count
+        self.sources = {}  # subtopic -> domains
+        self.terms = {}  # subtopic -> distinct terms
+        self.entities = {}  # subtopic -> distinct entities
+        self.novelty = {}  # subtopic -> novelty of the last batch added after the first
+
+    def add(self, subtopic: str, articles: List[Dict], initial: bool = False) -> Optional[float]:
+        """Add a batch of articles to a subtopic and return its novelty (None for the initial results)."""
+        batch_terms, batch_entities = set(), set()
+        for a in articles:
+            text = " ".join([a.get("title") or "", a.get("snippet") or "", a.get("content") or ""])
+            batch_terms |= terms(text)
+            batch_entities |= set(_ENTITY.findall(text))
+        known_terms = self.terms.setdefault(subtopic, set())
+        known_entities = self.entities.setdefault(subtopic, set())
+        seen = len(batch_terms) + len(batch_entities)
+        new = len(batch_terms - known_terms) + len(batch_entities - known_entities)
+
+        known_terms |= batch_terms
+        known_entities |= batch_entities
+        self.articles[subtopic] = self.articles.get(subtopic, 0) + sum(1 if a.get("content") else 0.5 for a in articles)
+        self.sources.setdefault(subtopic, set()).update(url_domain(a.get("url")) for a in articles if a.get("url"))
+        if initial:
+            return None
+        self.novelty[subtopic] = new / seen if seen else 0.0
+        return self.novelty[subtopic]
+
+    def features(self, subtopic: str) -> List[float]:
+        wanted = terms(subtopic) | terms(self.topic)
+        return [
+            min(1.0, self.articles.get(subtopic, 0) / TARGET_ARTICLES),
+            min(1.0, len(self.sources.get(subtopic, ())) / TARGET_SOURCES),
+            min(1.0, len(self.terms.get(subtopic, ())) / TARGET_TERMS),
+            min(1.0, len(self.entities.get(subtopic, ())) / TARGET_ENTITIES),
+            len(wanted & self.terms.get(subtopic, set())) / len(wanted) if wanted else 1.0,
+        ]
+
+    def score(self, subtopic: str, weights=WEIGHTS) -> float:
+        return sum(w * f for w, f in zip(weights, self.features(subtopic)))
+
+    def flagged(self, min_score: float = COVERAGE_MIN, min_novelty: float = NOVELTY_MIN, weights=WEIGHTS) -> List[str]:
+        """Under-covered subtopics still worth searching: low score, and the last batch (if any) brought new material."""
+        return [
+            s for s in self.articles
+            if self.score(s, weights) < min_score and self.novelty.get(s, 1.0) >= min_novelty
+        ]
+
+    def summary(self, subtopics: Optional[List[str]] = None) -> str:
+        """One line per subtopic: score, articles, sources, terms, entities and last novelty."""
+        lines = []
+        for s in subtopics or list(self.articles):
+            novelty = self.novelty.get(s)
+            lines.append(
+                f"- {s}: coverage {self.score(s):.2f} ({self.articles.get(s, 0):g} articles, "
+                f"{len(self.sources.get(s, ()))} sources, {len(self.terms.get(s, ()))} terms, "
+                f"{len(self.entities.get(s, ()))} entities"
+                + (f", last batch {novelty:.0%} new)" if novelty is not None else ")")
+            )
+        return "\n".join(lines)
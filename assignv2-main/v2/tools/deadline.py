@@ -0,0 +1,61 @@
+import os
+import time
+from typing import Optional
+
+# Deadline mode: state["deadline"] is an absolute time.time() by which the report must exist.
+DEADLINE_RESERVE_S = float(os.getenv("DEADLINE_RESERVE_S", "45"))  # kept for summarize + pdf; search/fetch stop taking work
+DEADLINE_REVIEW_MIN_S = float(os.getenv("DEADLINE_REVIEW_MIN_S", "90"))  # search review runs only with this much left
+DEADLINE_FULL_SUMMARY_S = float(os.getenv("DEADLINE_FULL_SUMMARY_S", "60"))  # less than this: smaller input and model
+DEADLINE_SUMMARY_TOKENS = int(os.getenv("DEADLINE_SUMMARY_TOKENS", "40000"))  # input cap of a degraded summary
+DEADLINE_LLM_MIN_S = float(os.getenv("DEADLINE_LLM_MIN_S", "10"))  # less than this: no report LLM call at all
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until `deadline`, or None when the run has no deadline."""
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def time_left(state) -> Optional[float]:
+    return remaining(state.get("deadline"))
+
+
+def work_cutoff(state) -> Optional[float]:
+    """Time after which search and fetch stop starting new work, leaving DEADLINE_RESERVE_S for the report."""
+    deadline = state.get("deadline")
+    return None if deadline is None else deadline - DEADLINE_RESERVE_S
+
+
+def past(cutoff: Optional[float]) -> bool:
+    return cutoff is not None and time.time() >= cutoff
+
+
+def sleep_within(seconds: float, deadline: Optional[float]) -> bool:
+    """
+    Sleep for a retry backoff unless it would run past the deadline; returns
+    False (without sleeping) in that case so the caller gives up instead.
+    """
+    left = remaining(deadline)
+    if left is not None and seconds >= left:
+        return False
+    time.sleep(seconds)
+    return True
+
+
+def request_timeout(deadline: Optional[float], default: Optional[float] = None) -> Optional[float]:
+    """Per-request timeout that does not outlive the deadline (at least 1s)."""
+    left = remaining(deadline)
+    if left is None:
+        return default
+    return max(1.0, min(left, default) if default else left)
+
+
+def degrade(state, node: str, action: str):
+    """Record a degradation applied to meet the deadline in state["degradations"] (once per node and action)."""
+    degradations = state.setdefault("degradations", [])
+    if any(d["node"] == node and d["action"] == action for d in degradations):
+        return
+    left = time_left(state)
+    degradations.append({"node": node, "action": action, "remaining_s": None if left is None else round(left, 1)})
+    print(f"[deadline] {node}: {action} ({left:.0f}s left)" if left is not None else f"[deadline] {node}: {action}")
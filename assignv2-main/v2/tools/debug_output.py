@@ -0,0 +1,13 @@
+import os
+
+
+def debug_path(state, name: str, default: str) -> str:
+    """
+    Where a node writes its debug snapshot `name`: the run's own
+    state["debug_dir"] when set (the service gives every job one, so
+    concurrent jobs do not overwrite each other), else `default`, the
+    shared location CLI runs have always used. The directory is created.
+    """
+    path = os.path.join(state["debug_dir"], name) if state.get("debug_dir") else default
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
@@ -0,0 +1,142 @@
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+from tools.run_stats import percentile
+
+HEALTH_PATH = os.getenv("FETCH_HEALTH_PATH", ".cache/domain_health.json")
+
+LATENCY_WINDOW = 50  # latencies kept per domain
+MIN_SAMPLES = 5  # before timeouts adapt or hedging kicks in
+MIN_TIMEOUT_S = 3.0
+MAX_TIMEOUT_S = 15.0
+BREAKER_FAILURES = 3  # consecutive domain-level failures that open the breaker
+BREAKER_COOLDOWN_S = 6 * 3600  # skip the domain this long, then allow one probe
+HEDGE_MIN_P50_S = 1.5  # only hedge hosts that are actually slow...
+HEDGE_MIN_SUCCESS = 0.8  # ...and usually deliver content
+SAVE_EVERY = 20  # records between writes to disk
+
+
+class DomainHealth:
+    """
+    Persistent per-domain fetch statistics: latency window, success rate,
+    bytes and error kinds. Drives adaptive timeouts, a circuit breaker for
+    domains that keep failing, and the hedge delay for slow but reliable
+    hosts. Safe to use from several fetch threads.
+    """
+
+    def __init__(self, path: str = HEALTH_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.domains = {}
+        self._unsaved = 0
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.domains = json.load(f)
+            except (OSError, ValueError):
+                self.domains = {}
+
+    def _entry(self, domain: str) -> dict:
+        return self.domains.setdefault(domain, {
+            "ok": 0,
+            "fail": 0,
+            "bytes": 0,
+            "latencies": [],
+            "consecutive_failures": 0,
+            "open_until": 0.0,
+            "errors": {},
+        })
+
+    def stats(self, domain: str) -> dict:
+        with self.lock:
+            e = self._entry(domain)
+            attempts = e["ok"] + e["fail"]
+            return {
+                "attempts": attempts,
+                "success_rate": e["ok"] / attempts if attempts else 1.0,
+                "p50_s": percentile(e["latencies"], 0.5),
+                "p75_s": percentile(e["latencies"], 0.75),
+                "p95_s": percentile(e["latencies"], 0.95),
+                "avg_bytes": e["bytes"] / e["ok"] if e["ok"] else 0,
+                "samples": len(e["latencies"]),
+                "breaker_open": e["open_until"] > time.time(),
+                "errors": dict(e["errors"]),
+            }
+
+    def allow(self, domain: str) -> bool:
+        """False while the domain's breaker is open; after the cooldown one probe is let through."""
+        with self.lock:
+            return self._entry(domain)["open_until"] <= time.time()
+
+    def timeout(self, domain: str, default: float) -> Tuple[float, float]:
+        """(connect, read) timeouts: a multiple of the domain's p95 latency once known."""
+        s = self.stats(domain)
+        read = default
+        if s["samples"] >= MIN_SAMPLES:
+            read = min(MAX_TIMEOUT_S, max(MIN_TIMEOUT_S, 2 * s["p95_s"]))
+        return min(5.0, read), read
+
+    def hedge_delay(self, domain: str) -> Optional[float]:
+        """Seconds after which to fire a duplicate request, or None to not hedge."""
+        s = self.stats(domain)
+        if s["samples"] < MIN_SAMPLES:
+            return None
+        if s["p50_s"] < HEDGE_MIN_P50_S or s["success_rate"] < HEDGE_MIN_SUCCESS:
+            return None
+        return s["p75_s"]
+
+    def record(self, domain: str, ok: bool, latency_s: float, nbytes: int = 0, error: str = "", trip: bool = True):
+        """
+        Record one fetch. Failures with `trip` set (timeouts, connection errors,
+        bot blocks, server errors) count towards the circuit breaker; plain
+        misses such as 404s only lower the success rate.
+        """
+        with self.lock:
+            e = self._entry(domain)
+            if ok:
+                e["ok"] += 1
+                e["bytes"] += nbytes
+                e["latencies"] = (e["latencies"] + [round(latency_s, 3)])[-LATENCY_WINDOW:]
+                e["consecutive_failures"] = 0
+                e["open_until"] = 0.0
+            else:
+                e["fail"] += 1
+                e["errors"][error or "error"] = e["errors"].get(error or "error", 0) + 1
+                if trip:
+                    e["consecutive_failures"] += 1
+                    if e["consecutive_failures"] >= BREAKER_FAILURES:
+                        e["open_until"] = time.time() + BREAKER_COOLDOWN_S
+                        print(f"[fetch] Circuit breaker open for {domain} after {e['consecutive_failures']} failures")
+            self._unsaved += 1
+            flush = self._unsaved >= SAVE_EVERY
+        if flush:
+            self.save()
+
+    def save(self):
+        with self.lock:
+            if not self._unsaved:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.domains, f)
+            os.replace(tmp, self.path)
+            self._unsaved = 0
+
+
+_health = None
+_health_lock = threading.Lock()
+
+
+def get_health() -> DomainHealth:
+    """Process-wide DomainHealth, saved to disk on exit."""
+    global _health
+    with _health_lock:
+        if _health is None:
+            _health = DomainHealth()
+            atexit.register(_health.save)
+        return _health
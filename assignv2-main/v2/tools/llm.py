@@ -1,13 +1,14 @@
 import time
 import os
 import json
+import re
+import threading
 from typing import Optional
 
-from dotenv import load_dotenv
-from openai import OpenAI
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
-load_dotenv()
+from tools.deadline import request_timeout, sleep_within
+from tools.run_stats import count_request
 
 NANO_MODEL = "gpt-4.1-nano"
 MINI_MODEL = "gpt-4.1-mini"
@@ -18,14 +19,176 @@ PRICING = {
     MINI_MODEL: {"input": 0.4 / 1_000_000, "output": 1.6 / 1_000_000},
 }
 
+# Models that accept a native json_schema response format. A model is dropped
+# from the set the first time the API rejects the format; call_llm then falls
+# back to describing the schema in the prompt.
+STRUCTURED_OUTPUT_MODELS = {NANO_MODEL, MINI_MODEL}
 
-def _print_cost(model: str, prompt_tokens: int, completion_tokens: int, cost: float):
+RETRY_MAX_WAIT_S = 30.0  # cap on a single backoff sleep, including server Retry-After hints
+MAX_CONTINUATIONS = 2  # follow-up requests when a completion stops at max_tokens
+CONTINUE_PROMPT = "Continue exactly where you stopped. Do not repeat anything already written and do not add any preamble."
+
+
+class ContextOverflowError(Exception):
+    """The prompt does not fit the model's context window; retrying the same prompt cannot help."""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        # "maximum context length is 1047576 tokens. However, your messages resulted in 1203411 tokens"
+        numbers = re.findall(r"(\d+) tokens", message)
+        self.limit = int(numbers[0]) if len(numbers) >= 2 else None
+        self.requested = int(numbers[1]) if len(numbers) >= 2 else None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    One OpenAI client per process, so connections stay warm across calls and
+    jobs. openai and .env loading are deferred to the first call.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from dotenv import load_dotenv
+            from openai import OpenAI
+
+            load_dotenv()
+            _client = OpenAI()
+        return _client
+
+
+def _print_cost(model: str, prompt_tokens: int, completion_tokens: int, cost: float, latency_s: float):
     print(
         f"[LLM] model={model} prompt_tokens={prompt_tokens} completion_tokens={completion_tokens} "
-        f"step_cost=${cost:.6f}"
+        f"step_cost=${cost:.6f} latency={latency_s:.2f}s"
     )
 
 
+def _record_usage(model: str, usage, cost_tracker=None, latency_s: float = 0.0):
+    count_request("llm")
+    prompt_tokens = usage.prompt_tokens if usage else 0
+    completion_tokens = usage.completion_tokens if usage else 0
+    pricing = PRICING.get(model, {"input": 0.0, "output": 0.0})
+    step_cost = prompt_tokens * pricing["input"] + completion_tokens * pricing["output"]
+    _print_cost(model, prompt_tokens, completion_tokens, step_cost, latency_s)
+    if cost_tracker and hasattr(cost_tracker, "add_usage"):
+        cost_tracker.add_usage(model, prompt_tokens, completion_tokens, step_cost, latency_s)
+
+
+def _count_parse_failure(schema: type[BaseModel], cost_tracker=None):
+    if cost_tracker and hasattr(cost_tracker, "add_parse_failure"):
+        cost_tracker.add_parse_failure(schema.__name__)
+
+
+def _count_retry_event(kind: str, cost_tracker=None):
+    if cost_tracker and hasattr(cost_tracker, "add_retry_event"):
+        cost_tracker.add_retry_event(kind)
+
+
+def classify_error(exc: Exception) -> str:
+    """
+    Sort an API error into "rate_limit" or "transient" (worth retrying),
+    "context_overflow" (retry only with a smaller prompt) or "fatal"
+    (auth, quota, invalid request, bugs: fail fast).
+    """
+    import openai
+
+    if isinstance(exc, openai.RateLimitError):
+        return "fatal" if getattr(exc, "code", None) == "insufficient_quota" else "rate_limit"
+    if isinstance(exc, (openai.APIConnectionError, openai.InternalServerError)):
+        return "transient"
+    if isinstance(exc, openai.APIStatusError):
+        if exc.status_code in (408, 409) or exc.status_code >= 500:
+            return "transient"
+        if getattr(exc, "code", None) == "context_length_exceeded" or "maximum context length" in str(exc):
+            return "context_overflow"
+    return "fatal"
+
+
+def _retry_wait(exc: Exception, kind: str, attempt: int) -> float:
+    """Exponential backoff, or the server's Retry-After hint when it sends one."""
+    wait = 2 ** attempt if kind == "rate_limit" else 1 + attempt
+    response = getattr(exc, "response", None)
+    try:
+        wait = float(response.headers.get("retry-after", wait))
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return min(RETRY_MAX_WAIT_S, wait)
+
+
+def _deadline_kwargs(deadline: Optional[float]) -> dict:
+    """Request options for deadline mode: a timeout that ends with the run's deadline."""
+    return {"timeout": request_timeout(deadline)} if deadline is not None else {}
+
+
+def _with_retries(request, retries: int, cost_tracker=None, deadline: Optional[float] = None):
+    """
+    Call `request()` and retry only errors that can succeed on a resend.
+    Every retry and failure is counted per kind on the cost tracker. A
+    backoff that would end past `deadline` is not slept; the error is raised.
+    """
+    for attempt in range(retries):
+        try:
+            return request()
+        except Exception as e:
+            kind = classify_error(e)
+            _count_retry_event(kind, cost_tracker)
+            if kind == "context_overflow":
+                raise ContextOverflowError(str(e)) from e
+            if kind == "fatal" or attempt == retries - 1:
+                raise
+            wait = _retry_wait(e, kind, attempt)
+            print(f"[LLM] {kind} error: {e}. Retrying in {wait:.0f}s...")
+            if not sleep_within(wait, deadline):
+                print("[LLM] Not retrying: the backoff would end past the run's deadline.")
+                raise
+    raise RuntimeError("LLM failed after retries")
+
+
+def _call_structured(client, model: str, messages, schema: type[BaseModel], temperature: float, max_tokens: int,
+                     retries: int = 3, cost_tracker=None, deadline=None):
+    """
+    Request `schema` through the provider's structured output mode and
+    return the parsed object. API errors are retried by _with_retries; a
+    truncated or refused reply is counted and raised at once, since the
+    same prompt would fail the same way again.
+    """
+    from openai import LengthFinishReasonError
+
+    started = 0.0
+
+    def request():
+        nonlocal started
+        started = time.perf_counter()
+        try:
+            return client.beta.chat.completions.parse(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format=schema,
+                **_deadline_kwargs(deadline),
+            )
+        except LengthFinishReasonError as e:
+            return e  # a complete reply that cannot be parsed: not an error to retry
+
+    response = _with_retries(request, retries, cost_tracker, deadline)
+    if isinstance(response, LengthFinishReasonError):
+        _record_usage(model, getattr(response.completion, "usage", None), cost_tracker, time.perf_counter() - started)
+        _count_parse_failure(schema, cost_tracker)
+        raise response
+
+    _record_usage(model, getattr(response, "usage", None), cost_tracker, time.perf_counter() - started)
+    message = response.choices[0].message
+    if message.parsed is None:
+        _count_parse_failure(schema, cost_tracker)
+        raise ValueError(f"No {schema.__name__} in response (refusal: {message.refusal})")
+    return message.parsed
+
+
 def call_llm(
     prompt: str,
     system: str = "You are a helpful research assistant.",
@@ -36,78 +199,89 @@ def call_llm(
     json_output: bool = False,
     model: str = NANO_MODEL,
     cost_tracker=None,
+    deadline: Optional[float] = None,
 ):
     """
     If `schema` is provided, the response will:
-      - be forced to JSON
+      - be forced to JSON (native structured outputs where the model supports
+        them, otherwise the schema is appended to the prompt)
       - validated against the schema
       - returned as a parsed Pydantic object
+    Parse failures are counted per schema on the cost tracker and raised
+    without resending the prompt.
 
     Otherwise, returns plain text.
-    Uses OpenAI GPT-4.1-nano by default.
+    Uses OpenAI GPT-4.1-nano by default. Like call_gemini, only rate limits
+    and transient API errors are retried (classify_error). With a `deadline`
+    (time.time()), requests time out and retries stop when it is reached.
     """
-    client = OpenAI()
+    from openai import BadRequestError
 
-    for attempt in range(retries):
+    client = get_client()
+
+    if schema and model in STRUCTURED_OUTPUT_MODELS:
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt},
+        ]
         try:
-            user_prompt = prompt
-            if schema:
-                schema_json = schema.model_json_schema()
-                user_prompt = (
-                    f"{prompt}\n\nReturn a JSON object matching this schema: {schema_json}"
-                )
-            elif json_output:
-                user_prompt = (
-                    f"{prompt}\n\nReturn ONLY a valid JSON object. Do not include comments, backticks, or extra text."
-                )
-
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+            return _call_structured(client, model, messages, schema, temperature, max_tokens, retries, cost_tracker, deadline)
+        except BadRequestError as e:
+            if "response_format" not in str(e) and "json_schema" not in str(e):
+                raise
+            STRUCTURED_OUTPUT_MODELS.discard(model)
+            print(f"[LLM] {model} rejected structured outputs, falling back to schema in prompt: {e}")
 
-            text = response.choices[0].message.content.strip()
-
-            usage = getattr(response, "usage", None)
-            prompt_tokens = usage.prompt_tokens if usage else 0
-            completion_tokens = usage.completion_tokens if usage else 0
-            pricing = PRICING.get(model, {"input": 0.0, "output": 0.0})
-            step_cost = prompt_tokens * pricing["input"] + completion_tokens * pricing["output"]
-            _print_cost(model, prompt_tokens, completion_tokens, step_cost)
-            if cost_tracker and hasattr(cost_tracker, "add_usage"):
-                cost_tracker.add_usage(model, prompt_tokens, completion_tokens, step_cost)
-
-            # Strip markdown code blocks if present (```json ... ``` or ``` ... ```)
-            if text.startswith("```"):
-                lines = text.split('\n')
-                if lines[0].strip() in ['```', '```json', '```JSON']:
-                    lines = lines[1:]
-                if lines and lines[-1].strip() == '```':
-                    lines = lines[:-1]
-                text = '\n'.join(lines).strip()
-
-            if schema:
-                return schema.model_validate_json(text)
-            if json_output:
-                return json.loads(text)
-            return text
+    user_prompt = prompt
+    if schema:
+        schema_json = schema.model_json_schema()
+        user_prompt = (
+            f"{prompt}\n\nReturn a JSON object matching this schema: {schema_json}"
+        )
+    elif json_output:
+        user_prompt = (
+            f"{prompt}\n\nReturn ONLY a valid JSON object. Do not include comments, backticks, or extra text."
+        )
 
-        except Exception as e:
-            if "429" in str(e) or "rate" in str(e).lower():
-                wait = 2 ** attempt
-                print(f"LLM rate limit encountered: {e}. Retrying in {wait}s...")
-                time.sleep(wait)
-            else:
-                if attempt == retries - 1:
-                    raise
-                time.sleep(1)
+    started = 0.0
 
-    raise RuntimeError("LLM failed after retries")
+    def request():
+        nonlocal started
+        started = time.perf_counter()
+        return client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user_prompt},
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **_deadline_kwargs(deadline),
+        )
+
+    response = _with_retries(request, retries, cost_tracker, deadline)
+    text = (response.choices[0].message.content or "").strip()
+
+    _record_usage(model, getattr(response, "usage", None), cost_tracker, time.perf_counter() - started)
+
+    # Strip markdown code blocks if present (```json ... ``` or ``` ... ```)
+    if text.startswith("```"):
+        lines = text.split('\n')
+        if lines[0].strip() in ['```', '```json', '```JSON']:
+            lines = lines[1:]
+        if lines and lines[-1].strip() == '```':
+            lines = lines[:-1]
+        text = '\n'.join(lines).strip()
+
+    if schema:
+        try:
+            return schema.model_validate_json(text)
+        except ValidationError:
+            _count_parse_failure(schema, cost_tracker)
+            raise
+    if json_output:
+        return json.loads(text)
+    return text
 
 
 def call_gemini(
@@ -117,48 +291,108 @@ def call_gemini(
     temperature: float = 0.3,
     retries: int = 3,
     cost_tracker=None,
+    model: str = MINI_MODEL,
+    deadline: Optional[float] = None,
 ) -> str:
     """
-    Use GPT-4.1-mini (OpenAI) for final summarization.
+    Use GPT-4.1-mini (OpenAI) for final summarization, or `model` (the
+    cheaper first tier of the report cascade).
+
+    Only rate limits and transient errors are retried; a prompt that exceeds
+    the context window raises ContextOverflowError at once so the caller can
+    shrink it, and other errors fail fast. Output cut off at max_tokens is
+    continued in follow-up requests instead of being regenerated. With a
+    `deadline`, requests time out and backoffs stop when it is reached.
     """
-    client = OpenAI()
+    client = get_client()
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
 
-    for attempt in range(retries):
-        try:
-            response = client.chat.completions.create(
-                model=MINI_MODEL,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+    parts = []
+    started = 0.0
 
-            text = response.choices[0].message.content.strip()
+    def request():
+        nonlocal started
+        started = time.perf_counter()  # latency of the attempt that succeeds, without backoff sleeps
+        return client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **_deadline_kwargs(deadline),
+        )
 
-            usage = getattr(response, "usage", None)
-            prompt_tokens = usage.prompt_tokens if usage else 0
-            completion_tokens = usage.completion_tokens if usage else 0
-            pricing = PRICING.get(MINI_MODEL, {"input": 0.0, "output": 0.0})
-            step_cost = prompt_tokens * pricing["input"] + completion_tokens * pricing["output"]
-            _print_cost(MINI_MODEL, prompt_tokens, completion_tokens, step_cost)
-            if cost_tracker and hasattr(cost_tracker, "add_usage"):
-                cost_tracker.add_usage(MINI_MODEL, prompt_tokens, completion_tokens, step_cost)
+    for continuation in range(MAX_CONTINUATIONS + 1):
+        response = _with_retries(request, retries, cost_tracker, deadline)
+        _record_usage(model, getattr(response, "usage", None), cost_tracker, time.perf_counter() - started)
 
-            return text
+        choice = response.choices[0]
+        parts.append(choice.message.content or "")
+        if getattr(choice, "finish_reason", None) != "length" or continuation == MAX_CONTINUATIONS:
+            break
+        print(f"[LLM] Output hit max_tokens={max_tokens}, continuing generation ({continuation + 1}/{MAX_CONTINUATIONS})")
+        _count_retry_event("continuation", cost_tracker)
+        messages = messages + [
+            {"role": "assistant", "content": parts[-1]},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ]
 
-        except Exception as e:
-            if "429" in str(e) or "rate" in str(e).lower():
-                wait = 2 ** attempt
-                print(f"LLM rate limit encountered: {e}. Retrying in {wait}s...")
-                time.sleep(wait)
-            else:
-                if attempt == retries - 1:
-                    raise
-                time.sleep(1)
-
-    raise RuntimeError("OpenAI call failed after retries")
+    return "".join(parts).strip()
+
+
+def stream_llm_lines(
+    prompt: str,
+    system: str = "You are a helpful research assistant.",
+    max_tokens: int = 400,
+    temperature: float = 0.3,
+    retries: int = 3,
+    model: str = NANO_MODEL,
+    cost_tracker=None,
+    deadline: Optional[float] = None,
+):
+    """
+    Stream a plain-text completion and yield it one complete line at a time,
+    so callers can act on early lines while the model is still generating.
+    Usage is recorded once the stream finishes.
+    """
+    client = get_client()
+    started = 0.0
+
+    def request():
+        nonlocal started
+        started = time.perf_counter()
+        return client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            **_deadline_kwargs(deadline),
+        )
+
+    stream = _with_retries(request, retries, cost_tracker, deadline)
+
+    buffer = ""
+    usage = None
+    for chunk in stream:
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        buffer += chunk.choices[0].delta.content or ""
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            yield line
+    if buffer.strip():
+        yield buffer
+
+    _record_usage(model, usage, cost_tracker, time.perf_counter() - started)
 
 
 def count_tokens(text: str) -> int:
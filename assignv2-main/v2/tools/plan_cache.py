@@ -0,0 +1,76 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Optional
+
+PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH", ".cache/plan_cache.json")
+PLAN_CACHE_TTL_S = float(os.getenv("PLAN_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+_lock = threading.Lock()
+
+
+def topic_key(topic: str) -> str:
+    """Normalize a topic so trivially different phrasings share a cache entry."""
+    return " ".join(re.findall(r"[a-z0-9]+", (topic or "").lower()))
+
+
+def _load() -> dict:
+    if not os.path.exists(PLAN_CACHE_PATH):
+        return {}
+    try:
+        with open(PLAN_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(entries: dict):
+    os.makedirs(os.path.dirname(PLAN_CACHE_PATH) or ".", exist_ok=True)
+    tmp = f"{PLAN_CACHE_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, PLAN_CACHE_PATH)
+
+
+def get_plan(topic: str, ttl_s: float = PLAN_CACHE_TTL_S) -> Optional[dict]:
+    """Cached {"context", "subtopics"} for the topic, or None if missing, without subtopics or older than ttl_s."""
+    with _lock:
+        entry = _load().get(topic_key(topic))
+    if not entry or not entry.get("subtopics") or time.time() - entry.get("created_at", 0) > ttl_s:
+        return None
+    return entry
+
+
+def put_plan(topic: str, context: dict, subtopics):
+    """Cache a plan; an empty subtopic list is never cached."""
+    if not subtopics:
+        return
+    with _lock:
+        entries = _load()
+        entries[topic_key(topic)] = {
+            "topic": topic,
+            "context": context,
+            "subtopics": list(subtopics),
+            "created_at": time.time(),
+        }
+        _save(entries)
+
+
+def invalidate(topic: Optional[str] = None):
+    """Drop the cached plan for `topic`, or every cached plan when topic is None."""
+    with _lock:
+        entries = _load()
+        if topic is None:
+            entries = {}
+        else:
+            entries.pop(topic_key(topic), None)
+        _save(entries)
+
+
+if __name__ == "__main__":
+    # python -m tools.plan_cache [topic]  -> invalidate one topic, or all without an argument
+    invalidate(" ".join(sys.argv[1:]) or None)
+    print("Plan cache invalidated.")
@@ -0,0 +1,176 @@
+"""
+Opt-in CPU and memory profiling.
+
+PROFILE_NODES=1 wraps every graph node (and pdf_node) with cProfile,
+tracemalloc and a stack sampler; PROFILE_HELPERS=1 additionally profiles
+the fetch/extract helpers, which mostly run in worker threads that a node's
+cProfile does not see. write_report() then writes, per profiled name:
+
+    profiles/<run>/<name>.pstats     cProfile stats (python -m pstats, snakeviz)
+    profiles/<run>/<name>.collapsed  sampled stacks of all threads (flamegraph.pl, speedscope)
+    profiles/<run>/memory.md         calls, wall time, peak (nodes) and net traced memory per name
+
+When disabled, profiled() returns the function unchanged: no overhead.
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_NODES = os.getenv("PROFILE_NODES", "0") == "1"
+PROFILE_HELPERS = PROFILE_NODES and os.getenv("PROFILE_HELPERS", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL_S = float(os.getenv("PROFILE_SAMPLE_MS", "5")) / 1000
+TRACE_FRAMES = 8  # tracemalloc frames per allocation; more is slower
+TOP_ALLOCATIONS = 10  # allocation sites listed per node in memory.md
+
+_lock = threading.Lock()
+_records = {}  # name -> {"calls", "wall_s", "peak_bytes", "net_bytes", "profiles", "stacks", "top"}
+
+
+def _record(name: str) -> dict:
+    return _records.setdefault(name, {
+        "calls": 0, "wall_s": 0.0, "peak_bytes": None, "net_bytes": 0, "profiles": [], "stacks": Counter(), "top": [],
+    })
+
+
+class _StackSampler(threading.Thread):
+    """Samples the stacks of every other thread into collapsed-stack counts."""
+
+    def __init__(self):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        names = {}
+        while not self.stopped.wait(SAMPLE_INTERVAL_S):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join([names.get(ident, str(ident))] + stack[::-1])] += 1
+
+    def stop(self) -> Counter:
+        self.stopped.set()
+        self.join()
+        return self.stacks
+
+
+def _run_profiled(name: str, fn, args, kwargs, sample: bool):
+    import cProfile
+    import tracemalloc
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+    if sample:
+        tracemalloc.reset_peak()  # nodes only: helpers run concurrently inside a node's window
+    before, _ = tracemalloc.get_traced_memory()
+
+    # cProfile hooks the current thread only, and a nested profiler would
+    # replace the node's; inside a profiled node the node profile covers it
+    profile = cProfile.Profile() if sys.getprofile() is None else None
+    sampler = _StackSampler() if sample else None
+    if sampler:
+        sampler.start()
+    started = time.perf_counter()
+    if profile:
+        profile.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        if profile:
+            profile.disable()
+        wall = time.perf_counter() - started
+        stacks = sampler.stop() if sampler else None
+        current, peak = tracemalloc.get_traced_memory()
+        top = []
+        if sample:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ])
+            top = [str(stat) for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]]
+        with _lock:
+            rec = _record(name)
+            rec["calls"] += 1
+            rec["wall_s"] += wall
+            if sample:
+                rec["peak_bytes"] = max(rec["peak_bytes"] or 0, peak - before)
+            rec["net_bytes"] += current - before
+            if profile:
+                rec["profiles"].append(profile)
+            if stacks:
+                rec["stacks"].update(stacks)
+            if top:
+                rec["top"] = top
+
+
+def profiled(name: str, fn=None, helper: bool = False):
+    """
+    Wrap `fn` (or decorate, when fn is omitted) with profiling under `name`.
+    Nodes also get a stack sampler; helpers (helper=True) are only wrapped
+    with PROFILE_HELPERS=1. Returns fn itself when profiling is off.
+    """
+    if fn is None:
+        return lambda f: profiled(name, f, helper)
+    if not (PROFILE_HELPERS if helper else PROFILE_NODES):
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return _run_profiled(name, fn, args, kwargs, sample=not helper)
+
+    return wrapper
+
+
+def write_report(run_name: str = None) -> str:
+    """Write everything profiled since the last report and reset; returns the directory, or None."""
+    if not PROFILE_NODES:
+        return None
+    import pstats
+
+    with _lock:
+        records = dict(_records)
+        _records.clear()
+    if not records:
+        return None
+
+    out_dir = os.path.join(PROFILE_DIR, run_name or time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(out_dir, exist_ok=True)
+    rows = []
+    for name, rec in sorted(records.items(), key=lambda kv: kv[1]["wall_s"], reverse=True):
+        if rec["profiles"]:
+            stats = pstats.Stats(rec["profiles"][0])
+            for p in rec["profiles"][1:]:
+                stats.add(p)
+            stats.dump_stats(os.path.join(out_dir, f"{name}.pstats"))
+        if rec["stacks"]:
+            with open(os.path.join(out_dir, f"{name}.collapsed"), "w", encoding="utf-8") as f:
+                for stack, count in rec["stacks"].most_common():
+                    f.write(f"{stack} {count}\n")
+        rows.append((name, rec))
+
+    with open(os.path.join(out_dir, "memory.md"), "w", encoding="utf-8") as f:
+        f.write("| name | calls | wall s | peak MiB | net MiB |\n|---|---:|---:|---:|---:|\n")
+        for name, rec in rows:
+            peak = "-" if rec["peak_bytes"] is None else f"{rec['peak_bytes'] / 2**20:.1f}"  # helpers have no own peak
+            f.write(
+                f"| {name} | {rec['calls']} | {rec['wall_s']:.2f} | {peak} | {rec['net_bytes'] / 2**20:.1f} |\n"
+            )
+        for name, rec in rows:
+            if rec["top"]:
+                f.write(f"\n## {name}: top allocations still held\n\n")
+                f.write("\n".join(f"- `{line}`" for line in rec["top"]) + "\n")
+
+    print(f"[profile] Wrote profiles for {', '.join(name for name, _ in rows)} to {out_dir}")
+    return out_dir
@@ -0,0 +1,224 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+from tools.llm import count_tokens
+from tools.ranking import STOPWORDS, url_domain
+
+TEMPLATES_PATH = os.getenv("BOILERPLATE_PATH", ".cache/boilerplate.json")
+
+QUALITY_DROP = 0.35  # pages scoring below this are discarded
+QUALITY_DEMOTE = 0.55  # pages below this keep only their first DEMOTE_MAX_CHARS
+DEMOTE_MAX_CHARS = 2000
+TEMPLATE_MIN_PAGES = 3  # distinct pages of a domain a line must appear on to count as template
+TEMPLATE_MIN_SHARE = 0.5  # share of a domain's distinct pages a line must appear on
+TEMPLATE_MAX_LINES = 500  # learned template lines kept per domain, the least recently confirmed are dropped
+TEMPLATE_MAX_WORDS = 25  # longer lines are prose, never template (syndicated paragraphs)
+
+BOT_SIGNATURES = re.compile(
+    r"enable javascript|javascript is (disabled|required)|are you a robot|verify you are (a )?human|"
+    r"captcha|access denied|checking your browser|unusual traffic|"
+    r"subscribe to (continue|read)|sign in to (continue|read)|"
+    r"already a subscriber|this content is for subscribers",
+    re.IGNORECASE,
+)
+
+# feature order: length, text density, prose share, stopword ratio, repeated-line ratio, bot signatures
+WEIGHTS = (0.25, 0.2, 0.25, 0.3, -0.2, -0.4)
+BIAS = 0.05
+
+
+def _lines(text: str) -> List[str]:
+    return [line.strip() for line in (text or "").split("\n") if line.strip()]
+
+
+def _line_key(line: str) -> str:
+    return hashlib.sha1(re.sub(r"\s+", " ", line.lower()).encode("utf-8")).hexdigest()[:12]
+
+
+def page_features(text: str) -> List[float]:
+    """Cheap per-page features, each scaled to roughly 0..1."""
+    lines = _lines(text)
+    words = re.findall(r"[a-z']+", (text or "").lower())
+    n_words = len(words) or 1
+    n_lines = len(lines) or 1
+    prose_chars = sum(len(line) for line in lines if len(line.split()) >= 8)
+    bot_hits = len(BOT_SIGNATURES.findall(text[:5000] if text else ""))
+    length = min(1.0, len(words) / 300)
+    return [
+        length,  # enough words to be an article
+        min(1.0, n_words / n_lines / 12),  # words per line: navigation is short lines
+        prose_chars / max(1, sum(len(line) for line in lines)),  # share of sentence-like lines
+        min(1.0, sum(w in STOPWORDS for w in words) / n_words / 0.3),  # real prose is ~30%+ stopwords
+        1 - len(set(lines)) / n_lines,  # repeated lines
+        min(1.0, bot_hits / 2) * (1 - length),  # bot walls are short pages
+    ]
+
+
+def score_pages(texts: List[str]):
+    """Quality score in 0..1 for a batch of pages, one vectorized linear model over page_features."""
+    import numpy as np
+
+    if not texts:
+        return np.zeros(0)
+    features = np.array([page_features(t) for t in texts], dtype=float)
+    return np.clip(features @ np.array(WEIGHTS) + BIAS, 0.0, 1.0)
+
+
+class TemplateLearner:
+    """
+    Learns per-domain boilerplate: lines (navigation, cookie banners,
+    footers) that recur on most pages of the same site are stripped from
+    every page of that site. A page is counted once, however often it
+    arrives (the same URL from several queries, or the same content under
+    another URL). Learned lines persist across runs.
+    """
+
+    def __init__(self, path: str = TEMPLATES_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pages = {}  # domain -> distinct pages seen this process
+        self.seen = {}  # domain -> URLs and content keys of the pages counted
+        self.counts = {}  # domain -> line key -> distinct pages containing it
+        self.templates = {}  # domain -> learned template line keys, least recently confirmed first
+        self._unsaved = False
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.templates = {d: dict.fromkeys(keys) for d, keys in json.load(f).items()}
+            except (OSError, ValueError):
+                self.templates = {}
+
+    def observe(self, url: str, text: str):
+        domain = url_domain(url)
+        lines = _lines(text)
+        page = _line_key("\n".join(lines))
+        keys = {_line_key(line) for line in lines if len(line.split()) <= TEMPLATE_MAX_WORDS}
+        with self.lock:
+            seen = self.seen.setdefault(domain, set())
+            if page in seen or (url and url in seen):
+                return  # a page already counted
+            seen.update(k for k in (url, page) if k)
+            self.pages[domain] = self.pages.get(domain, 0) + 1
+            counts = self.counts.setdefault(domain, {})
+            for k in keys:
+                counts[k] = counts.get(k, 0) + 1
+            pages = self.pages[domain]
+            if pages < TEMPLATE_MIN_PAGES:
+                return
+            # only this page's lines can have crossed the threshold; learned or confirmed lines move to the end
+            learned = [k for k in keys if counts[k] >= max(TEMPLATE_MIN_PAGES, TEMPLATE_MIN_SHARE * pages)]
+            if learned:
+                templates = self.templates.setdefault(domain, {})
+                for k in learned:
+                    if templates.pop(k, False) is False:
+                        self._unsaved = True  # a new line; re-confirming a known one alone is not worth a write
+                    templates[k] = None
+                while len(templates) > TEMPLATE_MAX_LINES:
+                    del templates[next(iter(templates))]
+
+    def strip(self, url: str, text: str) -> Tuple[str, int]:
+        """Text without the domain's template lines, and how many lines were removed."""
+        with self.lock:
+            templates = self.templates.get(url_domain(url))
+        if not templates:
+            return text, 0
+        kept, removed = [], 0
+        for line in _lines(text):
+            if _line_key(line) in templates:
+                removed += 1
+            else:
+                kept.append(line)
+        return "\n".join(kept), removed
+
+    def save(self):
+        with self.lock:
+            if not self._unsaved:
+                return
+            data = {d: list(keys) for d, keys in self.templates.items() if keys}
+            self._unsaved = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+_learner = None
+_learner_lock = threading.Lock()
+
+
+def get_learner() -> TemplateLearner:
+    """Process-wide TemplateLearner, saved to disk on exit."""
+    global _learner
+    with _learner_lock:
+        if _learner is None:
+            _learner = TemplateLearner()
+            atexit.register(_learner.save)
+        return _learner
+
+
+def new_stats() -> Dict[str, int]:
+    return {"pages": 0, "dropped": 0, "demoted": 0, "template_lines": 0, "tokens_before": 0, "tokens_after": 0}
+
+
+def merge_stats(total: Dict[str, int], stats: Dict[str, int]) -> Dict[str, int]:
+    for k, v in stats.items():
+        total[k] = total.get(k, 0) + v
+    return total
+
+
+def gate_articles(articles: List[Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Strip learned per-domain boilerplate, then score every page and drop or
+    demote junk (bot walls, cookie pages, navigation-only pages, teasers).
+    Runs before token tallies; the returned stats say how many tokens it
+    saved. Snippet-only articles pass through untouched.
+    """
+    stats = new_stats()
+    learner = get_learner()
+    pages = [a for a in articles if a.get("content")]
+    for a in pages:
+        learner.observe(a.get("url"), a["content"])
+
+    cleaned = []
+    for a in pages:
+        stats["tokens_before"] += count_tokens(a["content"])
+        text, removed = learner.strip(a.get("url"), a["content"])
+        stats["template_lines"] += removed
+        cleaned.append(text)
+    scores = score_pages(cleaned)
+
+    kept, demoted = [], []
+    verdict = {id(a): (text, score) for a, text, score in zip(pages, cleaned, scores)}
+    for a in articles:
+        if not a.get("content"):
+            kept.append(a)
+            continue
+        stats["pages"] += 1
+        text, score = verdict[id(a)]
+        if score < QUALITY_DROP:
+            stats["dropped"] += 1
+            continue
+        a = {**a, "content": text, "quality": round(float(score), 3)}
+        if score < QUALITY_DEMOTE:
+            stats["demoted"] += 1
+            a["content"] = text[:DEMOTE_MAX_CHARS]
+            demoted.append(a)
+        else:
+            kept.append(a)
+        stats["tokens_after"] += count_tokens(a["content"])
+    return kept + demoted, stats
+
+
+def format_stats(stats: Dict[str, int]) -> str:
+    saved = stats.get("tokens_before", 0) - stats.get("tokens_after", 0)
+    return (
+        f"Quality gate: {stats.get('pages', 0)} pages, {stats.get('dropped', 0)} dropped, "
+        f"{stats.get('demoted', 0)} demoted, {stats.get('template_lines', 0)} boilerplate lines stripped, "
+        f"~{saved} tokens saved"
+    )
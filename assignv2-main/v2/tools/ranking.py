@@ -0,0 +1,80 @@
+import re
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "at", "by", "as", "it", "is", "be",
+    "for", "with", "from", "that", "this", "are", "was", "were", "has", "have", "had",
+    "its", "into", "over", "about", "after", "between", "their", "will", "what", "which", "when", "how", "not",
+    "but", "all", "can", "more", "than", "also", "out", "our", "your", "you", "new", "last",
+}
+
+DIVERSITY_WEIGHT = 0.5  # penalty for overlap with already selected hits
+DOMAIN_PENALTY = 0.3  # penalty per hit already selected from the same domain
+
+
+def terms(text: str) -> set:
+    return {w for w in re.findall(r"[a-z0-9]+", (text or "").lower()) if len(w) > 2 and w not in STOPWORDS}
+
+
+def url_domain(url: str) -> str:
+    return urlparse(url or "").netloc.lower().removeprefix("www.")
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def relevance(hit: Dict, query_terms: set) -> float:
+    """Share of topic/subtopic terms found in the title (weighted) and snippet."""
+    if not query_terms:
+        return 0.0
+    title_hits = len(query_terms & terms(hit.get("title")))
+    snippet_hits = len(query_terms & terms(hit.get("snippet")))
+    return (2 * title_hits + snippet_hits) / (3 * len(query_terms))
+
+
+def select_top_k(hits: List[Dict], topic: str, subtopic: str, k: int) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Rank search hits by title/snippet relevance to the topic and subtopic and
+    pick k of them greedily, penalising hits that repeat a domain or overlap
+    with what is already selected (MMR-style). Hits returned by several
+    queries get a small consensus bonus. Returns (selected, rest), both in
+    rank order, with duplicate URLs collapsed.
+    """
+    query_terms = terms(topic) | terms(subtopic)
+
+    by_url = {}
+    for hit in hits:
+        url = hit.get("url")
+        if not url:
+            continue
+        if url in by_url:
+            by_url[url]["_votes"] += 1
+        else:
+            by_url[url] = {**hit, "_votes": 1}
+
+    candidates = []
+    for hit in by_url.values():
+        score = relevance(hit, query_terms) + 0.1 * (hit["_votes"] - 1)
+        candidates.append((score, terms(f"{hit.get('title')} {hit.get('snippet')}"), hit))
+
+    selected, selected_terms, domains = [], [], {}
+    while candidates and len(selected) < k:
+        best_i, best_score = 0, None
+        for i, (score, hit_terms, hit) in enumerate(candidates):
+            overlap = max((_jaccard(hit_terms, t) for t in selected_terms), default=0.0)
+            adjusted = score - DIVERSITY_WEIGHT * overlap - DOMAIN_PENALTY * domains.get(url_domain(hit.get("url")), 0)
+            if best_score is None or adjusted > best_score:
+                best_i, best_score = i, adjusted
+        _, hit_terms, hit = candidates.pop(best_i)
+        selected.append(hit)
+        selected_terms.append(hit_terms)
+        domains[url_domain(hit.get("url"))] = domains.get(url_domain(hit.get("url")), 0) + 1
+
+    rest = [hit for _, _, hit in sorted(candidates, key=lambda c: c[0], reverse=True)]
+    for hit in selected + rest:
+        hit.pop("_votes", None)
+    return selected, rest
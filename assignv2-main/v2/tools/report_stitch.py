@@ -0,0 +1,66 @@
+import re
+from html import escape
+from typing import Dict, List
+from urllib.parse import urlparse
+
+from tools.report_check import CITATION, citation_numbers
+
+
+def _reference(number: int, source: Dict) -> str:
+    """APA 7 style entry for a web source without author/date metadata: Title. (n.d.). Site. URL"""
+    url = source.get("url") or ""
+    site = urlparse(url).netloc.removeprefix("www.")
+    title = (source.get("title") or site or url).strip().rstrip(".")
+    return f"<p>[{number}] <i>{escape(title)}</i>. (n.d.). {escape(site)}. {escape(url)}</p>"
+
+
+def stitch_report(title: str, executive_summary: str, sections: List[Dict]) -> str:
+    """
+    Assemble independently generated sections into one report. Each section
+    is {"html": ..., "sources": [article, ...]} and cites its own sources as
+    [1]..[k]; citations are renumbered globally in order of first use (the
+    same URL keeps one number across sections), numbers a section does not
+    have are dropped (and logged), bracketed spans too wide to be citations
+    are left as text, and one merged References list is appended.
+    """
+    numbers = {}  # url -> global number
+    ordered = []  # sources in global order
+
+    def renumber(section):
+        sources = section["sources"]
+        dropped = []
+
+        def replace(match):
+            locals_ = citation_numbers(match.group(1))
+            if locals_ is None:
+                return match.group(0)
+            global_numbers = []
+            for local in locals_:
+                if not 1 <= local <= len(sources):
+                    dropped.append(local)
+                    continue
+                source = sources[local - 1]
+                key = source.get("url") or id(source)
+                if key not in numbers:
+                    ordered.append(source)
+                    numbers[key] = len(ordered)
+                if numbers[key] not in global_numbers:
+                    global_numbers.append(numbers[key])
+            return f"[{', '.join(str(n) for n in sorted(global_numbers))}]" if global_numbers else ""
+
+        html = CITATION.sub(replace, section["html"])
+        if dropped:
+            heading = re.sub(r"<[^>]+>", "", html.split("</h2>", 1)[0]).strip()[:60]
+            print(f"[stitch] {heading}: dropped citations {sorted(set(dropped))} beyond its {len(sources)} sources")
+        return html
+
+    body = [renumber(section).strip() for section in sections]
+    parts = [
+        f"<h1><b>{escape(title)}</b></h1>",
+        "<h2><b>Executive Summary</b></h2>",
+        f"<p>{escape(executive_summary)}</p>",
+        *body,
+        "<h2><b>References</b></h2>",
+        *(_reference(n, source) for n, source in enumerate(ordered, start=1)),
+    ]
+    return re.sub(r" +([.,;])", r"\1", "\n".join(parts))
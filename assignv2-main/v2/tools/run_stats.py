@@ -0,0 +1,106 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+RUN_STATS_PATH = os.getenv("RUN_STATS_PATH", ".cache/run_stats.jsonl")
+HISTORY_RUNS = 50  # recent runs used for percentiles
+
+_requests = Counter()  # outbound HTTP requests by kind: search, fetch, llm
+_requests_lock = threading.Lock()
+
+
+def count_request(kind: str):
+    with _requests_lock:
+        _requests[kind] += 1
+
+
+def request_count() -> int:
+    with _requests_lock:
+        return sum(_requests.values())
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def timed(name: str, fn=None):
+    """
+    Wrap a node so its wall time, LLM tokens/USD (cost tracker delta) and
+    outbound HTTP requests are recorded in state["node_stats"][name]; LLM
+    usage inside it is attributed to the node on the tracker as well. The
+    request counter is process-wide, so with concurrent service jobs the
+    per-node request counts are approximate. Usable as a decorator.
+    """
+    if fn is None:
+        return lambda f: timed(name, f)
+
+    @functools.wraps(fn)
+    def wrapper(state, *args, **kwargs):
+        tracker = state["cost_tracker"]
+        tokens, cost, requests = tracker.estimate_tokens(), tracker.estimate_cost_usd(), request_count()
+        started = time.perf_counter()
+        with tracker.node_scope(name):
+            result = fn(state, *args, **kwargs)
+        stats = result.setdefault("node_stats", {}) if isinstance(result, dict) else {}
+        stats[name] = {
+            "latency_s": round(time.perf_counter() - started, 3),
+            "tokens": tracker.estimate_tokens() - tokens,
+            "cost_usd": round(tracker.estimate_cost_usd() - cost, 6),
+            "requests": request_count() - requests,
+        }
+        return result
+
+    return wrapper
+
+
+def save_run_stats(state, path: str = RUN_STATS_PATH):
+    """Append this run's per-node stats to the history file."""
+    if not state.get("node_stats"):
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    record = {"timestamp": time.time(), "topic": state.get("topic"), "nodes": state["node_stats"]}
+    if state.get("degradations"):
+        record["degradations"] = state["degradations"]
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_history(limit: int = HISTORY_RUNS, path: str = RUN_STATS_PATH) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()[-limit:]
+    history = []
+    for line in lines:
+        try:
+            history.append(json.loads(line))
+        except ValueError:
+            continue
+    return history
+
+
+def node_summary(history: List[Dict]) -> Dict[str, Dict]:
+    """Per node over the given runs: p50/p95 latency and mean tokens, USD and requests."""
+    per_node = {}
+    for run in history:
+        for name, s in run.get("nodes", {}).items():
+            per_node.setdefault(name, []).append(s)
+    summary = {}
+    for name, runs in per_node.items():
+        latencies = [s["latency_s"] for s in runs]
+        summary[name] = {
+            "runs": len(runs),
+            "p50_s": percentile(latencies, 0.5),
+            "p95_s": percentile(latencies, 0.95),
+            "tokens": sum(s["tokens"] for s in runs) / len(runs),
+            "cost_usd": sum(s["cost_usd"] for s in runs) / len(runs),
+            "requests": sum(s["requests"] for s in runs) / len(runs),
+        }
+    return summary
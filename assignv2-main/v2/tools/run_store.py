@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from tools.plan_cache import topic_key
+
+RUNS_DIR = os.getenv("RUNS_DIR", ".cache/runs")
+
+# a subtopic counts as materially changed when it gained at least this many
+# new articles, or this share of its previous article count
+REFRESH_MIN_NEW_ARTICLES = 3
+REFRESH_MIN_NEW_RATIO = 0.25
+RUN_MAX_ARTICLES = int(os.getenv("RUN_MAX_ARTICLES", "40"))  # articles kept per subtopic in a saved run
+
+
+def content_hash(article: Dict) -> str:
+    """Hash of the normalized content (or the snippet for snippet-only articles)."""
+    text = article.get("content") or article.get("snippet") or ""
+    normalized = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _path(topic: str) -> str:
+    return os.path.join(RUNS_DIR, topic_key(topic).replace(" ", "_") + ".json")
+
+
+def load_run(topic: str) -> Optional[Dict]:
+    """The previous run saved for this topic, or None."""
+    path = _path(topic)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _capped(articles: List[Dict], citations: set) -> List[Dict]:
+    """At most RUN_MAX_ARTICLES per subtopic: the cited ones first, then the newest, in their original order."""
+    if len(articles) <= RUN_MAX_ARTICLES:
+        return articles
+    newest_first = list(reversed(range(len(articles))))
+    ranked = sorted(newest_first, key=lambda i: articles[i].get("url") not in citations)
+    return [articles[i] for i in sorted(ranked[:RUN_MAX_ARTICLES])]
+
+
+def save_run(state) -> str:
+    """
+    Persist the run's fetched articles (with content hashes) and report for
+    later refreshes. Snippet-only articles (unfetched lazy-mode hits, or
+    hits left unfetched at a deadline cutoff) are not saved, so a refresh
+    does not skip their URLs and can fetch them.
+    """
+    citations = set(state.get("citations", []))
+    search_results = {
+        subtopic: [
+            {**a, "hash": a.get("hash") or content_hash(a)}
+            for a in _capped([a for a in articles if not a.get("snippet_only")], citations)
+        ]
+        for subtopic, articles in state.get("search_results", {}).items()
+    }
+    run = {
+        "topic": state["topic"],
+        "created_at": time.time(),
+        "subtopics": state.get("subtopics", []),
+        "search_results": search_results,
+        "final_markdown": state.get("final_markdown", ""),
+        "citations": sorted(state.get("citations", [])),
+    }
+    path = _path(state["topic"])
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(run, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+def seen_urls(previous: Optional[Dict]) -> set:
+    if not previous:
+        return set()
+    return {a.get("url") for articles in previous["search_results"].values() for a in articles}
+
+
+def merge_previous(search_results: Dict[str, List[Dict]], previous: Optional[Dict]) -> Dict[str, List[Dict]]:
+    """Put the previous run's articles in front of the newly found ones, per subtopic."""
+    if not previous:
+        return search_results
+    merged = {}
+    for subtopic, articles in search_results.items():
+        old = previous["search_results"].get(subtopic, [])
+        old_urls = {a.get("url") for a in old}
+        merged[subtopic] = old + [a for a in articles if a.get("url") not in old_urls]
+    return merged
+
+
+def changed_subtopics(search_results: Dict[str, List[Dict]], previous: Optional[Dict]) -> List[str]:
+    """Subtopics whose set of content hashes grew materially since the previous run (snippet-only articles do not count)."""
+    if not previous:
+        return list(search_results)
+    changed = []
+    for subtopic, articles in search_results.items():
+        old_hashes = {a.get("hash") for a in previous["search_results"].get(subtopic, [])}
+        new_hashes = {content_hash(a) for a in articles if not a.get("snippet_only")} - old_hashes
+        if not old_hashes or len(new_hashes) >= max(REFRESH_MIN_NEW_ARTICLES, REFRESH_MIN_NEW_RATIO * len(old_hashes)):
+            changed.append(subtopic)
+    return changed
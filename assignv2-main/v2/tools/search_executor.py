@@ -0,0 +1,117 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from tools.web_search import web_search
+
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "4"))
+SEARCH_RATE_PER_S = float(os.getenv("SEARCH_RATE_PER_S", "2"))  # query starts per second, all workers together
+SEARCH_JITTER_S = float(os.getenv("SEARCH_JITTER_S", "0.3"))  # random extra spacing so starts do not line up
+SEARCH_RETRIES = 3
+BACKOFF_BASE_S = 5.0
+BACKOFF_MAX_S = 60.0
+
+
+def _is_throttled(exc: Exception) -> bool:
+    from ddgs.exceptions import RatelimitException
+
+    text = str(exc).lower()
+    return isinstance(exc, RatelimitException) or "ratelimit" in text or "429" in text or "too many requests" in text
+
+
+def _is_empty(exc: Exception) -> bool:
+    return "no results found" in str(exc).lower()
+
+
+class SearchExecutor:
+    """
+    Runs DDGS queries concurrently under one shared rate limit. Query starts
+    are spaced by 1/SEARCH_RATE_PER_S plus jitter across all workers; when
+    any worker is throttled, every worker pauses for an exponentially
+    growing backoff before the query is retried. With a `cutoff`
+    (time.time()), queries whose turn would come after it are not started.
+    """
+
+    def __init__(self, workers: int = SEARCH_WORKERS, rate_per_s: float = SEARCH_RATE_PER_S, jitter_s: float = SEARCH_JITTER_S):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search")
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self.jitter_s = jitter_s
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+        self.paused_until = 0.0
+        self.backoff_s = BACKOFF_BASE_S
+        self.stats = {"queries": 0, "throttled": 0, "failed": 0, "skipped": 0, "waited_s": 0.0}
+
+    def _wait_turn(self, cutoff: Optional[float] = None) -> bool:
+        """
+        Block until this worker may start a query: after any global pause and
+        its rate-limit slot. False, without waiting, when that is past cutoff.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.next_start, self.paused_until)
+                if cutoff is not None and time.time() + (start - now) >= cutoff:
+                    self.stats["skipped"] += 1
+                    return False
+                self.next_start = start + self.interval + random.uniform(0, self.jitter_s)
+                self.stats["waited_s"] += start - now
+            if start > now:
+                time.sleep(start - now)
+            # a worker throttled while this one waited pauses everyone; reserved slots are taken again
+            with self.lock:
+                if self.paused_until <= time.monotonic():
+                    return True
+
+    def _throttled(self):
+        with self.lock:
+            self.stats["throttled"] += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + self.backoff_s)
+            print(f"[search] Throttled by the search provider, pausing all queries for {self.backoff_s:.1f}s")
+            self.backoff_s = min(BACKOFF_MAX_S, self.backoff_s * 2)
+
+    def search(self, query: str, max_results: int = 4, cutoff: Optional[float] = None) -> List[Dict]:
+        """One rate-limited query; [] when it keeps failing or cannot start before cutoff."""
+        for attempt in range(SEARCH_RETRIES):
+            if not self._wait_turn(cutoff):
+                return []
+            try:
+                results = web_search(query, max_results=max_results)
+            except Exception as exc:
+                if _is_empty(exc):
+                    return []
+                if _is_throttled(exc):
+                    self._throttled()
+                    continue
+                if attempt < SEARCH_RETRIES - 1:
+                    continue
+                print(f"[search] Query failed {query!r}: {exc}")
+                break
+            with self.lock:
+                self.stats["queries"] += 1
+                self.backoff_s = BACKOFF_BASE_S
+            return results
+        with self.lock:
+            self.stats["failed"] += 1
+        return []
+
+    def search_many(self, queries: List[str], max_results: int = 4, cutoff: Optional[float] = None) -> List[List[Dict]]:
+        """Dispatch all queries at once; results come back in query order."""
+        futures = [self.pool.submit(self.search, q, max_results, cutoff) for q in queries]
+        return [f.result() for f in futures]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> SearchExecutor:
+    """Process-wide executor, so concurrent nodes and jobs share one rate limit."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = SearchExecutor()
+        return _executor
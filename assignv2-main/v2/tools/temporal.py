@@ -0,0 +1,161 @@
+import calendar
+import re
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTHS["sept"] = 9
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "eighteen": 18, "twenty": 20, "twenty-four": 24,
+    "a couple of": 2, "couple of": 2, "a few": 3, "few": 3, "several": 3,
+}
+ORDINALS = {"first": 1, "1st": 1, "second": 2, "2nd": 2, "third": 3, "3rd": 3, "fourth": 4, "4th": 4}
+VAGUE_TIME = re.compile(r"\b(recent(ly)?|latest|current(ly)?|upcoming|future|nowadays|today|modern|emerging|historic(al)?)\b", re.I)
+
+YEAR = r"((?:19|20)\d{2})"
+COUNT = r"(\d+|" + "|".join(sorted((re.escape(w) for w in NUMBER_WORDS), key=len, reverse=True)) + r")"
+UNIT = r"(years?|months?|quarters?|weeks?|days?|decades?)"
+MONTH = r"(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+
+
+def _month_end(year: int, month: int) -> date:
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _shift_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _span(today: date, count: int, unit: str, forward: bool):
+    """
+    (start, end) for "last/next N <unit>". Years are calendar years, so "last
+    three years" is the three completed years before this one (as query_node
+    has always searched them); shorter units roll back from today.
+    """
+    unit = unit.rstrip("s")
+    if unit in ("year", "decade"):
+        years = count * (10 if unit == "decade" else 1)
+        if forward:
+            return date(today.year + 1, 1, 1), date(today.year + years, 12, 31)
+        return date(today.year - years, 1, 1), date(today.year - 1, 12, 31)
+    if unit in ("month", "quarter"):
+        months = count * (3 if unit == "quarter" else 1)
+        return (today, _shift_months(today, months)) if forward else (_shift_months(today, -months), today)
+    days = count * (7 if unit == "week" else 1)
+    return (today, today + timedelta(days=days)) if forward else (today - timedelta(days=days), today)
+
+
+def _quarter(year: int, quarter: int):
+    return date(year, 3 * quarter - 2, 1), _month_end(year, 3 * quarter)
+
+
+def _result(start: date, end: date, phrase: str, granularity: str, confidence: float) -> Dict:
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "phrase": re.sub(r"^(in|during|for|from)\s+", "", phrase.strip()),
+        "granularity": granularity,
+        "confidence": confidence,
+    }
+
+
+def parse_time_range(text: str, today: Optional[date] = None) -> Optional[Dict]:
+    """
+    Normalized date range for the first temporal expression in `text`:
+    {"start", "end"} as ISO dates plus the matched phrase, its granularity
+    (quarter, half, month, year, rolling) and a confidence. Handles quarters
+    and halves ("Q3 2025", "first half of 2024"), months ("March 2025"),
+    explicit ranges ("2020-2023", "between 2019 and 2021"), "since 2022",
+    "year to date", relative periods ("past 18 months", "last three years",
+    "next two years", "last quarter") and bare years. None if nothing matched.
+    """
+    if not text:
+        return None
+    today = today or date.today()
+    s = text.lower()
+
+    m = (re.search(r"\bq(?P<q>[1-4])\s*(?:of\s+)?(?:fy\s*)?(?P<y>(?:19|20)\d{2})\b", s)
+         or re.search(r"\b(?P<y>(?:19|20)\d{2})\s*q(?P<q>[1-4])\b", s))
+    if m:
+        return _result(*_quarter(int(m.group("y")), int(m.group("q"))), m.group(0), "quarter", 1.0)
+    m = re.search(rf"\b({'|'.join(ORDINALS)})\s+quarter\s+(?:of\s+)?{YEAR}\b", s)
+    if m:
+        return _result(*_quarter(int(m.group(2)), ORDINALS[m.group(1)]), m.group(0), "quarter", 1.0)
+    m = re.search(rf"\bh([12])\s*{YEAR}\b", s) or re.search(rf"\b(first|second)\s+half\s+(?:of\s+)?{YEAR}\b", s)
+    if m:
+        half, year = ORDINALS.get(m.group(1)) or int(m.group(1)), int(m.group(2))
+        return _result(date(year, 6 * half - 5, 1), _month_end(year, 6 * half), m.group(0), "half", 1.0)
+    m = re.search(rf"\b{MONTH}\s+{YEAR}\b", s)
+    if m:
+        year, month = int(m.group(2)), MONTHS[m.group(1)]
+        return _result(date(year, month, 1), _month_end(year, month), m.group(0), "month", 1.0)
+    m = re.search(rf"\b(?:from\s+|between\s+)?{YEAR}\s*(?:-|–|to|and|through|until)\s*{YEAR}\b", s)
+    if m and int(m.group(1)) <= int(m.group(2)):
+        return _result(date(int(m.group(1)), 1, 1), date(int(m.group(2)), 12, 31), m.group(0), "year", 1.0)
+    m = re.search(rf"\b(?:since|after)\s+{YEAR}\b", s)
+    if m:
+        return _result(date(int(m.group(1)), 1, 1), today, m.group(0), "rolling", 1.0)
+    m = re.search(r"\b(year[\s-]to[\s-]date|ytd|so far this year)\b", s)
+    if m:
+        return _result(date(today.year, 1, 1), today, m.group(0), "rolling", 1.0)
+
+    m = re.search(rf"\b(last|past|previous|recent|next|coming|upcoming)\s+{COUNT}\s+{UNIT}\b", s)
+    if m:
+        count = int(m.group(2)) if m.group(2).isdigit() else NUMBER_WORDS[m.group(2)]
+        forward = m.group(1) in ("next", "coming", "upcoming")
+        granularity = "year" if m.group(3).rstrip("s") in ("year", "decade") else "rolling"
+        return _result(*_span(today, count, m.group(3), forward), m.group(0), granularity, 0.9)
+    m = re.search(r"\b(last|past|previous|this|current|next|coming)\s+(year|month|quarter|week|decade)\b", s)
+    if m:
+        which, unit = m.groups()
+        if which in ("this", "current"):
+            if unit == "year":
+                return _result(date(today.year, 1, 1), date(today.year, 12, 31), m.group(0), "year", 0.9)
+            if unit == "quarter":
+                quarter = (today.month - 1) // 3 + 1
+                return _result(*_quarter(today.year, quarter), m.group(0), "quarter", 0.9)
+            if unit == "month":
+                return _result(date(today.year, today.month, 1), _month_end(today.year, today.month), m.group(0), "month", 0.9)
+            return _result(today - timedelta(days=today.weekday()), today, m.group(0), "rolling", 0.9)
+        forward = which in ("next", "coming")
+        if unit == "quarter":
+            quarter = (today.month - 1) // 3 + (2 if forward else 0)
+            year = today.year + (quarter - 1) // 4
+            return _result(*_quarter(year, (quarter - 1) % 4 + 1), m.group(0), "quarter", 0.9)
+        if unit == "month":
+            month = _shift_months(today, 1 if forward else -1)
+            return _result(date(month.year, month.month, 1), _month_end(month.year, month.month), m.group(0), "month", 0.9)
+        granularity = "year" if unit in ("year", "decade") else "rolling"
+        return _result(*_span(today, 1, unit, forward), m.group(0), granularity, 0.9)
+
+    years = [int(y) for y in re.findall(rf"\b{YEAR}\b", s)]
+    if years:
+        phrase = re.search(rf"\b(?:in\s+|during\s+|for\s+)?{YEAR}\b", s).group(0)
+        if len(years) > 1:
+            phrase = ", ".join(str(y) for y in sorted(set(years)))
+        return _result(date(min(years), 1, 1), date(max(years), 12, 31), phrase, "year", 0.9)
+    return None
+
+
+def search_terms(date_range: Dict) -> str:
+    """
+    Text to append to search queries: "Q3 2025", "H1 2024" or "March 2025"
+    for ranges within a quarter, half or month (relative ones like "last
+    quarter" included), otherwise the covered years ("2023 2024 2025"), or
+    "2010-2025" when that would be more than four.
+    """
+    start, end = date.fromisoformat(date_range["start"]), date.fromisoformat(date_range["end"])
+    if start.year == end.year:
+        if date_range["granularity"] == "quarter":
+            return f"Q{(start.month - 1) // 3 + 1} {start.year}"
+        if date_range["granularity"] == "half":
+            return f"H{1 if start.month <= 6 else 2} {start.year}"
+        if date_range["granularity"] == "month":
+            return f"{calendar.month_name[start.month]} {start.year}"
+    if end.year - start.year >= 4:
+        return f"{start.year}-{end.year}"
+    return " ".join(str(y) for y in range(start.year, end.year + 1))
@@ -1,12 +1,43 @@
-from ddgs import DDGS
-import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from io import BytesIO
+import codecs
 import re
-try:
-    from pypdf import PdfReader
-except Exception:
-    PdfReader = None
+import threading
+import time
+from tools.fetch_health import get_health
+from tools.profiling import profiled
+from tools.ranking import url_domain
+from tools.run_stats import count_request
+
+# requests, bs4, pypdf and ddgs are imported on first use to keep startup fast
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    )
+}
+FETCH_DEADLINE_S = 20.0  # total wall clock per fetch, including slow-drip bodies
+MAX_BYTES = 5_000_000  # longer bodies are truncated (pages) or skipped (PDFs)
+BLOCK_TAGS = [
+    "p", "div", "li", "br", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article",
+    "header", "footer", "nav", "aside", "blockquote", "pre", "figcaption", "dt", "dd",
+]
+
+_CHARSET_HEADER = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+_CHARSET_META = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+class FetchError(Exception):
+    """A failed download; `kind` is recorded in the domain stats and `trip` feeds the breaker."""
+
+    def __init__(self, kind: str, trip: bool = True):
+        super().__init__(kind)
+        self.kind = kind
+        self.trip = trip
+
 
 def _is_pdf_url(url: str) -> bool:
     if not url:
@@ -14,23 +45,83 @@ def _is_pdf_url(url: str) -> bool:
     return bool(re.search(r"\.pdf($|\?)", url, re.IGNORECASE))
 
 
-def fetch_pdf_text(url: str, timeout: int = 20, max_pages: int = 20, max_chars: int = 20000) -> str:
+def _download(url: str, timeout, deadline: float, cancel: threading.Event = None):
     """
-    Download a PDF and extract text. Returns empty string on failure.
+    Stream a response body, enforcing `deadline` (a time.monotonic() value)
+    across connect and the whole read, not just per socket operation.
+    Returns (body bytes, content type, whether the body was cut at MAX_BYTES).
     """
+    import requests
+
+    count_request("fetch")
+    try:
+        resp = requests.get(url, headers=HEADERS, timeout=timeout, stream=True)
+    except requests.Timeout:
+        raise FetchError("timeout")
+    except requests.RequestException:
+        raise FetchError("connection")
+    try:
+        if resp.status_code in (401, 403, 429) or resp.status_code >= 500:
+            raise FetchError(f"http_{resp.status_code}")
+        if resp.status_code >= 400:
+            raise FetchError(f"http_{resp.status_code}", trip=False)
+        chunks, size, truncated = [], 0, False
+        try:
+            for chunk in resp.iter_content(chunk_size=16384):
+                if cancel is not None and cancel.is_set():
+                    raise FetchError("cancelled", trip=False)
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > MAX_BYTES:
+                    truncated = True
+                    break
+                if time.monotonic() > deadline:
+                    raise FetchError("deadline")
+        except requests.RequestException:
+            raise FetchError("timeout")
+        return b"".join(chunks), resp.headers.get("Content-Type", ""), truncated
+    finally:
+        resp.close()
+
+
+def _hedged_download(url: str, timeout, deadline: float, delay: float):
+    """Start a duplicate request if the first has not finished after `delay` seconds; first success wins."""
+    cancel = threading.Event()
+    futures = [_hedge_pool.submit(_download, url, timeout, deadline, cancel)]
+    done, _ = wait(futures, timeout=delay)
+    if not done:
+        futures.append(_hedge_pool.submit(_download, url, timeout, deadline, cancel))
+    error = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            try:
+                result = f.result()
+            except FetchError as exc:
+                error = exc
+                continue
+            cancel.set()
+            return result
+    raise error
+
+
+def _pdf_reader():
+    """pypdf's PdfReader, or None if the library is not available."""
+    try:
+        from pypdf import PdfReader
+    except Exception:
+        return None
+    return PdfReader
+
+
+@profiled("pdf_bytes_to_text", helper=True)
+def _pdf_bytes_to_text(data: bytes, max_pages: int = 20, max_chars: int = 20000) -> str:
+    PdfReader = _pdf_reader()
     if not PdfReader:
         return ""  # library not available
     try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
-            )
-        }
-        resp = requests.get(url, headers=headers, timeout=timeout)
-        resp.raise_for_status()
-        bio = BytesIO(resp.content)
-        reader = PdfReader(bio)
+        reader = PdfReader(BytesIO(data))
         texts = []
         for i, page in enumerate(reader.pages[:max_pages]):
             try:
@@ -44,6 +135,92 @@ def fetch_pdf_text(url: str, timeout: int = 20, max_pages: int = 20, max_chars:
         return ""
 
 
+@profiled("extract_html_text", helper=True)
+def extract_html_text(html: str, max_chars: int = 20000) -> str:
+    """Extract readable text from an HTML document."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "iframe"]):
+        tag.decompose()
+    # one line per block element, so repeated navigation/footer lines can be recognised later
+    for tag in soup.find_all(BLOCK_TAGS):
+        tag.insert_after("\n")
+    lines = (re.sub(r"\s+", " ", line).strip() for line in soup.get_text().split("\n"))
+    text = "\n".join(line for line in lines if line)
+    return text[:max_chars]
+
+
+def _fetch(url: str, timeout: float):
+    """
+    Download `url` under the domain's health policy: skipped while its circuit
+    breaker is open, adaptive timeouts, a total deadline and hedging for slow
+    hosts. Outcomes are recorded in the domain stats. Returns (bytes, content
+    type, truncated), or None on failure.
+    """
+    domain = url_domain(url)
+    health = get_health()
+    if not health.allow(domain):
+        return None
+    connect_read = health.timeout(domain, timeout)
+    deadline = time.monotonic() + min(FETCH_DEADLINE_S, 2 * connect_read[1])
+    delay = health.hedge_delay(domain)
+    started = time.monotonic()
+    try:
+        if delay is not None:
+            data, ctype, truncated = _hedged_download(url, connect_read, deadline, delay)
+        else:
+            data, ctype, truncated = _download(url, connect_read, deadline)
+    except FetchError as exc:
+        health.record(domain, False, time.monotonic() - started, error=exc.kind, trip=exc.trip)
+        return None
+    except Exception:
+        health.record(domain, False, time.monotonic() - started, error="error", trip=False)
+        return None
+    health.record(domain, True, time.monotonic() - started, nbytes=len(data))
+    return data, ctype, truncated
+
+
+def _decode(data: bytes, ctype: str) -> str:
+    """
+    Page bytes as text: the charset from the Content-Type header, else a
+    <meta charset> in the head, else UTF-8 if the bytes are valid UTF-8,
+    else charset_normalizer's best guess.
+    """
+    match = _CHARSET_HEADER.search(ctype or "") or _CHARSET_META.search(data[:4096])
+    if match:
+        name = match.group(1)
+        name = name.decode("ascii", errors="ignore") if isinstance(name, bytes) else name
+        try:
+            return data.decode(codecs.lookup(name).name, errors="replace")
+        except LookupError:
+            pass  # unknown charset name: detect instead
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    from charset_normalizer import from_bytes
+
+    best = from_bytes(data).best()
+    if best is not None:
+        return str(best)
+    return data.decode("utf-8", errors="replace")
+
+
+@profiled("fetch_pdf_text", helper=True)
+def fetch_pdf_text(url: str, timeout: int = 20, max_pages: int = 20, max_chars: int = 20000) -> str:
+    """
+    Download a PDF and extract text. Returns empty string on failure.
+    """
+    if not _pdf_reader():
+        return ""  # library not available
+    fetched = _fetch(url, timeout)
+    if not fetched or fetched[2]:
+        return ""  # failed, or cut at MAX_BYTES: a truncated PDF does not parse reliably
+    return _pdf_bytes_to_text(fetched[0], max_pages=max_pages, max_chars=max_chars)
+
+
+@profiled("fetch_page_text", helper=True)
 def fetch_page_text(url: str, timeout: int = 15, max_chars: int = 20000) -> str:
     """
     Fetch and extract readable text from a web page URL.
@@ -51,39 +228,30 @@ def fetch_page_text(url: str, timeout: int = 15, max_chars: int = 20000) -> str:
     """
     if not url:
         return ""
+    fetched = _fetch(url, timeout)
+    if not fetched:
+        return ""
+    data, ctype, truncated = fetched
+    # PDF by URL, content-type or magic bytes: parse the body we already have
+    if _is_pdf_url(url) or "pdf" in ctype.lower() or data[:5] == b"%PDF-":
+        if truncated:
+            return ""  # over MAX_BYTES: skipped rather than parsed from a truncated file
+        pdf_text = _pdf_bytes_to_text(data, max_chars=max_chars)
+        if pdf_text:
+            return pdf_text
     try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
-            )
-        }
-        # If it looks like a PDF URL, try PDF parsing directly
-        if _is_pdf_url(url):
-            pdf_text = fetch_pdf_text(url, timeout=timeout, max_chars=max_chars)
-            if pdf_text:
-                return pdf_text
-
-        resp = requests.get(url, headers=headers, timeout=timeout)
-        resp.raise_for_status()
-        # If server reports PDF content-type, switch to PDF parser
-        ctype = resp.headers.get("Content-Type", "")
-        if "pdf" in ctype.lower():
-            pdf_text = fetch_pdf_text(url, timeout=timeout, max_chars=max_chars)
-            if pdf_text:
-                return pdf_text
-        soup = BeautifulSoup(resp.text, "html.parser")
-        for tag in soup(["script", "style", "noscript", "iframe"]):
-            tag.decompose()
-        text = " ".join(s.strip() for s in soup.stripped_strings)
-        return text[:max_chars]
+        return extract_html_text(_decode(data, ctype), max_chars=max_chars)
     except Exception:
         return ""
 
+@profiled("web_search", helper=True)
 def web_search(query: str, max_results: int = 4):
     """
     Perform a DuckDuckGo text search and return structured results.
     """
+    from ddgs import DDGS
+
+    count_request("search")
     results = []
 
     with DDGS() as ddgs:
@@ -7,170 +7,19 @@ Usage: python utils/json_to_pdf.py <input_json> <output_pdf>
 import json
 import sys
 import os
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.enums import TA_LEFT, TA_JUSTIFY
-from reportlab.pdfbase.pdfmetrics import registerFontFamily
 import re
 
+# allow `python utils/json_to_pdf.py` from the project root as well as `import utils.json_to_pdf`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 
 def html_to_pdf(html_text: str, output_path: str, topic: str = "Research Report"):
     """Convert HTML text to a properly formatted PDF."""
-    
-    # Register Times font family for proper bold/italic rendering
-    registerFontFamily('Times-Roman', normal='Times-Roman', bold='Times-Bold', 
-                       italic='Times-Italic', boldItalic='Times-BoldItalic')
-    
-    # Ensure output directory exists
-    os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else ".", exist_ok=True)
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(
-        output_path,
-        pagesize=letter,
-        rightMargin=0.75*inch,
-        leftMargin=0.75*inch,
-        topMargin=0.75*inch,
-        bottomMargin=0.75*inch,
-    )
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles using Times-Roman (LaTeX-like serif font)
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        fontName='Times-Roman',
-        fontSize=24,
-        leading=28,
-        spaceAfter=20,
-        alignment=TA_LEFT,
-    )
-    
-    h1_style = ParagraphStyle(
-        'CustomH1',
-        fontName='Times-Roman',
-        fontSize=14,
-        leading=17,
-        spaceAfter=12,
-        spaceBefore=14,
-        alignment=TA_LEFT,
-    )
-    
-    h2_style = ParagraphStyle(
-        'CustomH2',
-        fontName='Times-Roman',
-        fontSize=12,
-        leading=15,
-        spaceAfter=10,
-        spaceBefore=12,
-        alignment=TA_LEFT,
-    )
-    
-    h3_style = ParagraphStyle(
-        'CustomH3',
-        fontName='Times-Roman',
-        fontSize=11,
-        leading=14,
-        spaceAfter=8,
-        spaceBefore=10,
-        alignment=TA_LEFT,
-    )
-    
-    body_style = ParagraphStyle(
-        'CustomBody',
-        fontName='Times-Roman',
-        fontSize=11,
-        leading=16,
-        alignment=TA_JUSTIFY,
-        spaceAfter=6,
-    )
-    
-    bullet_style = ParagraphStyle(
-        'CustomBullet',
-        fontName='Times-Roman',
-        fontSize=11,
-        leading=14,
-        leftIndent=20,
-        spaceAfter=6,
-        alignment=TA_LEFT,
-    )
-    
-    small_ref_style = ParagraphStyle(
-        'SmallRef',
-        fontName='Times-Roman',
-        fontSize=7,
-        leading=10,
-        alignment=TA_LEFT,
-        spaceAfter=2,
-    )
-    
-    # Build document content
-    story = []
-    
-    html_text = (
-        html_text.replace("<br>", " ")
-        .replace("<br/>", " ")
-        .replace("<br />", " ")
-    )
+    # reportlab is only imported when a PDF is actually rendered
+    from utils.report_renderer import render_html
 
-    # Parse HTML line by line
-    lines = html_text.split('\n')
-    
-    in_references = False
-    
-    for line in lines:
-        line = line.rstrip()
-        
-        # Skip empty lines
-        if not line.strip():
-            story.append(Spacer(1, 8))
-            continue
-        
-        # Check if we're entering references section
-        if '<h2>References</h2>' in line:
-            in_references = True
-            story.append(Paragraph("<b>References</b>", h1_style))
-            continue
-        
-        # Use small style for everything in references
-        current_body_style = small_ref_style if in_references else body_style
-        current_bullet_style = small_ref_style if in_references else bullet_style
-        
-        # H1 headings
-        if line.startswith('<h1>'):
-            story.append(Paragraph(line, title_style))
-            
-        # H2 headings
-        elif line.startswith('<h2>'):
-            story.append(Paragraph(line, h1_style))
-            
-        # H3 headings
-        elif line.startswith('<h3>'):
-            story.append(Paragraph(line, h2_style))
-            
-        # H4 headings
-        elif line.startswith('<h4>'):
-            story.append(Paragraph(line, h3_style))
-            
-        # List items
-        elif line.startswith('<li>'):
-            story.append(Paragraph(line, current_bullet_style))
-            
-        # Paragraphs and other HTML content
-        elif line.startswith('<p>') or '<' in line:
-            story.append(Paragraph(line, current_body_style))
-            
-        # Plain text
-        else:
-            if line.strip():
-                story.append(Paragraph(line, current_body_style))
-    
-    # Build PDF
-    doc.build(story)
-    print(f"✓ PDF generated: {output_path}")
+    pages = render_html(html_text, output_path, theme="document")
+    print(f"✓ PDF generated: {output_path} ({pages} pages)")
 
 
 def process_inline_markdown(text: str) -> str:
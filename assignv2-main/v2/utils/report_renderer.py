@@ -0,0 +1,211 @@
+"""
+Shared HTML-to-PDF renderer for the generated reports.
+
+The report HTML is tokenized into block elements (headings, paragraphs,
+list items) with a streaming html.parser parser instead of being split on
+newlines, so a whole section emitted on one line still becomes separate
+paragraphs, and list wrappers (<ul>, <ol>) produce no empty flowables.
+Oversized paragraphs are split at sentence boundaries outside inline tags,
+which keeps reportlab's layout and page splitting fast. Paragraph styles
+are built once per theme and reused.
+"""
+
+import functools
+import os
+import re
+from html import escape
+from html.parser import HTMLParser
+
+MAX_PARAGRAPH_CHARS = 2500  # longer blocks are split into several Paragraph flowables
+
+BLOCK_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "blockquote", "pre", "dt", "dd", "figcaption"}
+INLINE_TAGS = {"b": "b", "strong": "b", "i": "i", "em": "i", "u": "u", "sup": "super", "sub": "sub", "a": "a"}
+SENTENCE_END = re.compile(r"[.!?;] ")
+
+# theme -> block kind -> ParagraphStyle keyword arguments
+THEMES = {
+    # pdf_node: compact headings, justified throughout
+    "report": {
+        "h1": dict(fontSize=18, leading=22, alignment="justify", spaceAfter=12),
+        "h2": dict(fontSize=14, leading=17, alignment="justify", spaceAfter=10, spaceBefore=12),
+        "h3": dict(fontSize=12, leading=15, alignment="justify", spaceAfter=8, spaceBefore=10),
+        "h4": dict(fontSize=12, leading=15, alignment="justify", spaceAfter=8, spaceBefore=10),
+        "body": dict(fontSize=11, leading=16, alignment="justify", spaceAfter=6),
+        "li": dict(fontSize=11, leading=16, alignment="justify", spaceAfter=6, leftIndent=14, bulletIndent=4),
+        "ref": dict(fontSize=7, leading=10, alignment="left", spaceAfter=2),
+    },
+    # utils/json_to_pdf.py: larger title, left-aligned headings, indented bullets
+    "document": {
+        "h1": dict(fontSize=24, leading=28, alignment="left", spaceAfter=20),
+        "h2": dict(fontSize=14, leading=17, alignment="left", spaceAfter=12, spaceBefore=14),
+        "h3": dict(fontSize=12, leading=15, alignment="left", spaceAfter=10, spaceBefore=12),
+        "h4": dict(fontSize=11, leading=14, alignment="left", spaceAfter=8, spaceBefore=10),
+        "body": dict(fontSize=11, leading=16, alignment="justify", spaceAfter=6),
+        "li": dict(fontSize=11, leading=14, alignment="left", spaceAfter=6, leftIndent=20, bulletIndent=8),
+        "ref": dict(fontSize=7, leading=10, alignment="left", spaceAfter=2),
+    },
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _styles(theme: str) -> dict:
+    """ParagraphStyles for a theme, plus ":first" / ":cont" / ":last" variants for split paragraphs."""
+    from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfbase.pdfmetrics import registerFontFamily
+
+    # Register Times font family for proper bold/italic rendering
+    registerFontFamily('Times-Roman', normal='Times-Roman', bold='Times-Bold',
+                       italic='Times-Italic', boldItalic='Times-BoldItalic')
+    alignments = {"justify": TA_JUSTIFY, "left": TA_LEFT}
+    styles = {}
+    for kind, kwargs in THEMES[theme].items():
+        kwargs = {**kwargs, "alignment": alignments[kwargs["alignment"]]}
+        style = ParagraphStyle(f"{theme}-{kind}", fontName='Times-Roman', **kwargs)
+        styles[kind] = style
+        styles[f"{kind}:first"] = ParagraphStyle(f"{theme}-{kind}-first", parent=style, spaceAfter=0)
+        styles[f"{kind}:cont"] = ParagraphStyle(f"{theme}-{kind}-cont", parent=style, spaceBefore=0, spaceAfter=0)
+        styles[f"{kind}:last"] = ParagraphStyle(f"{theme}-{kind}-last", parent=style, spaceBefore=0)
+    return styles
+
+
+class _BlockParser(HTMLParser):
+    """
+    Streams HTML into (tag, reportlab markup, safe split offsets) blocks.
+    Text outside any block element becomes a paragraph; wrapper and unknown
+    tags are dropped but their text is kept.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self.tag = None
+        self.parts = []
+        self.length = 0
+        self.splits = []
+        self.open_inline = []
+
+    def _flush(self):
+        while self.open_inline:  # close anything the model left open
+            self._append(f"</{self.open_inline.pop()}>")
+        raw = "".join(self.parts)
+        markup = raw.strip()
+        if re.sub(r"<[^>]+>", "", markup).strip():
+            lead = len(raw) - len(raw.lstrip())
+            splits = [s - lead for s in self.splits if lead < s < lead + len(markup)]
+            self.blocks.append((self.tag or "p", markup, splits))
+        self.tag, self.parts, self.length, self.splits = None, [], 0, []
+        self.open_inline = []
+
+    def _append(self, text: str):
+        self.parts.append(text)
+        self.length += len(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self.tag = tag
+        elif tag == "br":
+            self._append(" ")
+        elif tag in INLINE_TAGS:
+            name = INLINE_TAGS[tag]
+            if name == "a":
+                href = dict(attrs).get("href")
+                if not href:
+                    return
+                self._append(f'<a href="{escape(href, quote=True)}">')
+            else:
+                self._append(f"<{name}>")
+            self.open_inline.append(name)
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS:
+            self._flush()
+        elif tag in INLINE_TAGS and INLINE_TAGS[tag] in self.open_inline:
+            name = INLINE_TAGS[tag]
+            while self.open_inline:  # close anything the model left open inside it
+                inner = self.open_inline.pop()
+                self._append(f"</{inner}>")
+                if inner == name:
+                    break
+
+    def handle_data(self, data):
+        text = escape(re.sub(r"\s+", " ", data), quote=False)
+        if not self.open_inline:
+            self.splits.extend(self.length + m.end() for m in SENTENCE_END.finditer(text))
+        self._append(text)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def parse_blocks(html_text: str):
+    """[(tag, markup, split offsets)] for the report HTML."""
+    parser = _BlockParser()
+    parser.feed(html_text)
+    parser.close()
+    return parser.blocks
+
+
+def _chunks(markup: str, splits, limit: int = MAX_PARAGRAPH_CHARS):
+    """Cut markup into pieces of at most ~limit chars at the given safe offsets."""
+    if len(markup) <= limit or not splits:
+        return [markup]
+    pieces, start = [], 0
+    for i, offset in enumerate(splits):
+        following = splits[i + 1] if i + 1 < len(splits) else len(markup)
+        if following - start > limit and offset > start:
+            pieces.append(markup[start:offset].strip())
+            start = offset
+    pieces.append(markup[start:].strip())
+    return [p for p in pieces if p]
+
+
+def html_to_flowables(html_text: str, theme: str = "report"):
+    """Block-level flowables for the report HTML."""
+    from reportlab.platypus import Paragraph
+
+    styles = _styles(theme)
+    story = []
+    in_references = False
+    for tag, markup, splits in parse_blocks(html_text):
+        plain = re.sub(r"<[^>]+>", "", markup).strip()
+        if tag.startswith("h"):
+            level = min(int(tag[1]), 4)
+            if plain.lower().rstrip(":") in ("references", "reference list", "sources", "bibliography"):
+                in_references = True
+                story.append(Paragraph(f"<b>{plain}</b>", styles["h2"]))
+                continue
+            story.append(Paragraph(markup, styles[f"h{level}"]))
+            continue
+
+        kind = "ref" if in_references else ("li" if tag == "li" else "body")
+        bullet = "•" if tag == "li" and not in_references else None
+        pieces = _chunks(markup, splits)
+        for i, piece in enumerate(pieces):
+            if len(pieces) == 1:
+                style = styles[kind]
+            else:
+                style = styles[f"{kind}:first" if i == 0 else f"{kind}:last" if i == len(pieces) - 1 else f"{kind}:cont"]
+            story.append(Paragraph(piece, style, bulletText=bullet if i == 0 else None))
+    return story
+
+
+def render_html(html_text: str, output_path: str, theme: str = "report") -> int:
+    """Render report HTML to a PDF at output_path; returns the page count."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    doc = SimpleDocTemplate(
+        output_path,
+        pagesize=letter,
+        rightMargin=0.75*inch,
+        leftMargin=0.75*inch,
+        topMargin=0.75*inch,
+        bottomMargin=0.75*inch,
+    )
+    doc.build(html_to_flowables(html_text, theme))
+    return doc.page
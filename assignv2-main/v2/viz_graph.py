@@ -1,100 +1,150 @@
 #!/usr/bin/env python3
 """
-Generate a Mermaid diagram of the research report generation langgraph.
-"""
+Generate Mermaid diagrams of the research report generation langgraph.
+
+The topology is read from the compiled graph itself, so the diagram cannot
+drift from graph/graph.py. The detailed diagram annotates every node with
+measured stats from recent runs (.cache/run_stats.jsonl, written by main.py
+and service.py): p50/p95 latency, LLM tokens, USD and outbound HTTP
+requests. Slow and expensive nodes are highlighted.
 
-def generate_mermaid_graph():
-    """Generate a Mermaid flowchart of the langgraph pipeline."""
-    
-    mermaid = """graph TD
-    A["🟢 Input Node<br/>Parse Topic"] -->|Initialize State| B
-    
-    B["📍 Context Node<br/>Extract Geography,<br/>Time Range, Domain<br/><br/>Model: gpt-4.1-nano"] -->|Structured Metadata| C
-    
-    C["🎯 Planner Node<br/>Generate 3 Subtopics<br/>per Research Theme<br/><br/>Model: gpt-4.1-nano"] -->|Subtopic List| D
-    
-    D["🔍 Query Node<br/>Create 4 Query Variants<br/>per Subtopic<br/>12 Total Queries<br/><br/>Deterministic"] -->|Search Queries| E
-    
-    E["🌐 Search Node<br/>DuckDuckGo Web Search<br/>Fetch Content + PDFs<br/>Title, Snippet, URL<br/><br/>Max 4 Results/Query"] -->|Raw Search Results| F
-    
-    F["🔎 Search Review Node<br/>Iterative Token Counting<br/>LLM-Guided Decisions<br/>Max 250k Tokens<br/><br/>Model: gpt-4.1-nano"] -->|Filtered + Ranked Results| G
-    
-    G["📝 Summarize Node<br/>Full Content Aggregation<br/>Truncate to 250k Tokens<br/>Generate HTML Report<br/>APA 7 Citations [1-8]<br/><br/>Model: gpt-4.1-mini"] -->|HTML Report| H
-    
-    H["📄 PDF Node<br/>Times-Roman Font<br/>Justified Typography<br/>Semantic HTML Parsing<br/><br/>Output: .pdf"] -->|✅ Final Report|I["🎁 Report Ready"]
-    
-    J["💰 Cost Tracker<br/>Track Tokens + USD<br/>per Step<br/>Cumulative Summary"] -.->|Parallel Monitoring| F
-    J -.->|Parallel Monitoring| G
-    
-    style A fill:#90EE90,stroke:#228B22,stroke-width:2px,color:#000
-    style B fill:#87CEEB,stroke:#00008B,stroke-width:2px,color:#000
-    style C fill:#87CEEB,stroke:#00008B,stroke-width:2px,color:#000
-    style D fill:#FFD700,stroke:#FF8C00,stroke-width:2px,color:#000
-    style E fill:#FFD700,stroke:#FF8C00,stroke-width:2px,color:#000
-    style F fill:#DDA0DD,stroke:#8B008B,stroke-width:2px,color:#000
-    style G fill:#DDA0DD,stroke:#8B008B,stroke-width:2px,color:#000
-    style H fill:#FFA07A,stroke:#FF4500,stroke-width:2px,color:#000
-    style I fill:#98FB98,stroke:#228B22,stroke-width:3px,color:#000
-    style J fill:#F0E68C,stroke:#DAA520,stroke-width:2px,color:#000
+Usage: python viz_graph.py [--runs 50]
 """
-    
-    return mermaid
-
-
-def generate_mermaid_graph_simple():
-    """Simpler version of the graph."""
-    
-    mermaid = """graph TD
-    INPUT["Input: Topic"] 
-    INPUT -->|topic string| CONTEXT["📍 Context<br/>gpt-4.1-nano"]
-    
-    CONTEXT -->|geography,<br/>time_range, domain| PLANNER["🎯 Planner<br/>gpt-4.1-nano"]
-    
-    PLANNER -->|3 subtopics| QUERY["🔍 Query<br/>Generate Variants"]
-    
-    QUERY -->|12 queries| SEARCH["🌐 Search<br/>DuckDuckGo + Fetch"]
-    
-    SEARCH -->|raw results| REVIEW["🔎 Review<br/>gpt-4.1-nano<br/>250k token cap"]
-    
-    REVIEW -->|filtered results| SUMMARIZE["📝 Summarize<br/>gpt-4.1-mini<br/>HTML + Citations"]
-    
-    SUMMARIZE -->|HTML| PDF["📄 PDF<br/>Times-Roman<br/>Justified"]
-    
-    PDF -->|.pdf| OUTPUT["✅ Final Report"]
-    
-    COST["💰 Cost Tracker<br/>USD + Tokens"] -.->|monitors all| REVIEW
-    COST -.->|monitors all| SUMMARIZE
-    
-    style INPUT fill:#e1f5e1
-    style CONTEXT fill:#bbdefb
-    style PLANNER fill:#bbdefb
-    style QUERY fill:#fff9c4
-    style SEARCH fill:#fff9c4
-    style REVIEW fill:#e1bee7
-    style SUMMARIZE fill:#e1bee7
-    style PDF fill:#ffccbc
-    style OUTPUT fill:#c8e6c9
-    style COST fill:#ffe0b2
+
+import argparse
+
+from tools.run_stats import HISTORY_RUNS, load_history, node_summary
+
+SLOW_SHARE = 0.25  # share of the run's total p50 latency that marks a node as slow
+EXPENSIVE_SHARE = 0.4  # share of the run's USD that marks a node as expensive
+POST_GRAPH_NODES = ["pdf"]  # run by main.py / service.py after the graph finishes
+
+STYLES = """
+    classDef terminal fill:#e1f5e1,stroke:#228B22,color:#000
+    classDef step fill:#bbdefb,stroke:#00008B,color:#000
+    classDef slow fill:#ffcdd2,stroke:#c62828,stroke-width:3px,color:#000
+    classDef expensive fill:#ffe0b2,stroke:#ef6c00,stroke-width:3px,color:#000
+    classDef hot fill:#ef9a9a,stroke:#b71c1c,stroke-width:4px,color:#000
 """
-    
-    return mermaid
 
 
-if __name__ == "__main__":
-    # Save detailed version
-    with open("graph_detailed.md", "w") as f:
+def _graph_structure():
+    """(node names, edges as (source, target, conditional), first docstring line per node) from the compiled graph."""
+    from graph.graph import get_graph
+
+    compiled = get_graph()
+    drawable = compiled.get_graph()
+    docs = {}
+    for name, spec in compiled.builder.nodes.items():
+        doc = (getattr(spec.runnable, "func", None).__doc__ or "").strip()
+        first = doc.split("\n")[0].rstrip(".,:")
+        docs[name] = first if len(first) <= 60 else first[:60].rsplit(" ", 1)[0] + "…"
+    edges = [(e.source, e.target, e.conditional) for e in drawable.edges]
+    return list(drawable.nodes), edges, docs
+
+
+def _node_id(name: str) -> str:
+    return {"__start__": "START", "__end__": "END"}.get(name, name)
+
+
+def _fmt_tokens(tokens: float) -> str:
+    return f"{tokens / 1000:.1f}k tok" if tokens >= 1000 else f"{tokens:.0f} tok"
+
+
+def _label(name: str, doc: str, stats: dict = None) -> str:
+    lines = [f"<b>{name}</b>"]
+    if doc:
+        lines.append(doc)
+    if stats:
+        lines.append(f"p50 {stats['p50_s']:.2f}s · p95 {stats['p95_s']:.2f}s")
+        lines.append(f"{_fmt_tokens(stats['tokens'])} · ${stats['cost_usd']:.4f} · {stats['requests']:.0f} req")
+    return "<br/>".join(lines).replace('"', "#quot;")
+
+
+def _highlight(summary: dict) -> dict:
+    """node -> class name (slow / expensive / hot) for the nodes that dominate latency or cost."""
+    total_s = sum(s["p50_s"] for s in summary.values()) or 1.0
+    total_usd = sum(s["cost_usd"] for s in summary.values()) or 1.0
+    classes = {}
+    for name, s in summary.items():
+        slow = s["p50_s"] / total_s >= SLOW_SHARE
+        expensive = s["cost_usd"] / total_usd >= EXPENSIVE_SHARE and s["cost_usd"] > 0
+        if slow and expensive:
+            classes[name] = "hot"
+        elif slow:
+            classes[name] = "slow"
+        elif expensive:
+            classes[name] = "expensive"
+    return classes
+
+
+def generate_mermaid_graph(summary: dict = None) -> str:
+    """Flowchart of the compiled graph, annotated with per-node stats when `summary` is given."""
+    summary = summary or {}
+    nodes, edges, docs = _graph_structure()
+    classes = _highlight(summary)
+
+    lines = ["graph TD"]
+    for name in nodes + POST_GRAPH_NODES:
+        node_id = _node_id(name)
+        if name in ("__start__", "__end__"):
+            lines.append(f'    {node_id}(["{name.strip("_")}"])')
+        else:
+            lines.append(f'    {node_id}["{_label(name, docs.get(name, ""), summary.get(name))}"]')
+    lines.append("")
+    for source, target, conditional in edges:
+        arrow = "-.->" if conditional else "-->"
+        lines.append(f"    {_node_id(source)} {arrow} {_node_id(target)}")
+    for name in POST_GRAPH_NODES:
+        lines.append(f"    END ==>|after the graph| {name}")
+
+    lines.append(STYLES.rstrip())
+    lines.append("    class START,END terminal")
+    plain = [_node_id(n) for n in nodes + POST_GRAPH_NODES if n not in classes and not n.startswith("__")]
+    if plain:
+        lines.append(f"    class {','.join(plain)} step")
+    for name, cls in classes.items():
+        lines.append(f"    class {_node_id(name)} {cls}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_mermaid_graph_simple() -> str:
+    """Topology only."""
+    return generate_mermaid_graph({})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=HISTORY_RUNS, help="recent runs to aggregate")
+    args = parser.parse_args()
+
+    history = load_history(args.runs)
+    summary = node_summary(history)
+
+    with open("graph_detailed.md", "w", encoding="utf-8") as f:
         f.write("# Research Report Generation Pipeline\n\n")
         f.write("## Detailed Mermaid Diagram\n\n")
+        if history:
+            f.write(
+                f"Per-node stats over the last {len(history)} runs: p50/p95 latency, mean LLM tokens, USD and "
+                f"outbound HTTP requests. Red nodes take >= {SLOW_SHARE:.0%} of the run's latency, orange ones "
+                f">= {EXPENSIVE_SHARE:.0%} of its cost. Dotted edges are conditional.\n\n"
+            )
+        else:
+            f.write("No run stats yet: run main.py once to annotate the nodes.\n\n")
         f.write("```mermaid\n")
-        f.write(generate_mermaid_graph())
-        f.write("\n```\n\n")
-    
-    # Save simple version
-    with open("graph_simple.md", "w") as f:
+        f.write(generate_mermaid_graph(summary))
+        f.write("```\n")
+
+    with open("graph_simple.md", "w", encoding="utf-8") as f:
         f.write("# Research Report Generation Pipeline (Simplified)\n\n")
         f.write("```mermaid\n")
         f.write(generate_mermaid_graph_simple())
-        f.write("\n```\n\n")
-    
-    print("✅ Generated graph_detailed.md and graph_simple.md")
-    print("\nPaste either diagram into https://mermaid.live for visualization")
+        f.write("```\n")
+
+    print(f"Generated graph_detailed.md ({len(history)} runs of stats) and graph_simple.md")
+    print("\nPaste either diagram into https://mermaid.live for visualization, or run gen_png.py")
+
+
+if __name__ == "__main__":
+    main()